@@ -0,0 +1,183 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import orjson
+from langchain_core.documents import Document
+from langchain_core.stores import BaseStore
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "parent_docs:invalidate"
+
+
+def _document_size(doc: Document) -> int:
+    """Approximate in-memory footprint of a Document in bytes."""
+    return len(doc.page_content.encode("utf-8")) + len(orjson.dumps(doc.metadata, default=str))
+
+
+def _copy_document(doc: Document) -> Document:
+    # Callers may mutate metadata; never hand out the cached instance itself.
+    return Document(page_content=doc.page_content, metadata=dict(doc.metadata), id=doc.id)
+
+
+class CachedDocumentStore(BaseStore[str, Document]):
+    """Size-bounded in-process LRU cache in front of another Document store.
+
+    Reads are served from memory when possible; only the misses go to the
+    backing store, in a single ``mget``. The cache is bounded by the total
+    approximate size of the cached documents, not by entry count.
+
+    Writes and deletes go straight to the backing store and invalidate the
+    affected keys. When a Redis client is given, invalidations are also
+    published on ``INVALIDATION_CHANNEL`` so caches in other processes (e.g.
+    the API server while a Celery worker re-ingests a paper) drop stale
+    entries too.
+    """
+
+    def __init__(
+        self,
+        store: BaseStore[str, Document],
+        *,
+        max_bytes: int,
+        redis_client=None,
+        channel: str = INVALIDATION_CHANNEL,
+    ):
+        """Initialize CachedDocumentStore.
+
+        Args:
+            store: The backing store (e.g. RedisDocumentStore)
+            max_bytes: Upper bound on the total size of cached documents
+            redis_client: Optional Redis client used for cross-process invalidation
+            channel: Pub/sub channel for invalidation messages
+        """
+        self.store = store
+        self.max_bytes = max_bytes
+        self.redis_client = redis_client
+        self.channel = channel
+        self._entries: "OrderedDict[str, Tuple[Document, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._listener = None
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "oversized": 0}
+
+    # ── cache internals ────────────────────────────────────────────────────
+
+    def _put(self, key: str, doc: Document) -> None:
+        size = _document_size(doc)
+        if size > self.max_bytes:
+            self._stats["oversized"] += 1
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._entries[key] = (doc, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self._stats["evictions"] += 1
+
+    def invalidate(self, keys: Sequence[str]) -> None:
+        """Drop keys from this process's cache."""
+        with self._lock:
+            for key in keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._bytes -= entry[1]
+                    self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Cache metrics: hit/miss/eviction counters and current size."""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            }
+
+    # ── cross-process invalidation ─────────────────────────────────────────
+
+    def _ensure_listener(self) -> None:
+        """Subscribe to invalidations the first time this process reads."""
+        if self.redis_client is None or self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is not None:
+                return
+            try:
+                pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{self.channel: self._on_invalidation})
+                self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+            except Exception as e:
+                # Without the listener the cache still works, entries just
+                # may outlive a re-ingestion in another process.
+                logger.warning(f"Parent cache invalidation listener unavailable: {e}")
+                self._listener = False
+
+    def _on_invalidation(self, message: dict) -> None:
+        try:
+            keys = orjson.loads(message["data"])
+        except Exception:
+            self.clear()
+            return
+        self.invalidate(keys)
+
+    def _publish_invalidation(self, keys: List[str]) -> None:
+        if self.redis_client is None or not keys:
+            return
+        try:
+            self.redis_client.publish(self.channel, orjson.dumps(keys))
+        except Exception as e:
+            logger.warning(f"Failed to publish parent cache invalidation: {e}")
+
+    # ── BaseStore interface ────────────────────────────────────────────────
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[Document]]:
+        self._ensure_listener()
+        results: List[Optional[Document]] = [None] * len(keys)
+        missing: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is None:
+                    missing.setdefault(key, []).append(i)
+                    continue
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                results[i] = _copy_document(entry[0])
+            self._stats["misses"] += len(missing)
+
+        if missing:
+            fetched = self.store.mget(list(missing))
+            with self._lock:
+                for key, doc in zip(missing, fetched):
+                    if doc is None:
+                        continue
+                    self._put(key, doc)
+                    for i in missing[key]:
+                        results[i] = _copy_document(doc)
+        return results
+
+    def mset(self, key_value_pairs: Sequence[Tuple[str, Document]]) -> None:
+        self.store.mset(key_value_pairs)
+        keys = [key for key, _ in key_value_pairs]
+        self.invalidate(keys)
+        self._publish_invalidation(keys)
+
+    def mdelete(self, keys: Sequence[str]) -> None:
+        self.store.mdelete(keys)
+        self.invalidate(keys)
+        self._publish_invalidation(list(keys))
+
+    def yield_keys(self, prefix: Optional[str] = None) -> Iterator[str]:
+        return self.store.yield_keys(prefix=prefix)
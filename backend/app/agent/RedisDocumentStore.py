@@ -1,16 +1,43 @@
-import pickle
-from typing import List, Optional, Sequence, Tuple, Iterator
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple, Iterator
+
+import redis
 from langchain_core.documents import Document
 from langchain_core.stores import BaseStore
-from langchain_community.storage import RedisStore
+
+from app.agent.document_codec import decode_document, encode_document, is_legacy_pickle
+
+logger = logging.getLogger(__name__)
+
+_pools: Dict[str, redis.ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(redis_url: str, **client_kwargs) -> redis.ConnectionPool:
+    """Return a process-wide connection pool for ``redis_url``.
+
+    Every store (and every QdrantService instance) built for the same URL
+    shares one pool instead of opening its own sockets.
+    """
+    with _pools_lock:
+        pool = _pools.get(redis_url)
+        if pool is None:
+            pool = redis.ConnectionPool.from_url(redis_url, **client_kwargs)
+            _pools[redis_url] = pool
+        return pool
 
 
 class RedisDocumentStore(BaseStore[str, Document]):
-    """RedisStore wrapper that automatically serializes/deserializes Documents.
-    
-    This makes RedisStore compatible with ParentDocumentRetriever.
+    """Redis-backed Document store compatible with ParentDocumentRetriever.
+
+    Documents are stored in the compact format from ``document_codec``
+    (orjson + optional zstd, with a version byte). Reads and writes are sent
+    as pipelined batches over a shared connection pool. Values written by the
+    old pickle-based store are still readable; ``migrate_legacy_documents``
+    rewrites them in the new format.
     """
-    
+
     def __init__(
         self,
         *,
@@ -19,67 +46,84 @@ class RedisDocumentStore(BaseStore[str, Document]):
         client_kwargs: Optional[dict] = None,
         ttl: Optional[int] = None,
         namespace: Optional[str] = None,
+        compress: bool = True,
+        batch_size: int = 500,
     ):
         """Initialize RedisDocumentStore.
-        
+
         Args:
             client: A Redis connection instance
             redis_url: redis url (e.g., "redis://localhost:6379")
-            client_kwargs: Keyword arguments to pass to the Redis client
+            client_kwargs: Keyword arguments to pass to the connection pool
             ttl: time to expire keys in seconds if provided
             namespace: if provided, all keys will be prefixed with this namespace
+            compress: zstd-compress large documents
+            batch_size: maximum number of keys per pipelined command
         """
-        # Initialize underlying RedisStore
-        self._redis_store = RedisStore(
-            client=client,
-            redis_url=redis_url,
-            client_kwargs=client_kwargs,
-            ttl=ttl,
-            namespace=namespace or "parent_docs",  # Default namespace
-        )
-    
+        if client is None:
+            if not redis_url:
+                raise ValueError("Either a Redis client or a redis_url must be provided.")
+            client = redis.Redis(connection_pool=get_connection_pool(redis_url, **(client_kwargs or {})))
+        self.client = client
+        self.ttl = ttl
+        self.namespace = namespace or "parent_docs"  # Default namespace
+        self.compress = compress
+        self.batch_size = batch_size
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}/{key}"
+
     def _serialize_document(self, doc: Document) -> bytes:
-        """Serialize a Document to bytes using pickle."""
-        return pickle.dumps(doc)
-    
+        """Serialize a Document with the compact codec."""
+        return encode_document(doc, compress=self.compress)
+
     def _deserialize_document(self, data: bytes) -> Document:
-        """Deserialize bytes to a Document using pickle."""
-        return pickle.loads(data)
-    
+        """Deserialize bytes (compact codec or legacy pickle) to a Document."""
+        return decode_document(data)
+
+    def _chunks(self, items: Sequence) -> Iterator[Sequence]:
+        for i in range(0, len(items), self.batch_size):
+            yield items[i:i + self.batch_size]
+
+    def mget_raw(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        """Get raw encoded values for the given keys in one round trip."""
+        if not keys:
+            return []
+        pipe = self.client.pipeline(transaction=False)
+        for chunk in self._chunks(list(keys)):
+            pipe.mget([self._key(k) for k in chunk])
+        raw_values: List[Optional[bytes]] = []
+        for chunk_values in pipe.execute():
+            raw_values.extend(chunk_values)
+        return raw_values
+
     def mget(self, keys: Sequence[str]) -> List[Optional[Document]]:
         """Get Documents for the given keys.
-        
+
         Args:
             keys: List of keys to retrieve
-            
+
         Returns:
             List of Documents (or None for missing keys)
         """
-        # Get raw bytes from Redis
-        raw_values = self._redis_store.mget(keys)
-        
-        # Deserialize bytes to Documents
         documents = []
-        for value in raw_values:
+        for value in self.mget_raw(keys):
             if value is None:
                 documents.append(None)
-            else:
-                try:
-                    doc = self._deserialize_document(value)
-                    documents.append(doc)
-                except Exception as e:
-                    print(f"Error deserializing document: {e}")
-                    documents.append(None)
-        
+                continue
+            try:
+                documents.append(self._deserialize_document(value))
+            except Exception as e:
+                logger.error(f"Error deserializing document: {e}")
+                documents.append(None)
         return documents
-    
+
     def mset(self, key_value_pairs: Sequence[Tuple[str, Document]]) -> None:
         """Set Documents for the given keys.
-        
+
         Args:
             key_value_pairs: List of (key, Document) tuples
         """
-        # Serialize Documents to bytes
         serialized_pairs = []
         for key, doc in key_value_pairs:
             if not isinstance(doc, Document):
@@ -87,28 +131,79 @@ class RedisDocumentStore(BaseStore[str, Document]):
                     f"Expected Document, got {type(doc).__name__}. "
                     "RedisDocumentStore only accepts Document objects."
                 )
-            
-            serialized_value = self._serialize_document(doc)
-            serialized_pairs.append((key, serialized_value))
-        
-        # Store in Redis
-        self._redis_store.mset(serialized_pairs)
-    
+            serialized_pairs.append((key, self._serialize_document(doc)))
+
+        for chunk in self._chunks(serialized_pairs):
+            pipe = self.client.pipeline(transaction=False)
+            for key, value in chunk:
+                pipe.set(self._key(key), value, ex=self.ttl)
+            pipe.execute()
+
     def mdelete(self, keys: Sequence[str]) -> None:
         """Delete the given keys.
-        
+
         Args:
             keys: List of keys to delete
         """
-        self._redis_store.mdelete(keys)
-    
+        for chunk in self._chunks(list(keys)):
+            self.client.delete(*[self._key(k) for k in chunk])
+
     def yield_keys(self, prefix: Optional[str] = None) -> Iterator[str]:
         """Yield keys in the store.
-        
+
         Args:
             prefix: Optional prefix to filter keys
-            
+
         Yields:
             Keys matching the prefix
         """
-        return self._redis_store.yield_keys(prefix=prefix)
\ No newline at end of file
+        pattern = self._key(f"{prefix}*" if prefix else "*")
+        offset = len(self.namespace) + 1
+        for key in self.client.scan_iter(match=pattern, count=self.batch_size):
+            if isinstance(key, bytes):
+                key = key.decode("utf-8")
+            yield key[offset:]
+
+    def migrate_legacy_documents(self, dry_run: bool = False) -> Dict[str, int]:
+        """Rewrite pickled values from the previous store format with the compact codec.
+
+        Existing TTLs are preserved. Safe to run repeatedly and while the store
+        is in use: keys already in the new format are left untouched.
+
+        Args:
+            dry_run: Only count legacy values, do not rewrite them.
+
+        Returns:
+            Counters: scanned, migrated, failed, bytes_before, bytes_after.
+        """
+        stats = {"scanned": 0, "migrated": 0, "failed": 0, "bytes_before": 0, "bytes_after": 0}
+        batch: List[str] = []
+
+        def _flush():
+            pipe = self.client.pipeline(transaction=False)
+            for key, value in zip(batch, self.mget_raw(batch)):
+                if value is None or not is_legacy_pickle(value):
+                    continue
+                try:
+                    encoded = self._serialize_document(decode_document(value))
+                except Exception as e:
+                    logger.warning(f"Could not migrate parent document {key}: {e}")
+                    stats["failed"] += 1
+                    continue
+                stats["migrated"] += 1
+                stats["bytes_before"] += len(value)
+                stats["bytes_after"] += len(encoded)
+                if not dry_run:
+                    pipe.set(self._key(key), encoded, keepttl=True)
+            if not dry_run:
+                pipe.execute()
+            batch.clear()
+
+        for key in self.yield_keys():
+            stats["scanned"] += 1
+            batch.append(key)
+            if len(batch) >= self.batch_size:
+                _flush()
+        if batch:
+            _flush()
+        return stats
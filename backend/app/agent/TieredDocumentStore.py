@@ -0,0 +1,271 @@
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.stores import BaseStore
+
+from app.agent.RedisDocumentStore import RedisDocumentStore
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteDocumentStore:
+    """Embedded on-disk store for encoded parent documents (the cold tier).
+
+    Values are kept in the same encoded form as in Redis, so moving a document
+    between tiers never re-serializes it.
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS parent_docs ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " size INTEGER NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared across threads.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        found: Dict[str, bytes] = {}
+        conn = self._conn()
+        for i in range(0, len(keys), 500):
+            chunk = list(keys[i:i + 500])
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(f"SELECT key, value FROM parent_docs WHERE key IN ({placeholders})", chunk)
+            found.update(rows)
+        return [found.get(k) for k in keys]
+
+    def mset(self, pairs: Sequence[Tuple[str, bytes]]) -> None:
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO parent_docs (key, value, size) VALUES (?, ?, ?)",
+                [(k, v, len(v)) for k, v in pairs],
+            )
+
+    def mdelete(self, keys: Sequence[str]) -> None:
+        with self._conn() as conn:
+            conn.executemany("DELETE FROM parent_docs WHERE key = ?", [(k,) for k in keys])
+
+    def yield_keys(self, prefix: Optional[str] = None) -> Iterator[str]:
+        query, args = "SELECT key FROM parent_docs", ()
+        if prefix:
+            escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            query, args = query + " WHERE key LIKE ? ESCAPE '\\'", (escaped + "%",)
+        for (key,) in self._conn().execute(query, args):
+            yield key
+
+    def size(self) -> Tuple[int, int]:
+        """Return (document count, total encoded bytes)."""
+        count, total = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM parent_docs").fetchone()
+        return count, total
+
+
+class TieredDocumentStore(BaseStore[str, Document]):
+    """Two-tier parent store: Redis for hot documents, local SQLite for cold ones.
+
+    Every document is written to the authoritative store (shared by all
+    nodes, e.g. the Qdrant parent collection), to this node's SQLite file and
+    to Redis. Redis copies get a TTL (``hot_ttl``) that is refreshed whenever
+    a document is read, so parents that nobody asks about expire out of Redis
+    while popular ones stay. With Redis configured as
+    ``maxmemory-policy allkeys-lfu`` the server also evicts the least
+    frequently used parents under memory pressure.
+
+    A Redis miss falls back to this node's disk, then to the authoritative
+    store, and promotes the document back. The cold tier is per node and
+    only a cache: a document another node wrote is read from the
+    authoritative store once and then kept on disk here. A Redis copy only
+    gets a TTL once the document is on this node's disk; without an
+    authoritative store, Redis copies never expire.
+    """
+
+    def __init__(
+        self,
+        hot: RedisDocumentStore,
+        cold_path: str,
+        hot_ttl: int,
+        authority: Optional[BaseStore[str, Document]] = None,
+        stats_sample: int = 1000,
+    ):
+        """Initialize TieredDocumentStore.
+
+        Args:
+            hot: Redis-backed store used as the hot tier
+            cold_path: Path of this node's SQLite file used as the cold tier
+            hot_ttl: Seconds a document stays in Redis after its last access
+            authority: Store shared by every node that holds all parents; may
+                be attached later (QdrantService sets it)
+            stats_sample: Redis keys sampled by :meth:`stats` to size the hot tier
+        """
+        self.hot = hot
+        self.cold = SQLiteDocumentStore(cold_path)
+        self.hot_ttl = hot_ttl
+        self.authority = authority
+        self.stats_sample = stats_sample
+        self._lock = threading.Lock()
+        self._stats = {"hot_hits": 0, "cold_hits": 0, "authority_hits": 0, "misses": 0, "promotions": 0}
+
+    def _set_hot(self, pairs: Sequence[Tuple[str, bytes]]) -> None:
+        # Only called once the documents are on this node's disk.
+        ttl = self.hot_ttl if self.authority is not None else None
+        pipe = self.hot.client.pipeline(transaction=False)
+        for key, value in pairs:
+            pipe.set(self.hot._key(key), value, ex=ttl)
+        pipe.execute()
+
+    def _touch_hot(self, keys: Sequence[str]) -> None:
+        # XX: copies without a TTL are not on disk yet and must not start expiring.
+        pipe = self.hot.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.expire(self.hot._key(key), self.hot_ttl, xx=True)
+        pipe.execute()
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[Document]]:
+        raw = self.hot.mget_raw(keys)
+        hot_keys = [k for k, v in zip(keys, raw) if v is not None]
+        missing = [i for i, v in enumerate(raw) if v is None]
+        if hot_keys:
+            self._touch_hot(hot_keys)
+        promoted: List[Tuple[str, bytes]] = []
+        cold_hits = authority_hits = 0
+        if missing:
+            cold_values = self.cold.mget([keys[i] for i in missing])
+            still_missing = []
+            for i, value in zip(missing, cold_values):
+                if value is not None:
+                    raw[i] = value
+                    promoted.append((keys[i], value))
+                else:
+                    still_missing.append(i)
+            cold_hits = len(promoted)
+            if still_missing and self.authority is not None:
+                fetched = []
+                for i, doc in zip(still_missing, self.authority.mget([keys[i] for i in still_missing])):
+                    if doc is not None:
+                        raw[i] = self.hot._serialize_document(doc)
+                        fetched.append((keys[i], raw[i]))
+                if fetched:
+                    self.cold.mset(fetched)
+                    promoted.extend(fetched)
+                authority_hits = len(fetched)
+            if promoted:
+                self._set_hot(promoted)
+
+        with self._lock:
+            self._stats["hot_hits"] += len(hot_keys)
+            self._stats["cold_hits"] += cold_hits
+            self._stats["authority_hits"] += authority_hits
+            self._stats["promotions"] += len(promoted)
+            self._stats["misses"] += len(missing) - len(promoted)
+
+        documents = []
+        for value in raw:
+            try:
+                documents.append(None if value is None else self.hot._deserialize_document(value))
+            except Exception as e:
+                logger.error(f"Error deserializing document: {e}")
+                documents.append(None)
+        return documents
+
+    def mset(self, key_value_pairs: Sequence[Tuple[str, Document]]) -> None:
+        if self.authority is not None:
+            self.authority.mset(key_value_pairs)
+        encoded = [(key, self.hot._serialize_document(doc)) for key, doc in key_value_pairs]
+        self.cold.mset(encoded)
+        self._set_hot(encoded)
+
+    def mdelete(self, keys: Sequence[str]) -> None:
+        if self.authority is not None:
+            self.authority.mdelete(keys)
+        self.hot.mdelete(keys)
+        self.cold.mdelete(keys)
+
+    def backfill(self, batch_size: int = 500) -> Dict[str, int]:
+        """Copy parents written before tiering (Redis copies without a TTL) to the other tiers.
+
+        Each one is written to the authoritative store and this node's disk,
+        and only then given a TTL in Redis. Run once after switching to the
+        tiered backend (``scripts.backfill_tiered_store``).
+
+        Returns:
+            Counts of scanned and backfilled documents.
+        """
+        if self.authority is None:
+            raise ValueError("Backfilling needs an authoritative store")
+        stats = {"scanned": 0, "backfilled": 0}
+        keys = list(self.hot.yield_keys())
+        for i in range(0, len(keys), batch_size):
+            batch = keys[i:i + batch_size]
+            pipe = self.hot.client.pipeline(transaction=False)
+            for key in batch:
+                pipe.ttl(self.hot._key(key))
+            legacy = [key for key, ttl in zip(batch, pipe.execute()) if ttl == -1]
+            pairs = [(k, v) for k, v in zip(legacy, self.hot.mget_raw(legacy)) if v is not None]
+            stats["scanned"] += len(batch)
+            if not pairs:
+                continue
+            self.authority.mset([(k, self.hot._deserialize_document(v)) for k, v in pairs])
+            self.cold.mset(pairs)
+            pipe = self.hot.client.pipeline(transaction=False)
+            for key, _ in pairs:
+                pipe.expire(self.hot._key(key), self.hot_ttl)
+            pipe.execute()
+            stats["backfilled"] += len(pairs)
+        return stats
+
+    def yield_keys(self, prefix: Optional[str] = None) -> Iterator[str]:
+        # This node's disk only holds the documents it has seen.
+        if self.authority is not None:
+            return self.authority.yield_keys(prefix=prefix)
+        return self.hot.yield_keys(prefix=prefix)
+
+    def _hot_size(self) -> Tuple[int, int, bool]:
+        """(document count, encoded bytes, estimated?) of the hot tier.
+
+        Hot documents expire and get evicted inside Redis, so running counters
+        would drift. Instead one SCAN page of ``stats_sample`` keys is sized
+        and scaled up by DBSIZE; a keyspace that fits in that page is exact.
+        """
+        client = self.hot.client
+        cursor, keys = client.scan(0, count=self.stats_sample)
+        prefix = f"{self.hot.namespace}/"
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            if (key.decode("utf-8") if isinstance(key, bytes) else key).startswith(prefix):
+                pipe.strlen(key)
+        pipe.dbsize()
+        *lengths, total_keys = pipe.execute()
+        lengths = [n for n in lengths if n]
+        if cursor == 0 or not keys:
+            return len(lengths), sum(lengths), False
+        scale = total_keys / len(keys)
+        return round(len(lengths) * scale), round(sum(lengths) * scale), True
+
+    def stats(self) -> Dict[str, int]:
+        """Hit counters per tier plus size accounting for both tiers."""
+        cold_count, cold_bytes = self.cold.size()
+        hot_count, hot_bytes, estimated = self._hot_size()
+        with self._lock:
+            return {
+                **self._stats,
+                "hot_documents": hot_count,
+                "hot_bytes": hot_bytes,
+                "hot_estimated": estimated,
+                "cold_documents": cold_count,
+                "cold_bytes": cold_bytes,
+            }
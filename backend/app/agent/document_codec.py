@@ -0,0 +1,76 @@
+"""Compact binary encoding for parent Documents.
+
+Layout of an encoded value::
+
+    byte 0   codec version (currently 1)
+    byte 1   flags (bit 0: body is zstd-compressed)
+    byte 2+  orjson body {"c": page_content, "m": metadata[, "i": id]}
+
+Values written by the previous pickle-based store start with the pickle
+protocol marker (0x80) and can still be decoded so existing keys keep working
+until they are migrated.
+"""
+import pickle
+from typing import Optional
+
+import orjson
+from langchain_core.documents import Document
+
+try:
+    import zstandard
+except ImportError:  # compression is optional
+    zstandard = None
+
+CODEC_VERSION = 1
+FLAG_ZSTD = 0x01
+_PICKLE_MARKER = 0x80
+
+# Compressing tiny payloads costs more CPU than it saves bytes.
+MIN_COMPRESS_BYTES = 1024
+ZSTD_LEVEL = 3
+
+
+def is_legacy_pickle(data: bytes) -> bool:
+    """Return True if ``data`` was written by the old pickle-based store."""
+    return bool(data) and data[0] == _PICKLE_MARKER
+
+
+def encode_document(doc: Document, compress: bool = True) -> bytes:
+    """Encode a Document into the compact versioned format.
+
+    Metadata entries whose value is None are dropped; they carry no
+    information and make up a large share of S2 metadata dicts.
+    """
+    body = {
+        "c": doc.page_content,
+        "m": {k: v for k, v in doc.metadata.items() if v is not None},
+    }
+    if doc.id is not None:
+        body["i"] = doc.id
+    payload = orjson.dumps(body, option=orjson.OPT_NON_STR_KEYS, default=str)
+    flags = 0
+    if compress and zstandard is not None and len(payload) >= MIN_COMPRESS_BYTES:
+        payload = zstandard.compress(payload, ZSTD_LEVEL)
+        flags |= FLAG_ZSTD
+    return bytes((CODEC_VERSION, flags)) + payload
+
+
+def decode_document(data: bytes) -> Document:
+    """Decode bytes produced by :func:`encode_document` (or a legacy pickle).
+
+    Raises:
+        ValueError: If the version byte is unknown or compression support is missing.
+    """
+    if is_legacy_pickle(data):
+        return pickle.loads(data)
+    if len(data) < 2 or data[0] != CODEC_VERSION:
+        raise ValueError(f"Unsupported document codec version: {data[:1]!r}")
+    flags = data[1]
+    payload = data[2:]
+    if flags & FLAG_ZSTD:
+        if zstandard is None:
+            raise ValueError("Document is zstd-compressed but zstandard is not installed")
+        payload = zstandard.decompress(payload)
+    body = orjson.loads(payload)
+    doc_id: Optional[str] = body.get("i")
+    return Document(page_content=body["c"], metadata=body.get("m", {}), id=doc_id)
@@ -21,6 +21,7 @@ from app.agent.prompts import (
 )
 from rerankers import Reranker, Document
 from app.core.schema import S2Paper
+from app.services.resilience import get_dependency
 from pydantic import BaseModel, Field
 from typing import List, Tuple, Annotated
 from langchain.agents import AgentState
@@ -205,7 +206,7 @@ async def rerank_papers(papers: List[S2Paper], query: str) -> List[S2Paper]:
             )
             for p in papers
         ]
-        reranked = await asyncio.to_thread(ranker.rank, query=query, docs=docs)
+        reranked = await asyncio.to_thread(get_dependency("cohere").call, ranker.rank, query=query, docs=docs)
         return [S2Paper.model_validate(m.document.metadata) for m in reranked.top_k(k=MAX_PAPER_LIST_LENGTH)]
     except Exception as e:
         logger.error("Reranking failed: %s", e)
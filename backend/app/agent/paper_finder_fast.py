@@ -9,6 +9,7 @@ from app.core.config import settings
 from app.agent.utils import get_paper_info_text
 from rerankers import Reranker, Document
 from app.core.schema import S2Paper
+from app.services.resilience import get_dependency
 from typing import List, Annotated, Union
 from langchain.agents import AgentState
 from langgraph.prebuilt import tools_condition
@@ -122,7 +123,7 @@ async def rerank_node(state: SearchAgentState):
             for p in papers
         ]
         logger.debug("Reranking %d papers with query: %s...", len(docs), user_query[:50])
-        reranked = await asyncio.to_thread(ranker.rank, query=user_query, docs=docs)
+        reranked = await asyncio.to_thread(get_dependency("cohere").call, ranker.rank, query=user_query, docs=docs)
         final_papers = [S2Paper.model_validate(m.document.metadata) for m in reranked.top_k(k=MAX_PAPER_LIST_LENGTH)]
         logger.info("Reranking successful: %d papers", len(final_papers))
     except Exception as e:
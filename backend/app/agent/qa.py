@@ -30,13 +30,13 @@ def _get_qdrant() -> QdrantService:
         _qdrant = QdrantService(settings.qdrant_config)
     return _qdrant
 
-async def _check_paper_exists(paper_id: str) -> bool:
+async def _get_paper_chunk_counts(paper_ids: list[str]) -> dict[str, int]:
     # _get_qdrant() must be called inside the thread — its __init__ makes a
     # blocking socket call (collection_exists). Calling it outside to_thread
     # would evaluate it on the event loop before the executor runs.
-    def _check():
-        return _get_qdrant().check_paper_exists(paper_id)
-    return await asyncio.to_thread(_check)
+    def _count():
+        return _get_qdrant().get_paper_chunk_counts(paper_ids)
+    return await asyncio.to_thread(_count)
 
 logger = logging.getLogger(__name__)
 
@@ -68,10 +68,9 @@ async def qa_retrieve(state: QAAgentState) -> QAAgentState:
     state_updates: dict = {"qa_ui_tracking_id": tracking_id}
     if iteration == 0:
         id_to_title = {p.paperId: (p.title or p.paperId) for p in papers if p.paperId in selected_paper_ids}
-        unindexed: list[str] = []
-        for pid in selected_paper_ids:
-            if not await _check_paper_exists(pid):
-                unindexed.append(pid)
+        # One facet request covers every selected paper instead of a count per paper.
+        chunk_counts = await _get_paper_chunk_counts(selected_paper_ids)
+        unindexed = [pid for pid in selected_paper_ids if chunk_counts.get(pid, 0) == 0]
         state_updates["unindexed_paper_ids"] = unindexed
         if unindexed:
             titles = ", ".join(id_to_title.get(pid, pid) for pid in unindexed)
@@ -36,25 +36,32 @@ async def _get_signing_key(token: str) -> Any:
     raise jwt.PyJWTError(f"No signing key found for kid={kid!r}")
 
 
-@auth.authenticate
-async def authenticate(authorization: str | None) -> Auth.types.MinimalUserDict:
+async def user_identity(authorization: str | None) -> str:
+    """Clerk user ID of an ``Authorization: Bearer`` header; raises jwt.PyJWTError if it is missing or invalid."""
     if settings.DISABLE_AUTH:
-        return {"identity": "dev-user", "is_authenticated": True}
+        return "dev-user"
 
-    assert authorization and authorization.startswith("Bearer "), "Missing or malformed token"
+    if not authorization or not authorization.startswith("Bearer "):
+        raise jwt.InvalidTokenError("Missing or malformed token")
     token = authorization.removeprefix("Bearer ")
+    signing_key = await _get_signing_key(token)
+    payload = jwt.decode(
+        token,
+        signing_key,
+        algorithms=["RS256"],
+        options={"verify_aud": False},
+    )
+    return payload["sub"]
+
+
+@auth.authenticate
+async def authenticate(authorization: str | None) -> Auth.types.MinimalUserDict:
     try:
-        signing_key = await _get_signing_key(token)
-        payload = jwt.decode(
-            token,
-            signing_key,
-            algorithms=["RS256"],
-            options={"verify_aud": False},
-        )
+        identity = await user_identity(authorization)
     except jwt.PyJWTError as e:
         raise Auth.exceptions.HTTPException(status_code=401, detail=str(e))
 
-    return {"identity": payload["sub"], "is_authenticated": True}
+    return {"identity": identity, "is_authenticated": True}
 
 
 @auth.on
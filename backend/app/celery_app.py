@@ -1,10 +1,12 @@
 from celery import Celery
+from kombu import Queue
 from dotenv import load_dotenv
 from pathlib import Path
 
 load_dotenv(Path(__file__).parent.parent / ".env")
 
 from app.core.config import settings
+from app.services.ingest_priority import BULK_PRIORITY
 
 celery_app = Celery(
     "ai_researcher",
@@ -18,7 +20,44 @@ celery_app.conf.update(
     result_serializer="json",
     result_expires=3600,  # Results expire after 1 hour
     task_track_started=True,  # Track STARTED state
+    # Ingestion is mostly waiting on downloads, Grobid and embedding requests,
+    # so one worker runs several tasks at once (threads by default).
+    worker_pool=settings.CELERY_WORKER_POOL,
+    worker_concurrency=settings.CELERY_WORKER_CONCURRENCY,
+    # Tasks are long; do not let one busy worker hoard queued papers.
+    worker_prefetch_multiplier=1,
 )
 
 # Explicitly register task modules
-celery_app.conf.include = ["app.tasks.ingest"]
+celery_app.conf.include = ["app.tasks.ingest", "app.tasks.pipeline"]
+
+# A worker without -Q consumes every queue, strictly in this order: interactive
+# ingestion first, bulk loads only when nothing else is waiting.
+celery_app.conf.task_queues = [
+    Queue(name)
+    for name in (
+        "ingest.interactive",
+        "ingest.download",
+        "ingest.parse",
+        "ingest.embed",
+        "ingest.upsert",
+        "celery",
+        "ingest.bulk",
+    )
+]
+# Messages also carry a priority: bulk ones (ingest.bulk and bulk papers' stage
+# tasks, BULK_PRIORITY) are taken only once no interactive message is waiting
+# on any of the worker's queues.
+celery_app.conf.broker_transport_options = {"queue_order_strategy": "priority"}
+
+# Staged ingestion (INGEST_PIPELINE=staged): one queue per stage so workers can
+# be sized per bottleneck, e.g. `celery worker -Q ingest.download --concurrency=16`
+celery_app.conf.task_routes = {
+    "ingest_paper": {"queue": "ingest.interactive"},
+    "ingest_batch": {"queue": "ingest.bulk", "priority": BULK_PRIORITY},
+    "ingest_pdf": {"queue": "ingest.bulk", "priority": BULK_PRIORITY},
+    "ingest_stage_download": {"queue": "ingest.download"},
+    "ingest_stage_parse": {"queue": "ingest.parse"},
+    "ingest_stage_embed": {"queue": "ingest.embed"},
+    "ingest_stage_upsert": {"queue": "ingest.upsert"},
+}
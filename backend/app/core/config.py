@@ -1,5 +1,5 @@
 import os
-from typing import Any
+from typing import Any, Literal
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
 from pydantic import BaseModel
@@ -17,6 +17,7 @@ class QdrantConfig(BaseModel):
     collection: str
     distance: str
     output_dir: str
+    parent_store_backend: Literal["redis", "tiered", "qdrant"] = "redis"
 
 class CeleryConfig(BaseModel):
     broker_url: str
@@ -60,7 +61,28 @@ class Settings(BaseSettings):
     COHERE_API_KEY: str
     
 
+    # Spill directory for downloaded PDFs larger than PDF_SPOOL_MAX_MEMORY_BYTES;
+    # smaller PDFs never touch disk
     PDF_DOWNLOAD_DIR: str
+    PDF_SPOOL_MAX_MEMORY_BYTES: int = 32 * 1024 * 1024
+    # Downloads larger than this are abandoned as not a paper
+    PDF_MAX_DOWNLOAD_BYTES: int = 200 * 1024 * 1024
+    # A paper's PDF mirrors are raced: the next one starts after this many
+    # seconds without a finished download (or as soon as one fails)
+    PDF_HEDGE_DELAY_SECONDS: float = 2.0
+    # Contact email required by the Unpaywall API; empty skips DOI lookups
+    UNPAYWALL_EMAIL: str = ""
+    # Offline arXiv title index built by scripts.build_arxiv_index from the
+    # arXiv metadata snapshot; consulted before any arXiv title search. Fuzzy
+    # matches need at least this trigram similarity. Empty disables it.
+    ARXIV_INDEX_DIR: str = ""
+    ARXIV_INDEX_MIN_SIMILARITY: float = 0.9
+    # Seconds between arXiv API queries and between arXiv PDF downloads,
+    # across all workers (0 disables); requests that would wait longer than
+    # ARXIV_MAX_WAIT_SECONDS fail instead
+    ARXIV_API_INTERVAL_SECONDS: float = 3.0
+    ARXIV_PDF_INTERVAL_SECONDS: float = 1.0
+    ARXIV_MAX_WAIT_SECONDS: float = 120
 
     QDRANT_URL: str
     QDRANT_API_KEY: str = ""
@@ -74,8 +96,86 @@ class Settings(BaseSettings):
 
     CELERY_BROKER_URL: str
     CELERY_RESULT_BACKEND: str
+    # Worker pool: "threads" runs CELERY_WORKER_CONCURRENCY tasks in one
+    # process, "prefork" that many processes, "solo" one task at a time
+    CELERY_WORKER_POOL: Literal["threads", "prefork", "solo"] = "threads"
+    CELERY_WORKER_CONCURRENCY: int = 8
 
     GROBID_SERVER_URL: str
+    # Comma-separated Grobid servers to balance over; falls back to GROBID_SERVER_URL
+    GROBID_SERVER_URLS: str = ""
+    # Requests in flight per Grobid server, seconds between probes of a failed
+    # server, and the per-request timeout
+    GROBID_MAX_CONCURRENCY_PER_INSTANCE: int = 4
+    GROBID_HEALTH_CHECK_INTERVAL_SECONDS: float = 30
+    GROBID_TIMEOUT_SECONDS: float = 60
+    # PDFs with at least this many pages (0 disables) are parsed in ranges of
+    # GROBID_PAGES_PER_RANGE pages, concurrently across the Grobid pool
+    GROBID_SPLIT_MIN_PAGES: int = 50
+    GROBID_PAGES_PER_RANGE: int = 20
+    # Papers Grobid fails on, or does not parse within the budget, are indexed
+    # from pypdf page text (PDF_FALLBACK_WORKERS processes) and flagged for
+    # re-processing with scripts.reprocess_fallback
+    PDF_FALLBACK_ENABLED: bool = True
+    GROBID_LATENCY_BUDGET_SECONDS: float = 30
+    PDF_FALLBACK_WORKERS: int = 2
+
+    # Circuit breakers of S2, Grobid, Cohere and Tavily: open after this many
+    # consecutive failures, probe again after the recovery time
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_RECOVERY_SECONDS: float = 30
+    # Calls over a dependency's adaptive concurrency limit wait this long, then fail
+    DEPENDENCY_MAX_WAIT_SECONDS: float = 5
+
+    # Ingestion embedding: texts are packed into requests of at most this many
+    # tokens / inputs and sent EMBEDDING_CONCURRENCY at a time; points are
+    # upserted to Qdrant INGEST_UPSERT_BATCH_SIZE at a time
+    EMBEDDING_MAX_BATCH_TOKENS: int = 250_000
+    EMBEDDING_MAX_BATCH_SIZE: int = 2048
+    EMBEDDING_CONCURRENCY: int = 4
+    INGEST_UPSERT_BATCH_SIZE: int = 512
+    # "monolithic" runs each paper in one task; "staged" chains download, parse,
+    # embed and upsert tasks on separate queues, passing artifacts through Redis
+    # keys that expire after INGEST_ARTIFACT_TTL_SECONDS
+    INGEST_PIPELINE: Literal["monolithic", "staged"] = "monolithic"
+    INGEST_ARTIFACT_TTL_SECONDS: int = 3600
+    # Only one task ingests a paper at a time; others wait for its result.
+    # A lease not renewed for INGEST_LEASE_TTL_SECONDS (crashed worker) is taken over.
+    INGEST_LEASE_TTL_SECONDS: int = 60
+    INGEST_LEASE_WAIT_SECONDS: int = 900
+    # With INGEST_PIPELINE=staged, a lease handed from one stage to the next
+    # is extended to this, to cover queueing and chord waits between stages
+    INGEST_PIPELINE_LEASE_TTL_SECONDS: int = 900
+    # Local cache of downloaded PDFs and their Grobid TEI, keyed by PDF sha256
+    # (and by paper / arXiv ID), evicted LRU beyond INGEST_CACHE_MAX_BYTES.
+    # Empty disables it.
+    INGEST_CACHE_DIR: str = ""
+    INGEST_CACHE_MAX_BYTES: int = 5 * 1024 * 1024 * 1024
+    # POST /ingest uses the interactive queue, which workers drain before the
+    # bulk one. A user has at most this many papers on it; the rest wait
+    # their turn. Slots of tasks that never finish expire after the TTL.
+    INGEST_INTERACTIVE_SLOTS_PER_USER: int = 4
+    INGEST_INTERACTIVE_SLOT_TTL_SECONDS: int = 900
+    # Stage events streamed by GET /ingest/events; a task's latest stage is
+    # kept this long for clients that connect late
+    INGEST_EVENTS_TTL_SECONDS: int = 3600
+
+    # Parent retrieval: 0 returns whole section parents; a positive value returns
+    # a window of roughly this many characters around each matched child chunk.
+    PARENT_WINDOW_CHARS: int = 0
+    # zstd-compress parent documents stored in Redis
+    PARENT_STORE_COMPRESSION: bool = True
+    # In-process cache for parent documents, bounded by total size; 0 disables it
+    PARENT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    # Where parent documents live: "redis" (kv store), "tiered" (Redis for hot
+    # parents + a per-node SQLite cache, backed by the Qdrant parent
+    # collection) or "qdrant" (payload-only collection joined at search time —
+    # one round trip, no Redis dependency)
+    PARENT_STORE_BACKEND: Literal["redis", "tiered", "qdrant"] = "redis"
+    # Tiered backend: seconds a parent stays in Redis after its last access,
+    # and this node's SQLite file holding the cold tier
+    PARENT_HOT_TTL_SECONDS: int = 7 * 24 * 3600
+    PARENT_COLD_STORE_PATH: str = "./parent_store/parents.sqlite3"
 
     CLERK_JWKS_URL: str = ""  # only required by the LangGraph backend, not the Celery worker
     DISABLE_AUTH: bool = False
@@ -104,8 +204,14 @@ class Settings(BaseSettings):
             collection=self.QDRANT_COLLECTION,
             distance=self.QDRANT_DISTANCE,
             output_dir=self.PDF_DOWNLOAD_DIR,
+            parent_store_backend=self.PARENT_STORE_BACKEND,
         )
 
+    @property
+    def grobid_server_urls(self) -> list[str]:
+        urls = [u.strip() for u in self.GROBID_SERVER_URLS.split(",") if u.strip()]
+        return urls or [self.GROBID_SERVER_URL]
+
     @property
     def celery_config(self) -> CeleryConfig:
         return CeleryConfig(
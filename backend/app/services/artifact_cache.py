@@ -0,0 +1,225 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+try:
+    import zstandard
+except ImportError:  # compression is optional
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+ZSTD_LEVEL = 9
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_COPY_CHUNK_BYTES = 1024 * 1024
+
+
+def sha256_of(pdf: bytes | BinaryIO) -> str:
+    """Hash PDF content; a file object is read to the end and rewound."""
+    if isinstance(pdf, (bytes, bytearray)):
+        return hashlib.sha256(pdf).hexdigest()
+    digest = hashlib.sha256()
+    for block in iter(lambda: pdf.read(_COPY_CHUNK_BYTES), b""):
+        digest.update(block)
+    pdf.seek(0)
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """Local on-disk cache of downloaded PDFs and their Grobid TEI.
+
+    Artifacts are content-addressed by the PDF's sha256; aliases such as
+    ``arxiv:1706.03762`` or ``s2:<paperId>`` map a paper to its PDF before
+    it is downloaded. A SQLite index tracks size and last use of every file,
+    and the least recently used ones are evicted once the total exceeds
+    ``max_bytes``. TEI is stored zstd-compressed when zstandard is installed.
+
+    The cache is per node and safe to share between threads and worker
+    processes: files are written under a temporary name and renamed into
+    place.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {"pdf_hits": 0, "pdf_misses": 0, "tei_hits": 0, "tei_misses": 0, "evictions": 0}
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                " sha256 TEXT NOT NULL,"
+                " kind TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (sha256, kind))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS artifacts_last_used ON artifacts (last_used)")
+            conn.execute("CREATE TABLE IF NOT EXISTS aliases (alias TEXT PRIMARY KEY, sha256 TEXT NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared across threads.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.root / "index.sqlite3", timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def _path(self, sha256: str, kind: str) -> Path:
+        return self.root / sha256[:2] / f"{sha256}.{kind}"
+
+    def _count(self, stat: str) -> None:
+        with self._stats_lock:
+            self._stats[stat] += 1
+
+    def _store(self, sha256: str, kind: str, tmp_path: str, size: int, aliases: Sequence[str] = ()) -> None:
+        """Move a fully written temporary file into place and index it."""
+        path = self._path(sha256, kind)
+        path.parent.mkdir(exist_ok=True)
+        os.replace(tmp_path, path)
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts (sha256, kind, size, last_used) VALUES (?, ?, ?, ?)",
+                (sha256, kind, size, time.time()),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO aliases (alias, sha256) VALUES (?, ?)",
+                [(alias, sha256) for alias in aliases],
+            )
+        self._evict()
+
+    def _open(self, sha256: str, kind: str) -> Optional[BinaryIO]:
+        try:
+            f = open(self._path(sha256, kind), "rb")
+        except FileNotFoundError:
+            return None
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE artifacts SET last_used = ? WHERE sha256 = ? AND kind = ?",
+                (time.time(), sha256, kind),
+            )
+        return f
+
+    def _evict(self) -> None:
+        conn = self._conn()
+        (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for sha256, kind, size in conn.execute("SELECT sha256, kind, size FROM artifacts ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            victims.append((sha256, kind))
+            total -= size
+        with conn:
+            conn.executemany("DELETE FROM artifacts WHERE sha256 = ? AND kind = ?", victims)
+            conn.execute("DELETE FROM aliases WHERE sha256 NOT IN (SELECT sha256 FROM artifacts)")
+        for sha256, kind in victims:
+            self._path(sha256, kind).unlink(missing_ok=True)
+        with self._stats_lock:
+            self._stats["evictions"] += len(victims)
+
+    def lookup(self, aliases: Sequence[str]) -> Optional[str]:
+        """Return the sha256 of the PDF known under any of ``aliases``."""
+        if not aliases:
+            return None
+        placeholders = ",".join("?" * len(aliases))
+        row = self._conn().execute(
+            f"SELECT sha256 FROM aliases WHERE alias IN ({placeholders}) LIMIT 1", list(aliases)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put_pdf(self, pdf: BinaryIO, aliases: Sequence[str] = ()) -> str:
+        """Copy a PDF into the cache and record its aliases.
+
+        Returns:
+            The PDF's sha256. ``pdf`` is rewound so the caller can keep using it.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        # The name depends on the content, so it is only known once copied.
+        with tempfile.NamedTemporaryFile(dir=self.root, prefix="incoming-", delete=False) as tmp:
+            for block in iter(lambda: pdf.read(_COPY_CHUNK_BYTES), b""):
+                digest.update(block)
+                tmp.write(block)
+                size += len(block)
+        pdf.seek(0)
+        sha256 = digest.hexdigest()
+        self._store(sha256, "pdf", tmp.name, size, aliases)
+        return sha256
+
+    def open_pdf(self, aliases: Sequence[str]) -> Optional[BinaryIO]:
+        """Open the cached PDF of a paper known under any of ``aliases``."""
+        sha256 = self.lookup(aliases)
+        pdf = self._open(sha256, "pdf") if sha256 else None
+        self._count("pdf_hits" if pdf else "pdf_misses")
+        return pdf
+
+    def has_pdf(self, sha256: str) -> bool:
+        return self._path(sha256, "pdf").exists()
+
+    def open_pdf_by_sha256(self, sha256: str) -> Optional[BinaryIO]:
+        """Open a cached PDF by its content hash, or None if it is not (or no longer) cached."""
+        return self._open(sha256, "pdf")
+
+    def put_tei(self, sha256: str, tei: bytes) -> None:
+        if zstandard is not None:
+            tei = zstandard.compress(tei, ZSTD_LEVEL)
+        with tempfile.NamedTemporaryFile(dir=self.root, prefix="incoming-", delete=False) as tmp:
+            tmp.write(tei)
+        self._store(sha256, "tei", tmp.name, len(tei))
+
+    def get_tei(self, sha256: str) -> Optional[bytes]:
+        f = self._open(sha256, "tei")
+        self._count("tei_hits" if f else "tei_misses")
+        if f is None:
+            return None
+        with f:
+            data = f.read()
+        if data.startswith(_ZSTD_MAGIC):
+            if zstandard is None:
+                raise ValueError("Cached TEI is zstd-compressed but zstandard is not installed")
+            data = zstandard.decompress(data)
+        return data
+
+    def iter_aliases(self, prefix: str = "") -> Iterator[Tuple[str, str]]:
+        """Yield (alias, sha256) pairs whose alias starts with ``prefix``."""
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        yield from self._conn().execute(
+            "SELECT alias, sha256 FROM aliases WHERE alias LIKE ? ESCAPE '\\'", (escaped + "%",)
+        ).fetchall()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit counters plus file counts and bytes per artifact kind."""
+        rows = self._conn().execute("SELECT kind, COUNT(*), COALESCE(SUM(size), 0) FROM artifacts GROUP BY kind")
+        sizes = {"pdf_files": 0, "pdf_bytes": 0, "tei_files": 0, "tei_bytes": 0}
+        for kind, count, size in rows:
+            sizes[f"{kind}_files"] = count
+            sizes[f"{kind}_bytes"] = size
+        with self._stats_lock:
+            return {**self._stats, **sizes, "max_bytes": self.max_bytes}
+
+
+_cache: Optional[ArtifactCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_artifact_cache() -> Optional[ArtifactCache]:
+    """Process-wide cache from INGEST_CACHE_DIR, or None if caching is off."""
+    global _cache
+    if not settings.INGEST_CACHE_DIR or settings.INGEST_CACHE_MAX_BYTES <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ArtifactCache(settings.INGEST_CACHE_DIR, settings.INGEST_CACHE_MAX_BYTES)
+        return _cache
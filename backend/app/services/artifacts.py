@@ -0,0 +1,70 @@
+import uuid
+from array import array
+from typing import List, Optional
+
+import orjson
+import redis
+from langchain_core.documents import Document
+
+from app.agent.RedisDocumentStore import get_connection_pool
+
+
+def document_to_dict(doc: Document) -> dict:
+    return {"page_content": doc.page_content, "metadata": doc.metadata}
+
+
+def document_from_dict(data: dict) -> Document:
+    return Document(page_content=data["page_content"], metadata=data["metadata"])
+
+
+class ArtifactStore:
+    """Short-lived blobs handed between ingestion stages, stored in Redis.
+
+    Stage tasks pass only the returned keys through Celery, so PDFs, TEI and
+    embeddings never go through the broker. Every artifact expires after
+    ``ttl`` seconds, which cleans up after pipelines that fail half way.
+    """
+
+    def __init__(self, client: redis.Redis, ttl: int, namespace: str = "ingest_artifacts"):
+        self.client = client
+        self.ttl = ttl
+        self.namespace = namespace
+
+    @classmethod
+    def from_url(cls, redis_url: str, ttl: int) -> "ArtifactStore":
+        return cls(redis.Redis(connection_pool=get_connection_pool(redis_url)), ttl)
+
+    def put(self, kind: str, data: bytes) -> str:
+        key = f"{self.namespace}/{kind}/{uuid.uuid4().hex}"
+        self.client.set(key, data, ex=self.ttl)
+        return key
+
+    def get(self, key: str) -> bytes:
+        data = self.client.get(key)
+        if data is None:
+            raise KeyError(f"Artifact {key} expired or missing")
+        return data
+
+    def delete(self, *keys: Optional[str]) -> None:
+        keys = [k for k in keys if k]
+        if keys:
+            self.client.delete(*keys)
+
+    def put_json(self, kind: str, value) -> str:
+        return self.put(kind, orjson.dumps(value))
+
+    def get_json(self, key: str):
+        return orjson.loads(self.get(key))
+
+    def put_vectors(self, vectors: List[List[float]]) -> str:
+        # float32 is what Qdrant stores anyway; half the size of JSON floats.
+        dim = len(vectors[0]) if vectors else 0
+        flat = array("f", [x for vector in vectors for x in vector])
+        return self.put("vectors", dim.to_bytes(4, "little") + flat.tobytes())
+
+    def get_vectors(self, key: str) -> List[List[float]]:
+        data = self.get(key)
+        dim = int.from_bytes(data[:4], "little")
+        flat = array("f")
+        flat.frombytes(data[4:])
+        return [flat[i:i + dim].tolist() for i in range(0, len(flat), dim)] if dim else []
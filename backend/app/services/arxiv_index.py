@@ -0,0 +1,215 @@
+"""Offline arXiv title index built from the arXiv metadata snapshot.
+
+Resolving an S2 paper without an arXiv external ID used to take an arXiv API
+title search, throttled to one request every few seconds. This index answers
+the same question locally, from memory-mapped numpy arrays in
+ARXIV_INDEX_DIR (built by ``scripts.build_arxiv_index``):
+
+* ``hashes.npy`` / ``hash_rows.npy``: a 64-bit hash of every normalized
+  title, sorted, and the row it belongs to. Exact title matches are a
+  binary search.
+* ``trigram_offsets.npy`` / ``postings.npy``: for each character trigram of
+  the normalized alphabet, the rows whose title contains it. Fuzzy matches
+  only look at the rarest trigrams of the query, enough that any title
+  reaching the similarity threshold must share one of them, and then score
+  those candidates by trigram Jaccard similarity.
+* ``ids.npy``, ``title_offsets.npy`` and ``titles.bin``: arXiv ID and
+  normalized title of every row.
+
+Nothing is read into memory up front; the OS pages in what lookups touch,
+and forked workers share the pages.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ALPHABET = " abcdefghijklmnopqrstuvwxyz0123456789"
+N_TRIGRAMS = len(ALPHABET) ** 3
+FORMAT_VERSION = 1
+# Candidates sharing the most rare trigrams with the query that are scored
+MAX_CANDIDATES = 50
+
+_SYMBOLS = np.zeros(256, dtype=np.uint32)
+for _i, _c in enumerate(ALPHABET):
+    _SYMBOLS[ord(_c)] = _i
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", (title or "").lower()))
+
+
+def title_hash(normalized: str) -> int:
+    """Stable 64-bit hash of a normalized title (``hash()`` is salted per process)."""
+    return int.from_bytes(hashlib.blake2b(normalized.encode(), digest_size=8).digest(), "little")
+
+
+def trigrams(normalized: str) -> np.ndarray:
+    """Sorted unique trigram codes of a normalized title, padded with spaces."""
+    symbols = _SYMBOLS[np.frombuffer(f"  {normalized} ".encode("ascii"), dtype=np.uint8)]
+    codes = symbols[:-2] * len(ALPHABET) ** 2 + symbols[1:-1] * len(ALPHABET) + symbols[2:]
+    return np.unique(codes)
+
+
+def _similarity(a: np.ndarray, b: np.ndarray) -> float:
+    shared = len(np.intersect1d(a, b, assume_unique=True))
+    return shared / (len(a) + len(b) - shared)
+
+
+def _save(directory: Path, name: str, array: np.ndarray) -> None:
+    tmp = directory / f"{name}.tmp.npy"
+    np.save(tmp, array)
+    os.replace(tmp, directory / f"{name}.npy")
+
+
+def build_arxiv_index(records: Iterable[Tuple[str, str]], directory: str) -> int:
+    """Write the index of ``(arXiv ID, title)`` records to ``directory``.
+
+    Records whose title normalizes to nothing are skipped. Files are
+    replaced one by one and ``meta.json`` is written last, so point
+    ARXIV_INDEX_DIR at a fresh directory when rebuilding a live index.
+
+    Returns:
+        Number of titles indexed.
+
+    Raises:
+        ValueError: If no record has a usable title.
+    """
+    out = Path(directory)
+    out.mkdir(parents=True, exist_ok=True)
+    ids: List[str] = []
+    hashes: List[int] = []
+    title_offsets = [0]
+    codes: List[np.ndarray] = []
+    with open(out / "titles.bin.tmp", "wb") as titles:
+        for arxiv_id, title in records:
+            normalized = normalize_title(title)
+            if not normalized:
+                continue
+            encoded = normalized.encode()
+            titles.write(encoded)
+            title_offsets.append(title_offsets[-1] + len(encoded))
+            ids.append(arxiv_id)
+            hashes.append(title_hash(normalized))
+            codes.append(trigrams(normalized))
+    if not ids:
+        os.remove(out / "titles.bin.tmp")
+        raise ValueError("No titles to index")
+    os.replace(out / "titles.bin.tmp", out / "titles.bin")
+
+    hash_array = np.array(hashes, dtype=np.uint64)
+    order = np.argsort(hash_array, kind="stable")
+    _save(out, "hashes", hash_array[order])
+    _save(out, "hash_rows", order.astype(np.uint32))
+    _save(out, "ids", np.array(ids, dtype=np.bytes_))
+    _save(out, "title_offsets", np.array(title_offsets, dtype=np.uint64))
+
+    counts = np.array([len(c) for c in codes], dtype=np.int64)
+    all_codes = np.concatenate(codes)
+    del codes
+    rows = np.repeat(np.arange(len(ids), dtype=np.uint32), counts)
+    order = np.argsort(all_codes, kind="stable")
+    _save(out, "postings", rows[order])
+    offsets = np.zeros(N_TRIGRAMS + 1, dtype=np.int64)
+    np.cumsum(np.bincount(all_codes, minlength=N_TRIGRAMS), out=offsets[1:])
+    _save(out, "trigram_offsets", offsets)
+
+    (out / "meta.json").write_text(json.dumps({"format": FORMAT_VERSION, "titles": len(ids)}))
+    return len(ids)
+
+
+class ArxivIndex:
+    """Read-only view of an index written by :func:`build_arxiv_index`."""
+
+    def __init__(self, directory: str, min_similarity: float = 0.9):
+        path = Path(directory)
+        meta = json.loads((path / "meta.json").read_text())
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"arXiv index in {directory} has format {meta.get('format')}, expected {FORMAT_VERSION}")
+        self.min_similarity = min_similarity
+        self.hashes = np.load(path / "hashes.npy", mmap_mode="r")
+        self.hash_rows = np.load(path / "hash_rows.npy", mmap_mode="r")
+        self.ids = np.load(path / "ids.npy", mmap_mode="r")
+        self.title_offsets = np.load(path / "title_offsets.npy", mmap_mode="r")
+        self.titles = np.memmap(path / "titles.bin", dtype=np.uint8, mode="r")
+        self.trigram_offsets = np.load(path / "trigram_offsets.npy", mmap_mode="r")
+        self.postings = np.load(path / "postings.npy", mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def title(self, row: int) -> str:
+        return self.titles[int(self.title_offsets[row]):int(self.title_offsets[row + 1])].tobytes().decode()
+
+    def arxiv_id(self, row: int) -> str:
+        return self.ids[row].decode()
+
+    def lookup(self, title: str) -> Optional[str]:
+        """arXiv ID of the paper with this title, or None.
+
+        An identical normalized title wins; otherwise the most similar title
+        at or above ``min_similarity`` (trigram Jaccard).
+        """
+        normalized = normalize_title(title)
+        if not normalized:
+            return None
+        row = self._exact(normalized)
+        if row is None:
+            row = self._fuzzy(normalized)
+        return None if row is None else self.arxiv_id(row)
+
+    def _exact(self, normalized: str) -> Optional[int]:
+        key = np.uint64(title_hash(normalized))
+        i = int(np.searchsorted(self.hashes, key))
+        while i < len(self.hashes) and self.hashes[i] == key:
+            row = int(self.hash_rows[i])
+            if self.title(row) == normalized:
+                return row
+            i += 1
+        return None
+
+    def _fuzzy(self, normalized: str) -> Optional[int]:
+        query = trigrams(normalized)
+        sizes = self.trigram_offsets[query + 1] - self.trigram_offsets[query]
+        # A title with Jaccard >= t shares all but (1 - t) * |query| of the
+        # query's trigrams, so it contains at least one of the rarest ones.
+        prefix = int((1 - self.min_similarity) * len(query)) + 1
+        rare = query[np.argsort(sizes, kind="stable")[:prefix]]
+        lists = [self.postings[self.trigram_offsets[c]:self.trigram_offsets[c + 1]] for c in rare]
+        candidates, hits = np.unique(np.concatenate(lists), return_counts=True)
+        if not len(candidates):
+            return None
+        best_row, best = None, self.min_similarity
+        for row in candidates[np.argsort(-hits, kind="stable")[:MAX_CANDIDATES]]:
+            score = _similarity(query, trigrams(self.title(int(row))))
+            if score > best or (score == best and best_row is None):
+                best_row, best = int(row), score
+        return best_row
+
+
+_index: Optional[ArxivIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_arxiv_index() -> Optional[ArxivIndex]:
+    """Process-wide index from ARXIV_INDEX_DIR, or None if it is unset or not built."""
+    global _index
+    if not settings.ARXIV_INDEX_DIR:
+        return None
+    with _index_lock:
+        if _index is None:
+            if not (Path(settings.ARXIV_INDEX_DIR) / "meta.json").exists():
+                return None
+            _index = ArxivIndex(settings.ARXIV_INDEX_DIR, settings.ARXIV_INDEX_MIN_SIMILARITY)
+            logger.info(f"Loaded arXiv index of {len(_index)} titles from {settings.ARXIV_INDEX_DIR}")
+        return _index
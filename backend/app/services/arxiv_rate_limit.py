@@ -0,0 +1,143 @@
+"""Rate limit on arXiv shared by every worker process, in Redis.
+
+``arxiv.Client(delay_seconds=3.0)`` only spaces the requests of one client,
+and every task built its own, so a fleet of workers hit arXiv as often as
+it liked and got throttled. Here each request to arXiv first reserves the
+next free slot of its kind in Redis (API queries and PDF downloads are
+limited separately) and sleeps until that slot comes up, so all workers
+together send at most one request per interval, in a steady stream.
+Requests to other hosts never wait.
+
+The slot clock is Redis server time, so worker clock skew does not matter.
+A request that would wait longer than ARXIV_MAX_WAIT_SECONDS reserves
+nothing and fails with :class:`ArxivRateLimited` instead, which lets a
+paper's other PDF sources take over.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import arxiv
+import redis
+
+from app.agent.RedisDocumentStore import get_connection_pool
+from app.core.config import settings
+from app.services.resilience import DependencyUnavailable
+
+logger = logging.getLogger(__name__)
+
+API = "api"
+PDF = "pdf"
+
+# KEYS[1] time (ms) from which the next request may start; ARGV[1] interval
+# in ms, ARGV[2] longest wait in ms. Returns the wait until the reserved
+# slot in ms, or -1 without reserving if that would be longer than ARGV[2].
+_RESERVE = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local slot = math.max(now, tonumber(redis.call('GET', KEYS[1]) or 0))
+if slot - now > tonumber(ARGV[2]) then
+    return -1
+end
+local next_free = slot + tonumber(ARGV[1])
+redis.call('SET', KEYS[1], next_free, 'PX', next_free - now + 1000)
+return slot - now
+"""
+
+
+class ArxivRateLimited(DependencyUnavailable):
+    """arXiv is booked up for longer than ARXIV_MAX_WAIT_SECONDS."""
+
+
+def is_arxiv_url(url: str) -> bool:
+    host = urlparse(url).hostname or ""
+    return host == "arxiv.org" or host.endswith(".arxiv.org")
+
+
+class ArxivRateLimiter:
+    """Slot reservations at a fixed interval per kind of request, in Redis."""
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        intervals: Dict[str, float],
+        max_wait: float,
+        namespace: str = "arxiv_rate",
+    ):
+        self.client = client
+        self.intervals = intervals
+        self.max_wait = max_wait
+        self.namespace = namespace
+        self._reserve = client.register_script(_RESERVE)
+
+    @classmethod
+    def from_url(cls, redis_url: str, intervals: Dict[str, float], max_wait: float) -> "ArxivRateLimiter":
+        return cls(redis.Redis(connection_pool=get_connection_pool(redis_url)), intervals, max_wait)
+
+    def reserve(self, kind: str) -> float:
+        """Book the next slot for a request of ``kind``; returns the seconds until it.
+
+        Raises:
+            ArxivRateLimited: If the next slot is more than ``max_wait`` away.
+        """
+        interval_ms = int(self.intervals[kind] * 1000)
+        wait_ms = self._reserve(keys=[f"{self.namespace}/{kind}"], args=[interval_ms, int(self.max_wait * 1000)])
+        if wait_ms < 0:
+            raise ArxivRateLimited(f"arXiv {kind} requests are booked up for more than {self.max_wait}s")
+        return wait_ms / 1000
+
+    def wait(self, kind: str, cancel: threading.Event | None = None) -> bool:
+        """Block until this process may send a request of ``kind``.
+
+        Returns:
+            False if ``cancel`` was set while waiting.
+        """
+        delay = self.reserve(kind)
+        if delay > 1:
+            logger.info(f"Waiting {delay:.1f}s for an arXiv {kind} slot")
+        if cancel is not None:
+            return not cancel.wait(delay)
+        time.sleep(delay)
+        return True
+
+
+_limiter: Optional[ArxivRateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_arxiv_limiter() -> ArxivRateLimiter:
+    """Process-wide limiter configured from the ARXIV_*_INTERVAL_SECONDS settings."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = ArxivRateLimiter.from_url(
+                settings.REDIS_URL,
+                intervals={API: settings.ARXIV_API_INTERVAL_SECONDS, PDF: settings.ARXIV_PDF_INTERVAL_SECONDS},
+                max_wait=settings.ARXIV_MAX_WAIT_SECONDS,
+            )
+        return _limiter
+
+
+def throttle(kind: str, cancel: threading.Event | None = None) -> bool:
+    """Wait for an arXiv slot of ``kind`` unless its interval is 0 (disabled).
+
+    Returns:
+        False if ``cancel`` was set while waiting.
+
+    Raises:
+        ArxivRateLimited: If the wait would exceed ARXIV_MAX_WAIT_SECONDS.
+    """
+    interval = settings.ARXIV_API_INTERVAL_SECONDS if kind == API else settings.ARXIV_PDF_INTERVAL_SECONDS
+    if interval <= 0:
+        return True
+    return get_arxiv_limiter().wait(kind, cancel)
+
+
+class ThrottledArxivClient(arxiv.Client):
+    """``arxiv.Client`` whose every feed request (each page and retry) waits for an API slot."""
+
+    def _parse_feed(self, url: str, first_page: bool = True, _try_index: int = 0):
+        throttle(API)
+        return super()._parse_feed(url, first_page=first_page, _try_index=_try_index)
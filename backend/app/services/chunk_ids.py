@@ -0,0 +1,99 @@
+"""Deterministic, content-addressed IDs for parent documents and child chunks.
+
+Re-ingesting the same paper yields the same IDs, so Qdrant upserts and
+docstore writes overwrite the previous copy instead of adding a duplicate.
+"""
+import hashlib
+import uuid
+from collections import defaultdict
+from typing import Iterable, List, Tuple
+
+from langchain_core.documents import Document
+
+# Fixed namespace so IDs are stable across processes and deployments.
+CHUNK_NAMESPACE = uuid.UUID("6f1c3a52-8d0e-5b7a-9c41-2e3f5a6b7c8d")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _section_of(metadata: dict) -> str:
+    for key in ("section_title", "section_number", "para"):
+        if metadata.get(key) is not None:
+            return str(metadata[key])
+    return ""
+
+
+def parent_document_id(doc: Document) -> str:
+    """ID of a parent from (paper id, section, content hash)."""
+    paper_id = doc.metadata.get("id", "")
+    name = f"{paper_id}|{_section_of(doc.metadata)}|{content_hash(doc.page_content)}"
+    return str(uuid.uuid5(CHUNK_NAMESPACE, name))
+
+
+def child_point_id(parent_id: str, chunk: Document) -> str:
+    """ID of a child chunk from (parent id, start index, content hash)."""
+    name = f"{parent_id}|{chunk.metadata.get('start_index', '')}|{content_hash(chunk.page_content)}"
+    return str(uuid.uuid5(CHUNK_NAMESPACE, name))
+
+
+def find_duplicates(points: Iterable[Tuple[str, dict]], id_key: str = "doc_id") -> Tuple[List[str], List[str]]:
+    """Plan the removal of duplicate chunks written before IDs were deterministic.
+
+    A parent is identified by its paper and the set of its children
+    (start index + content hash). When several parent IDs of the same paper
+    have identical children, one copy is kept and the others are removed.
+    Repeated children under a single parent are removed as well. Points
+    without a parent (whole-paper chunks from ``add_paper``) are duplicates
+    when paper, section and content hash match, as in
+    :func:`parent_document_id`.
+
+    ``points`` is consumed once, so it can be a generator over a scroll:
+    only IDs and content hashes are kept.
+
+    Args:
+        points: (point id, payload) pairs as stored by QdrantVectorStore.
+        id_key: Metadata key holding the parent ID.
+
+    Returns:
+        (point IDs to delete, parent IDs to delete from the docstore)
+    """
+    children = defaultdict(list)  # parent id -> [(point id, child signature)]
+    paper_of = {}
+    whole = {}  # (paper id, section, content hash) -> kept point id
+    point_ids: List[str] = []
+    for point_id, payload in points:
+        metadata = payload.get("metadata") or {}
+        parent_id = metadata.get(id_key)
+        if parent_id is None:
+            key = (metadata.get("id", ""), _section_of(metadata), content_hash(payload.get("page_content", "")))
+            kept_id = whole.setdefault(key, str(point_id))
+            if kept_id != str(point_id):
+                # Keep the smallest ID so reruns agree on the copy.
+                whole[key], duplicate = sorted((kept_id, str(point_id)))
+                point_ids.append(duplicate)
+            continue
+        signature = f"{metadata.get('start_index', '')}|{content_hash(payload.get('page_content', ''))}"
+        children[parent_id].append((str(point_id), signature))
+        paper_of[parent_id] = metadata.get("id", "")
+
+    parent_ids: List[str] = []
+    kept = {}
+    # Sorting makes the kept copy stable across runs.
+    for parent_id in sorted(children):
+        seen = set()
+        unique_children = []
+        for point_id, signature in sorted(children[parent_id]):
+            if signature in seen:
+                point_ids.append(point_id)
+            else:
+                seen.add(signature)
+                unique_children.append(point_id)
+        key = (paper_of[parent_id], frozenset(seen))
+        if key in kept:
+            point_ids.extend(unique_children)
+            parent_ids.append(parent_id)
+        else:
+            kept[key] = parent_id
+    return point_ids, parent_ids
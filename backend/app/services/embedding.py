@@ -0,0 +1,150 @@
+import logging
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+def _default_token_counter() -> Callable[[str], int]:
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable, estimating tokens from length: {e}")
+        return lambda text: max(1, len(text) // 4)
+
+
+class ConcurrentBatchEmbeddings(Embeddings):
+    """Embeddings wrapper that packs texts into token-bounded batches and embeds them concurrently.
+
+    Used for ingestion, where a paper (or a bulk load) produces hundreds of
+    chunks. Batches are packed in input order up to ``max_batch_tokens`` and
+    ``max_batch_size`` inputs, but are made small enough that large inputs are
+    spread over ``max_concurrency`` parallel requests. Failed batches are
+    retried with exponential backoff. Queries are passed straight through.
+
+    Safe to share between threads: ``max_concurrency`` bounds the requests
+    in flight across all concurrent callers, and ``last_stats`` is per thread.
+    """
+
+    def __init__(
+        self,
+        base: Embeddings,
+        *,
+        max_batch_tokens: int = 250_000,
+        max_batch_size: int = 2048,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        min_batch_size: int = 16,
+        token_counter: Callable[[str], int] | None = None,
+    ):
+        """Initialize ConcurrentBatchEmbeddings.
+
+        Args:
+            base: The embedding model doing the actual requests
+            max_batch_tokens: Token limit per request (OpenAI allows 300k)
+            max_batch_size: Input count limit per request (OpenAI allows 2048)
+            max_concurrency: Number of requests in flight at once, across all callers
+            max_retries: Retries per batch before the whole call fails
+            min_batch_size: Do not split below this many inputs per batch to gain concurrency
+            token_counter: Function returning the token count of a text
+        """
+        self.base = base
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.min_batch_size = min_batch_size
+        self._count_tokens = token_counter
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._local = threading.local()
+
+    @property
+    def last_stats(self) -> dict:
+        """Throughput of the last ``embed_documents`` call made by this thread."""
+        return getattr(self._local, "stats", {})
+
+    @property
+    def count_tokens(self) -> Callable[[str], int]:
+        if self._count_tokens is None:
+            self._count_tokens = _default_token_counter()
+        return self._count_tokens
+
+    def pack_batches(self, token_counts: List[int]) -> List[range]:
+        """Split input positions into contiguous batches.
+
+        Returns:
+            Ranges of input indices, one per request.
+        """
+        total = sum(token_counts)
+        # Aim for at least max_concurrency batches so big inputs run in parallel.
+        budget = min(self.max_batch_tokens, max(1, math.ceil(total / self.max_concurrency)))
+        batches = []
+        start, tokens = 0, 0
+        for i, count in enumerate(token_counts):
+            size = i - start
+            full = size >= self.max_batch_size or (
+                tokens + count > budget and size >= self.min_batch_size
+            ) or tokens + count > self.max_batch_tokens
+            if size and full:
+                batches.append(range(start, i))
+                start, tokens = i, 0
+            tokens += count
+        if start < len(token_counts):
+            batches.append(range(start, len(token_counts)))
+        return batches
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._slots:
+                    return self.base.embed_documents(texts)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = min(30.0, 2 ** attempt) * (0.5 + random.random())
+                logger.warning(
+                    f"Embedding batch of {len(texts)} failed ({type(e).__name__}: {e}); "
+                    f"retry {attempt + 1}/{self.max_retries} in {delay:.1f}s"
+                )
+                time.sleep(delay)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        start = time.perf_counter()
+        token_counts = [self.count_tokens(t) for t in texts]
+        batches = self.pack_batches(token_counts)
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as pool:
+            results = list(pool.map(lambda r: self._embed_batch(texts[r.start:r.stop]), batches))
+
+        vectors = [vector for batch_vectors in results for vector in batch_vectors]
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        total_tokens = sum(token_counts)
+        self._local.stats = stats = {
+            "chunks": len(texts),
+            "tokens": total_tokens,
+            "batches": len(batches),
+            "seconds": round(elapsed, 3),
+            "chunks_per_s": round(len(texts) / elapsed, 1),
+            "tokens_per_s": round(total_tokens / elapsed, 1),
+        }
+        logger.info(
+            f"Embedded {len(texts)} chunks ({total_tokens} tokens) in {len(batches)} batches, "
+            f"{elapsed:.2f}s: {stats['chunks_per_s']} chunks/s, {stats['tokens_per_s']} tokens/s"
+        )
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.base.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.base.aembed_query(text)
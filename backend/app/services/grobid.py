@@ -0,0 +1,342 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple, Union
+
+import requests
+
+from app.core.config import settings
+from app.services.tei_parser import combine_tei
+
+logger = logging.getLogger(__name__)
+
+FULLTEXT_PATH = "/api/processFulltextDocument"
+
+
+class GrobidError(RuntimeError):
+    """A Grobid request failed; keeps the raw response for diagnostics."""
+
+    def __init__(self, message: str, status_code: int | None = None, response_text: str = "", timeout: bool = False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response_text = response_text
+        # Grobid accepted the request but did not answer in time
+        self.timeout = timeout
+
+
+def fulltext_endpoint(server_url: str) -> str:
+    """Accept either the Grobid base URL or the full processFulltextDocument URL."""
+    url = server_url.rstrip("/")
+    return url if url.endswith(FULLTEXT_PATH) else url + FULLTEXT_PATH
+
+
+def process_fulltext(
+    pdf: Union[bytes, BinaryIO],
+    *,
+    filename: str = "paper.pdf",
+    server_url: str | None = None,
+    timeout: float = 60,
+    start: int | None = None,
+    end: int | None = None,
+) -> bytes:
+    """Send one PDF to Grobid and return the TEI XML.
+
+    Args:
+        pdf: PDF content or an open binary file
+        filename: Name reported in the multipart upload
+        server_url: Grobid server, defaults to GROBID_SERVER_URL
+        timeout: Request timeout in seconds
+        start: First page to parse (1-based), defaults to the first page
+        end: Last page to parse, inclusive, defaults to the last page
+
+    Raises:
+        GrobidError: On connection errors, non-200 responses or empty bodies.
+    """
+    url = fulltext_endpoint(server_url or settings.GROBID_SERVER_URL)
+    data = {
+        "generateIDs": "1",
+        "consolidateHeader": "0",
+        "segmentSentences": "1",
+        "teiCoordinates": ["head", "s", "figure"],
+    }
+    if start is not None:
+        data["start"] = str(start)
+    if end is not None:
+        data["end"] = str(end)
+    try:
+        response = requests.post(
+            url,
+            files={"input": (filename, pdf, "application/pdf", {"Expires": "0"})},
+            data=data,
+            timeout=timeout,
+        )
+    except requests.RequestException as e:
+        raise GrobidError(
+            f"Grobid request to {url} failed: {type(e).__name__}: {e}",
+            timeout=isinstance(e, requests.ReadTimeout),
+        ) from e
+
+    if response.status_code != 200 or not response.content:
+        # Only failed responses are logged; successful TEI is never dumped.
+        logger.error(
+            f"Grobid returned status={response.status_code} for {filename} "
+            f"content-type={response.headers.get('content-type')} "
+            f"len={len(response.content)} preview={response.text[:400]!r}"
+        )
+        raise GrobidError(
+            f"Grobid returned status {response.status_code} for {filename}",
+            status_code=response.status_code,
+            response_text=response.text,
+        )
+    return response.content
+
+
+def page_ranges(page_count: int, pages_per_range: int) -> List[Tuple[int, int]]:
+    """Split ``page_count`` pages into consecutive inclusive ``(start, end)`` ranges.
+
+    Every range but the last has exactly ``pages_per_range`` pages, which
+    :func:`~app.services.tei_parser.iter_tei` relies on to tell range-relative
+    page numbers from absolute ones.
+    """
+    size = max(1, pages_per_range)
+    return [(start, min(start + size - 1, page_count)) for start in range(1, page_count + 1, size)]
+
+
+def _gather_ranges(futures: List["Future[bytes]"], ranges: Sequence[Tuple[int, int]]) -> "Future[bytes]":
+    """Future of the TEI of all page ranges, combined in page order.
+
+    Fails with the first range that fails; ranges still queued are cancelled.
+    """
+    combined: "Future[bytes]" = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def on_done(future: "Future[bytes]") -> None:
+        if future.cancelled():
+            return
+        error = future.exception()
+        with lock:
+            if combined.done():
+                return
+            if error is not None:
+                combined.set_exception(error)
+            else:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+        if error is not None:
+            for other in futures:
+                other.cancel()
+            return
+        try:
+            combined.set_result(combine_tei([(start, f.result()) for (start, _), f in zip(ranges, futures)]))
+        except Exception as e:
+            combined.set_exception(e)
+
+    for future in futures:
+        future.add_done_callback(on_done)
+    return combined
+
+
+class GrobidInstance:
+    """One Grobid server with its in-flight request count and health state."""
+
+    def __init__(self, url: str, max_concurrency: int):
+        self.url = url.rstrip("/")
+        self.max_concurrency = max(1, max_concurrency)
+        self.outstanding = 0
+        self.healthy = True
+        self.last_check = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def base_url(self) -> str:
+        return self.url[: -len(FULLTEXT_PATH)] if self.url.endswith(FULLTEXT_PATH) else self.url
+
+
+class GrobidPool:
+    """Client pool spreading PDFs over several Grobid servers.
+
+    Each request goes to the healthy instance with the fewest outstanding
+    requests (relative to its limit). An instance never has more than
+    ``max_concurrency_per_instance`` requests in flight; callers block until
+    a slot frees up. Instances that fail with a connection error or a 5xx
+    response are marked unhealthy and the request is retried on another
+    one; unhealthy instances are probed via ``/api/isalive`` at most every
+    ``health_check_interval`` seconds and rejoin the pool once alive. If no
+    instance is healthy, all of them are tried anyway. A request that times
+    out is not retried and leaves the instance healthy.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        *,
+        max_concurrency_per_instance: int = 4,
+        health_check_interval: float = 30,
+        timeout: float = 60,
+    ):
+        """Initialize GrobidPool.
+
+        Args:
+            urls: Grobid server URLs (base URL or full processFulltextDocument URL)
+            max_concurrency_per_instance: Requests in flight per server
+            health_check_interval: Seconds between probes of an unhealthy server
+            timeout: Request timeout in seconds
+        """
+        if not urls:
+            raise ValueError("GrobidPool needs at least one server URL")
+        self.instances = [GrobidInstance(url, max_concurrency_per_instance) for url in urls]
+        self.health_check_interval = health_check_interval
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(
+            max_workers=sum(i.max_concurrency for i in self.instances),
+            thread_name_prefix="grobid",
+        )
+
+    def is_alive(self, instance: GrobidInstance) -> bool:
+        try:
+            return requests.get(f"{instance.base_url}/api/isalive", timeout=5).status_code == 200
+        except requests.RequestException:
+            return False
+
+    def check_health(self) -> Dict[str, bool]:
+        """Probe every instance now and return its health by URL."""
+        for instance in self.instances:
+            alive = self.is_alive(instance)
+            with self._cond:
+                instance.healthy = alive
+                instance.last_check = time.monotonic()
+                self._cond.notify_all()
+        return {i.url: i.healthy for i in self.instances}
+
+    def _refresh_unhealthy(self) -> None:
+        now = time.monotonic()
+        for instance in self.instances:
+            if not instance.healthy and now - instance.last_check >= self.health_check_interval:
+                instance.last_check = now
+                if self.is_alive(instance):
+                    with self._cond:
+                        instance.healthy = True
+                        self._cond.notify_all()
+                    logger.info(f"Grobid instance {instance.url} is back")
+
+    def _acquire(self, exclude: set) -> GrobidInstance:
+        self._refresh_unhealthy()
+        with self._cond:
+            while True:
+                candidates = [i for i in self.instances if i.url not in exclude] or self.instances
+                healthy = [i for i in candidates if i.healthy] or candidates
+                free = [i for i in healthy if i.outstanding < i.max_concurrency]
+                if free:
+                    instance = min(free, key=lambda i: (i.outstanding / i.max_concurrency, i.requests))
+                    instance.outstanding += 1
+                    instance.requests += 1
+                    return instance
+                self._cond.wait(timeout=1.0)
+
+    def _release(self, instance: GrobidInstance, failed: bool) -> None:
+        with self._cond:
+            instance.outstanding -= 1
+            if failed:
+                instance.failures += 1
+                instance.healthy = False
+                instance.last_check = time.monotonic()
+            self._cond.notify_all()
+
+    def process(
+        self,
+        pdf: Union[bytes, BinaryIO],
+        *,
+        filename: str = "paper.pdf",
+        pages: Optional[Tuple[int, int]] = None,
+    ) -> bytes:
+        """Parse one PDF, or only its ``pages`` (first, last), on the least loaded healthy instance.
+
+        Raises:
+            GrobidError: If every attempted instance failed, or Grobid rejected the PDF.
+        """
+        tried: set = set()
+        start = pdf.tell() if hasattr(pdf, "tell") else None
+        page_args = {"start": pages[0], "end": pages[1]} if pages else {}
+        while True:
+            instance = self._acquire(tried)
+            tried.add(instance.url)
+            try:
+                result = process_fulltext(
+                    pdf, filename=filename, server_url=instance.url, timeout=self.timeout, **page_args
+                )
+            except GrobidError as e:
+                # Connection errors and 5xx are the server's fault; 4xx means a bad PDF.
+                # A read timeout is most likely the PDF's fault too: trying it on
+                # every other instance would only time them all out as well.
+                server_fault = not e.timeout and (e.status_code is None or e.status_code >= 500)
+                self._release(instance, failed=server_fault)
+                if not server_fault or len(tried) >= len(self.instances):
+                    raise
+                logger.warning(f"Grobid instance {instance.url} failed ({e}); retrying {filename} elsewhere")
+                if start is not None:
+                    pdf.seek(start)
+                continue
+            self._release(instance, failed=False)
+            return result
+
+    def submit(
+        self,
+        pdf: Union[bytes, BinaryIO],
+        *,
+        filename: str = "paper.pdf",
+        page_ranges: Optional[Sequence[Tuple[int, int]]] = None,
+    ) -> "Future[bytes]":
+        """Queue a PDF for parsing and return a Future with its TEI XML.
+
+        With several ``page_ranges`` (see :func:`page_ranges`), each range is
+        a separate request, so a long PDF is parsed on several instances at
+        once; the result is a ``teiCorpus`` of the range TEI documents in
+        order, which :func:`~app.services.tei_parser.parse_tei` stitches back
+        together.
+        """
+        data = pdf if isinstance(pdf, bytes) else pdf.read()
+        if not page_ranges or len(page_ranges) < 2:
+            return self._executor.submit(self.process, data, filename=filename)
+        futures = [self._executor.submit(self.process, data, filename=filename, pages=r) for r in page_ranges]
+        return _gather_ranges(futures, page_ranges)
+
+    async def aprocess(self, pdf: Union[bytes, BinaryIO], *, filename: str = "paper.pdf") -> bytes:
+        return await asyncio.wrap_future(self.submit(pdf, filename=filename))
+
+    def stats(self) -> List[dict]:
+        with self._cond:
+            return [
+                {
+                    "url": i.url,
+                    "healthy": i.healthy,
+                    "outstanding": i.outstanding,
+                    "max_concurrency": i.max_concurrency,
+                    "requests": i.requests,
+                    "failures": i.failures,
+                }
+                for i in self.instances
+            ]
+
+
+_pool: GrobidPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_grobid_pool() -> GrobidPool:
+    """Process-wide pool built from GROBID_SERVER_URLS / GROBID_SERVER_URL."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = GrobidPool(
+                settings.grobid_server_urls,
+                max_concurrency_per_instance=settings.GROBID_MAX_CONCURRENCY_PER_INSTANCE,
+                health_check_interval=settings.GROBID_HEALTH_CHECK_INTERVAL_SECONDS,
+                timeout=settings.GROBID_TIMEOUT_SECONDS,
+            )
+        return _pool
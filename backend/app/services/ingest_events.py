@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+import orjson
+import redis
+
+from app.agent.RedisDocumentStore import get_connection_pool
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Stages in the order a paper goes through them; the last three are final.
+STAGES = ("queued", "resolving", "downloading", "parsing", "embedding", "indexed", "skipped", "failed")
+TERMINAL_STAGES = frozenset({"indexed", "skipped", "failed"})
+
+
+# KEYS[1] sequence, KEYS[2] latest event; ARGV[1] event JSON object without
+# "seq", ARGV[2] ttl in seconds, ARGV[3] channel. Numbers, stores and
+# publishes the event in one step, so the stored latest event is always the
+# one with the highest number.
+_PUBLISH = """
+local seq = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+local event = '{"seq":' .. seq .. ',' .. string.sub(ARGV[1], 2)
+redis.call('SET', KEYS[2], event, 'EX', ARGV[2])
+redis.call('PUBLISH', ARGV[3], event)
+return seq
+"""
+
+
+def terminal_stage(result: dict) -> str:
+    """Final stage matching an ingestion result dict."""
+    if not result.get("success"):
+        return "failed"
+    return "skipped" if result.get("method") == "skipped" else "indexed"
+
+
+class IngestEvents:
+    """Per-paper ingestion progress, published by workers through Redis.
+
+    Every stage transition is published on the status task's channel and
+    kept as the task's latest event (expiring after ``ttl`` seconds), so a
+    client that connects late still gets the current stage first. Events of
+    a task are numbered (``seq``) by a Redis counter, so readers can order
+    them without comparing clocks of different workers. Publishing is best
+    effort and never fails an ingestion.
+    """
+
+    def __init__(self, client: redis.Redis, ttl: int, namespace: str = "ingest_events"):
+        self.client = client
+        self.ttl = ttl
+        self.namespace = namespace
+        self._publish = client.register_script(_PUBLISH)
+
+    @classmethod
+    def from_url(cls, redis_url: str, ttl: int) -> "IngestEvents":
+        return cls(redis.Redis(connection_pool=get_connection_pool(redis_url)), ttl)
+
+    def channel(self, task_id: str) -> str:
+        return f"{self.namespace}/{task_id}"
+
+    def latest_key(self, task_id: str) -> str:
+        return f"{self.namespace}/{task_id}/latest"
+
+    def seq_key(self, task_id: str) -> str:
+        return f"{self.namespace}/{task_id}/seq"
+
+    def publish(self, task_id: str, paper_id: str, stage: str, result: Optional[dict] = None) -> None:
+        event = {"taskId": task_id, "paperId": paper_id, "stage": stage, "ts": time.time()}
+        if result is not None:
+            event["result"] = result
+        try:
+            self._publish(
+                keys=[self.seq_key(task_id), self.latest_key(task_id)],
+                args=[orjson.dumps(event), self.ttl, self.channel(task_id)],
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Could not publish {stage} event for {paper_id}: {e}")
+
+    def finish(self, task_id: str, result: dict) -> None:
+        self.publish(task_id, result.get("paperId", ""), terminal_stage(result), result)
+
+    def latest(self, task_ids: Sequence[str]) -> Dict[str, dict]:
+        """Latest event of each task that has published one."""
+        if not task_ids:
+            return {}
+        values = self.client.mget([self.latest_key(t) for t in task_ids])
+        return {t: orjson.loads(v) for t, v in zip(task_ids, values) if v is not None}
+
+
+class StageReporter:
+    """Publishes the stages of one paper under its status task ID."""
+
+    def __init__(self, events: Optional[IngestEvents], task_id: Optional[str], paper_id: str):
+        self.events = events
+        self.task_id = task_id
+        self.paper_id = paper_id
+
+    def __call__(self, stage: str) -> None:
+        if self.events is not None and self.task_id:
+            self.events.publish(self.task_id, self.paper_id, stage)
+
+    def finish(self, result: dict) -> dict:
+        if self.events is not None and self.task_id:
+            self.events.finish(self.task_id, result)
+        return result
+
+
+_events: Optional[IngestEvents] = None
+_events_lock = threading.Lock()
+
+
+def get_ingest_events() -> IngestEvents:
+    global _events
+    with _events_lock:
+        if _events is None:
+            _events = IngestEvents.from_url(settings.REDIS_URL, ttl=settings.INGEST_EVENTS_TTL_SECONDS)
+        return _events
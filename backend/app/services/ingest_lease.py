@@ -0,0 +1,190 @@
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import orjson
+import redis
+
+from app.agent.RedisDocumentStore import get_connection_pool
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] lease, KEYS[2] result; ARGV[1] token, ARGV[2] ttl in ms. The
+# previous holder's result is dropped with the same step that takes the
+# lease, so waiters never mistake it for the new holder's.
+_ACQUIRE = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    redis.call('DEL', KEYS[2])
+    return 1
+end
+return 0
+"""
+
+# KEYS[1] lease; ARGV[1] token, ARGV[2] ttl in ms
+_RENEW = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# KEYS[1] lease, KEYS[2] followers; ARGV[1] status task ID
+_FOLLOW = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('RPUSH', KEYS[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+# KEYS[1] lease, KEYS[2] result, KEYS[3] channel, KEYS[4] followers;
+# ARGV[1] token, ARGV[2] result JSON ('' for none), ARGV[3] result ttl in
+# seconds. The result is written before the lease disappears, so a waiter
+# that finds no lease and no result knows the holder gave up. Returns false
+# if the token did not hold the lease, else the followers handed the result
+# (none without a result: the next holder finishes them).
+_RELEASE = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return false
+end
+local followers = {}
+if ARGV[2] ~= '' then
+    redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+    followers = redis.call('LRANGE', KEYS[4], 0, -1)
+    redis.call('DEL', KEYS[4])
+end
+redis.call('DEL', KEYS[1])
+redis.call('PUBLISH', KEYS[3], '1')
+return followers
+"""
+
+
+class PaperLeases:
+    """Per-paper ingestion leases in Redis, so a paper is ingested once at a time.
+
+    The first task to ``acquire`` a paper's lease ingests it and keeps the
+    lease alive with ``heartbeat``; its ``release`` stores the result for a
+    while and wakes everyone in ``wait``. A lease that is not renewed
+    expires after ``ttl`` seconds, so a crashed worker blocks others only
+    that long, after which a waiter takes over.
+
+    Instead of waiting, a task can ``follow`` the holder: ``release`` then
+    hands back the follower's status task ID so the holder reports its
+    result there too. Followers outlive a holder that gives up or crashes
+    and are handed to whichever task next releases the paper with a result.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        ttl: int,
+        result_ttl: int = 600,
+        namespace: str = "ingest_lease",
+        poll_interval: float = 1.0,
+    ):
+        self.client = client
+        self.ttl_ms = ttl * 1000
+        self.result_ttl = result_ttl
+        self.namespace = namespace
+        self.poll_interval = poll_interval
+        self._acquire = client.register_script(_ACQUIRE)
+        self._renew = client.register_script(_RENEW)
+        self._release = client.register_script(_RELEASE)
+        self._follow = client.register_script(_FOLLOW)
+
+    @classmethod
+    def from_url(cls, redis_url: str, ttl: int) -> "PaperLeases":
+        return cls(redis.Redis(connection_pool=get_connection_pool(redis_url)), ttl)
+
+    def _keys(self, paper_id: str) -> list[str]:
+        prefix = f"{self.namespace}/{paper_id}"
+        return [prefix, f"{prefix}/result", f"{prefix}/done", f"{prefix}/followers"]
+
+    def acquire(self, paper_id: str) -> Optional[str]:
+        """Take the lease; returns its token, or None if someone else holds it."""
+        token = uuid.uuid4().hex
+        if self._acquire(keys=self._keys(paper_id)[:2], args=[token, self.ttl_ms]):
+            return token
+        return None
+
+    def renew(self, paper_id: str, token: str, ttl: Optional[float] = None) -> bool:
+        """Reset the lease's expiry to ``ttl`` seconds (default: the lease TTL) if ``token`` still holds it."""
+        ttl_ms = self.ttl_ms if ttl is None else int(ttl * 1000)
+        return bool(self._renew(keys=self._keys(paper_id)[:1], args=[token, ttl_ms]))
+
+    def release(self, paper_id: str, token: str, result: Optional[dict] = None) -> list[str]:
+        """Give the lease up and publish ``result`` to waiters.
+
+        Without a result (the holder failed in a way worth retrying) waiters
+        wake up and race to take the lease over.
+
+        Returns:
+            Status task IDs of the followers that should get ``result`` too.
+        """
+        payload = orjson.dumps(result) if result is not None else b""
+        followers = self._release(keys=self._keys(paper_id), args=[token, payload, self.result_ttl])
+        return [f.decode() if isinstance(f, bytes) else f for f in followers or []]
+
+    def follow(self, paper_id: str, task_id: str) -> bool:
+        """Have the current holder report its result under ``task_id`` too.
+
+        Returns:
+            False if nobody holds the lease any more (try to ``acquire`` it).
+        """
+        lease_key, _, _, followers_key = self._keys(paper_id)
+        return bool(self._follow(keys=[lease_key, followers_key], args=[task_id]))
+
+    @contextmanager
+    def heartbeat(self, paper_id: str, token: str) -> Iterator[None]:
+        """Renew the lease in the background for the duration of the block."""
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(self.ttl_ms / 3000):
+                try:
+                    if not self.renew(paper_id, token):
+                        logger.warning(f"Ingestion lease for {paper_id} was lost")
+                        return
+                except redis.RedisError as e:
+                    logger.warning(f"Renewing ingestion lease for {paper_id} failed: {e}")
+
+        thread = threading.Thread(target=run, name=f"lease-{paper_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def wait(self, paper_id: str, timeout: float) -> Optional[dict]:
+        """Wait for the lease holder's result.
+
+        Returns:
+            The result the holder released with, or None once the lease is
+            gone without one (released for retry, or expired after a crash).
+
+        Raises:
+            TimeoutError: The lease is still held after ``timeout`` seconds.
+        """
+        lease_key, result_key, channel, _ = self._keys(paper_id)
+        deadline = time.monotonic() + timeout
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        # Subscribe before looking at the keys so a release in between is not missed.
+        pubsub.subscribe(channel)
+        try:
+            while True:
+                result = self.client.get(result_key)
+                if result is not None:
+                    return orjson.loads(result)
+                if not self.client.exists(lease_key):
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Ingestion lease for {paper_id} still held after {timeout:.0f}s")
+                # Expiry publishes nothing, so poll as well as listen.
+                pubsub.get_message(timeout=min(remaining, self.poll_interval))
+        finally:
+            pubsub.close()
@@ -0,0 +1,113 @@
+import threading
+import time
+from typing import Optional
+
+import orjson
+import redis
+
+from app.agent.RedisDocumentStore import get_connection_pool
+from app.core.config import settings
+
+INTERACTIVE_QUEUE = "ingest.interactive"
+BULK_QUEUE = "ingest.bulk"
+# Redis broker message priority (0 is served first) of bulk tasks. It keeps
+# bulk papers behind interactive ones on the shared stage queues of
+# INGEST_PIPELINE=staged.
+BULK_PRIORITY = 9
+
+# KEYS[1] slots of one user, KEYS[2] their waiting task IDs, KEYS[3] waiting
+# papers by task ID; ARGV[1] now, ARGV[2] limit, ARGV[3] ttl in seconds,
+# ARGV[4] task ID giving its slot back ('' for none), ARGV[5] task ID to
+# queue and ARGV[6] its paper ('' for none). Slots are task IDs scored by
+# their expiry, so slots of tasks that died without releasing them free up
+# on their own. Waiting papers take free slots in the order they came in;
+# returns the task ID and paper of each one admitted.
+_ADMIT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if ARGV[4] ~= '' then
+    redis.call('ZREM', KEYS[1], ARGV[4])
+end
+if ARGV[5] ~= '' then
+    redis.call('RPUSH', KEYS[2], ARGV[5])
+    redis.call('HSET', KEYS[3], ARGV[5], ARGV[6])
+end
+local admitted = {}
+while redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) do
+    local task_id = redis.call('LPOP', KEYS[2])
+    if not task_id then
+        break
+    end
+    table.insert(admitted, task_id)
+    table.insert(admitted, redis.call('HGET', KEYS[3], task_id))
+    redis.call('HDEL', KEYS[3], task_id)
+    redis.call('ZADD', KEYS[1], ARGV[1] + ARGV[3], task_id)
+end
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return admitted
+"""
+
+
+class UserSlots:
+    """Per-user limit on interactive ingestion tasks in flight, in Redis.
+
+    A user gets at most ``per_user`` papers on the interactive queue at a
+    time. The rest wait in a per-user list and are admitted, oldest first,
+    as the user's own papers finish, so one user adding fifty papers cannot
+    delay the first paper of everyone else, and is not put behind bulk
+    loads either. A slot whose task died is reclaimed after ``ttl`` seconds,
+    on the user's next submit or release.
+    """
+
+    def __init__(self, client: redis.Redis, per_user: int, ttl: int, namespace: str = "ingest_slots"):
+        self.client = client
+        self.per_user = per_user
+        self.ttl = ttl
+        self.namespace = namespace
+        self._admit = client.register_script(_ADMIT)
+
+    @classmethod
+    def from_url(cls, redis_url: str, per_user: int, ttl: int) -> "UserSlots":
+        return cls(redis.Redis(connection_pool=get_connection_pool(redis_url)), per_user, ttl)
+
+    def _keys(self, user_id: str) -> list[str]:
+        prefix = f"{self.namespace}/{user_id}"
+        return [prefix, f"{prefix}/waiting", f"{prefix}/papers"]
+
+    def _run(self, user_id: str, released: str = "", task_id: str = "", paper: bytes = b"") -> list[tuple[str, dict]]:
+        flat = self._admit(
+            keys=self._keys(user_id), args=[time.time(), self.per_user, self.ttl, released, task_id, paper]
+        )
+        return [(flat[i].decode(), orjson.loads(flat[i + 1])) for i in range(0, len(flat), 2)]
+
+    def submit(self, user_id: str, task_id: str, paper_dict: dict) -> list[tuple[str, dict]]:
+        """Queue a paper behind the user's earlier ones; returns the (task ID, paper) pairs now admitted."""
+        return self._run(user_id, task_id=task_id, paper=orjson.dumps(paper_dict))
+
+    def release(self, user_id: str, task_id: str) -> list[tuple[str, dict]]:
+        """Give a finished task's slot back; returns the (task ID, paper) pairs it admits."""
+        return self._run(user_id, released=task_id)
+
+    def in_flight(self, user_id: str) -> int:
+        return self.client.zcount(self._keys(user_id)[0], time.time(), "+inf")
+
+    def waiting(self, user_id: str) -> int:
+        return self.client.llen(self._keys(user_id)[1])
+
+
+_slots: Optional[UserSlots] = None
+_slots_lock = threading.Lock()
+
+
+def get_user_slots() -> UserSlots:
+    """Process-wide slot counter configured from INGEST_INTERACTIVE_SLOTS_PER_USER."""
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = UserSlots.from_url(
+                settings.REDIS_URL,
+                per_user=settings.INGEST_INTERACTIVE_SLOTS_PER_USER,
+                ttl=settings.INGEST_INTERACTIVE_SLOT_TTL_SECONDS,
+            )
+        return _slots
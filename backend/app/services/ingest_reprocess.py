@@ -0,0 +1,55 @@
+import logging
+import threading
+from typing import List, Optional
+
+import orjson
+import redis
+
+from app.agent.RedisDocumentStore import get_connection_pool
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ReprocessQueue:
+    """Papers indexed from the pypdf fallback, to be parsed with Grobid later.
+
+    A Redis hash from paper ID to the S2 paper dict, which is all
+    ``scripts.reprocess_fallback`` needs to fetch the PDF again. Recording
+    is best effort and never fails an ingestion.
+    """
+
+    def __init__(self, client: redis.Redis, key: str = "ingest_reprocess"):
+        self.client = client
+        self.key = key
+
+    @classmethod
+    def from_url(cls, redis_url: str) -> "ReprocessQueue":
+        return cls(redis.Redis(connection_pool=get_connection_pool(redis_url)))
+
+    def add(self, paper_dict: dict) -> None:
+        try:
+            self.client.hset(self.key, paper_dict["paperId"], orjson.dumps(paper_dict))
+        except redis.RedisError as e:
+            logger.warning(f"Could not flag {paper_dict['paperId']} for Grobid re-processing: {e}")
+
+    def items(self) -> List[dict]:
+        return [orjson.loads(v) for v in self.client.hvals(self.key)]
+
+    def remove(self, paper_id: str) -> None:
+        self.client.hdel(self.key, paper_id)
+
+    def __len__(self) -> int:
+        return self.client.hlen(self.key)
+
+
+_queue: Optional[ReprocessQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_reprocess_queue() -> ReprocessQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = ReprocessQueue.from_url(settings.REDIS_URL)
+        return _queue
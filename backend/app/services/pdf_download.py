@@ -0,0 +1,145 @@
+import logging
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import BinaryIO, Callable, Sequence, TypeVar
+
+import requests
+
+from app.core.config import settings
+from app.services.arxiv_rate_limit import PDF, is_arxiv_url, throttle
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# A PDF starts with this marker, though some files have junk before it
+PDF_MAGIC = b"%PDF-"
+PDF_HEADER_WINDOW = 1024
+
+T = TypeVar("T")
+
+
+class DownloadCancelled(Exception):
+    """Another mirror delivered the PDF first."""
+
+
+def spool_pdf(
+    url: str,
+    *,
+    timeout: float = 60,
+    cancel: threading.Event | None = None,
+    params: dict | None = None,
+) -> tempfile.SpooledTemporaryFile:
+    """Stream a PDF download into a private spooled file.
+
+    The file stays in memory up to PDF_SPOOL_MAX_MEMORY_BYTES and rolls over
+    to an anonymous temp file in PDF_DOWNLOAD_DIR beyond that. Each call gets
+    its own file, so concurrent tasks never see each other's PDFs, and
+    nothing is left on disk once the file is closed. Downloads from arXiv
+    first wait for a slot of the shared arXiv rate limit.
+
+    Returns:
+        The spooled file, positioned at the start. The caller closes it.
+
+    Raises:
+        requests.HTTPError: If the download fails.
+        ValueError: If the response is empty, larger than
+            PDF_MAX_DOWNLOAD_BYTES or not a PDF (e.g. an HTML landing page).
+        DownloadCancelled: If ``cancel`` was set before the download finished.
+        ArxivRateLimited: If arXiv is booked up for longer than ARXIV_MAX_WAIT_SECONDS.
+    """
+    if is_arxiv_url(url) and not throttle(PDF, cancel):
+        raise DownloadCancelled(url)
+    Path(settings.PDF_DOWNLOAD_DIR).mkdir(parents=True, exist_ok=True)
+    spool = tempfile.SpooledTemporaryFile(
+        max_size=settings.PDF_SPOOL_MAX_MEMORY_BYTES, dir=settings.PDF_DOWNLOAD_DIR, suffix=".pdf"
+    )
+    try:
+        head = b""
+        with requests.get(url, params=params, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if cancel is not None and cancel.is_set():
+                    raise DownloadCancelled(url)
+                if len(head) < PDF_HEADER_WINDOW:
+                    head += chunk[:PDF_HEADER_WINDOW - len(head)]
+                    if len(head) == PDF_HEADER_WINDOW and PDF_MAGIC not in head:
+                        raise ValueError(f"Not a PDF: {url}")
+                spool.write(chunk)
+                if spool.tell() > settings.PDF_MAX_DOWNLOAD_BYTES:
+                    raise ValueError(f"PDF from {url} exceeds {settings.PDF_MAX_DOWNLOAD_BYTES} bytes")
+        size = spool.tell()
+        if size == 0:
+            raise ValueError(f"Empty PDF downloaded from {url}")
+        if PDF_MAGIC not in head:
+            raise ValueError(f"Not a PDF: {url}")
+        spool.seek(0)
+    except Exception:
+        spool.close()
+        raise
+    logger.info(f"Downloaded {size} bytes from {url}")
+    return spool
+
+
+def race_downloads(
+    candidates: Sequence[T],
+    fetch: Callable[[T, threading.Event], BinaryIO],
+    hedge_delay: float,
+) -> tuple[T | None, BinaryIO | None, list[tuple[T, Exception]]]:
+    """Download from several mirrors at once and keep the first good file.
+
+    Candidates start in order: the next one starts when the previous ones
+    have all failed, or after ``hedge_delay`` seconds without a result, so a
+    slow mirror cannot hold up the others. Once a file arrives, the
+    ``cancel`` event passed to ``fetch`` is set for the downloads still
+    running; files that complete anyway are closed.
+
+    Returns:
+        (candidate, open file, errors) for the first successful download,
+        or (None, None, errors) if every candidate failed.
+    """
+    queue = list(candidates)
+    errors: list[tuple[T, Exception]] = []
+    if not queue:
+        return None, None, errors
+    cancel = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=len(queue), thread_name_prefix="pdf-race")
+    running: dict[Future, T] = {}
+
+    def start_next() -> None:
+        candidate = queue.pop(0)
+        running[pool.submit(fetch, candidate, cancel)] = candidate
+
+    winner: tuple[T, BinaryIO] | None = None
+    try:
+        start_next()
+        while running and winner is None:
+            done, _ = wait(running, timeout=hedge_delay if queue else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                candidate = running.pop(future)
+                try:
+                    pdf = future.result()
+                except Exception as e:
+                    errors.append((candidate, e))
+                    continue
+                if winner is None:
+                    winner = (candidate, pdf)
+                else:
+                    pdf.close()
+            if winner is None and queue:
+                # Timed out waiting, or a mirror failed: bring in the next one.
+                start_next()
+    finally:
+        cancel.set()
+        for future in running:
+            future.add_done_callback(_close_result)
+        pool.shutdown(wait=False, cancel_futures=True)
+    if winner is None:
+        return None, None, errors
+    return winner[0], winner[1], errors
+
+
+def _close_result(future: Future) -> None:
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
@@ -0,0 +1,130 @@
+import logging
+import re
+
+import arxiv
+import requests
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.core.schema import S2Paper
+from app.services.arxiv_index import get_arxiv_index, normalize_title
+from app.services.arxiv_rate_limit import ThrottledArxivClient
+
+logger = logging.getLogger(__name__)
+
+ARXIV_PDF_URL = "https://arxiv.org/pdf/{}"
+UNPAYWALL_URL = "https://api.unpaywall.org/v2/{}"
+
+# Titles OR-ed together into one arXiv query when resolving a batch
+TITLE_QUERY_GROUP_SIZE = 10
+
+
+class PdfSource(BaseModel):
+    """Where to download a paper's PDF from, and how that was found."""
+    source: str  # arxiv_id | title_index | open_access | unpaywall | title_search | cache
+    url: str
+    arxiv_id: str | None = None
+
+
+def arxiv_client() -> arxiv.Client:
+    """arXiv API client paced by the shared rate limit; its own delay only applies if that is off."""
+    return ThrottledArxivClient(
+        delay_seconds=0 if settings.ARXIV_API_INTERVAL_SECONDS > 0 else 3.0,
+        num_retries=3
+    )
+
+
+def strip_version(arxiv_id: str) -> str:
+    return re.sub(r"v\d+$", "", arxiv_id)
+
+
+def known_sources(paper: S2Paper) -> list[PdfSource]:
+    """PDF sources that can be derived from S2 metadata alone, in preference order.
+
+    An ArXiv external ID gives the PDF URL directly, without an arXiv API
+    call or its rate-limit delay; without one, the title is looked up in the
+    offline arXiv index (ARXIV_INDEX_DIR) if there is one. The S2
+    open-access PDF comes next. With UNPAYWALL_EMAIL set, a DOI adds the
+    Unpaywall record, whose open-access location is only looked up when it
+    is downloaded.
+    """
+    sources = []
+    arxiv_id = (paper.externalIds or {}).get("ArXiv")
+    if arxiv_id:
+        sources.append(PdfSource(source="arxiv_id", url=ARXIV_PDF_URL.format(arxiv_id), arxiv_id=arxiv_id))
+    elif paper.title and (index := get_arxiv_index()) is not None:
+        arxiv_id = index.lookup(paper.title)
+        if arxiv_id:
+            sources.append(PdfSource(source="title_index", url=ARXIV_PDF_URL.format(arxiv_id), arxiv_id=arxiv_id))
+    if paper.openAccessPdf and paper.openAccessPdf.get("url"):
+        sources.append(PdfSource(source="open_access", url=paper.openAccessPdf["url"]))
+    doi = (paper.externalIds or {}).get("DOI")
+    if doi and settings.UNPAYWALL_EMAIL:
+        sources.append(PdfSource(source="unpaywall", url=UNPAYWALL_URL.format(doi)))
+    return sources
+
+
+def unpaywall_pdf_url(record_url: str, timeout: float = 10) -> str:
+    """PDF URL of the best open-access location in an Unpaywall record.
+
+    Raises:
+        requests.HTTPError: If the lookup fails (404 for unknown DOIs).
+        ValueError: If Unpaywall knows no open-access PDF of the paper.
+    """
+    response = requests.get(record_url, params={"email": settings.UNPAYWALL_EMAIL}, timeout=timeout)
+    response.raise_for_status()
+    record = response.json()
+    for location in [record.get("best_oa_location")] + (record.get("oa_locations") or []):
+        if location and location.get("url_for_pdf"):
+            return location["url_for_pdf"]
+    raise ValueError(f"No open-access PDF on Unpaywall for {record.get('doi') or record_url}")
+
+
+def _title_source(result: arxiv.Result) -> PdfSource:
+    return PdfSource(source="title_search", url=result.pdf_url, arxiv_id=result.get_short_id())
+
+
+def search_by_title(paper: S2Paper, client: arxiv.Client | None = None) -> PdfSource | None:
+    """Fall back to a fuzzy arXiv title search (rate limited, may pick a wrong paper)."""
+    if not paper.title:
+        return None
+    client = client or arxiv_client()
+    search = arxiv.Search(
+        query=f'ti:"{paper.title}"',
+        max_results=1,
+        sort_by=arxiv.SortCriterion.Relevance,
+        sort_order=arxiv.SortOrder.Descending
+    )
+    for result in client.results(search):
+        return _title_source(result)
+    return None
+
+
+def search_by_titles(papers: list[S2Paper], client: arxiv.Client | None = None) -> dict[str, PdfSource]:
+    """Search many papers on arXiv by title, several titles per query.
+
+    Results are matched on the normalized title, so a query only resolves
+    papers whose titles it actually returned.
+
+    Returns:
+        Mapping of S2 paper ID to its PDF source, for the papers found.
+    """
+    client = client or arxiv_client()
+    by_title: dict[str, S2Paper] = {}
+    for paper in papers:
+        if paper.title:
+            by_title.setdefault(normalize_title(paper.title), paper)
+
+    resolved: dict[str, PdfSource] = {}
+    titles = list(by_title.items())
+    for i in range(0, len(titles), TITLE_QUERY_GROUP_SIZE):
+        group = dict(titles[i:i + TITLE_QUERY_GROUP_SIZE])
+        query = " OR ".join(f'ti:"{paper.title.replace(chr(34), "")}"' for paper in group.values())
+        search = arxiv.Search(query=query, max_results=3 * len(group), sort_by=arxiv.SortCriterion.Relevance)
+        for result in client.results(search):
+            paper = group.get(normalize_title(result.title))
+            if paper is not None and paper.paperId not in resolved:
+                resolved[paper.paperId] = _title_source(result)
+
+    logger.info(f"Resolved {len(resolved)}/{len(papers)} papers on arXiv by title")
+    return resolved
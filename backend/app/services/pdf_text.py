@@ -0,0 +1,175 @@
+"""Local PDF text extraction with pypdf, the fallback when Grobid is unavailable.
+
+pypdf is pure Python and CPU bound, so extraction runs in a process pool
+instead of blocking the GIL shared with the worker's other tasks. The result
+is coarser than Grobid's: one document per page and section, with sections
+guessed from heading-like lines and no figure or table captions.
+"""
+import io
+import logging
+import multiprocessing
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+EXTRACTOR = "pypdf"
+
+# "3 Method", "4.2. Ablations", or a well-known unnumbered heading
+_NUMBERED_HEADING = re.compile(r"^(\d{1,2}(?:\.\d{1,2})*)\.?\s+([A-Z][^.]{1,78})$")
+_KNOWN_HEADINGS = {
+    "abstract", "introduction", "related work", "background", "preliminaries", "method",
+    "methods", "methodology", "approach", "experiments", "experimental setup", "evaluation",
+    "results", "discussion", "limitations", "conclusion", "conclusions", "future work",
+    "acknowledgements", "acknowledgments", "appendix",
+}
+# Everything after these is bibliography, which Grobid leaves out as well
+_END_HEADINGS = {"references", "bibliography"}
+
+
+class PdfTextError(ValueError):
+    """The PDF has no extractable text (e.g. a scan) or cannot be read."""
+
+
+def _heading(line: str) -> Optional[Tuple[str, str]]:
+    """(section number, title) if the line looks like a section heading."""
+    line = " ".join(line.split())
+    if not line or len(line) > 80:
+        return None
+    match = _NUMBERED_HEADING.match(line)
+    if match and len(match.group(2).split()) <= 10:
+        return match.group(1), match.group(2)
+    name = line.rstrip(":").lower()
+    if name in _KNOWN_HEADINGS or name in _END_HEADINGS:
+        return "None", line.rstrip(":").title() if line.isupper() else line.rstrip(":")
+    return None
+
+
+def split_sections(pages: List[str]) -> Tuple[str, List[dict]]:
+    """Cut page texts into per-page runs of the same section.
+
+    Returns:
+        The guessed paper title (first line of the first page) and one dict
+        per (page, section) run with ``page``, ``section_title``,
+        ``section_number`` and ``text``.
+    """
+    title = next((line.strip() for line in (pages[0] if pages else "").splitlines() if line.strip()), "")
+    section_title, section_number = "Preamble", "None"
+    chunks: List[dict] = []
+    for page_number, text in enumerate(pages, start=1):
+        lines: List[str] = []
+
+        def flush() -> None:
+            body = "\n".join(lines).strip()
+            if body:
+                chunks.append({
+                    "page": page_number,
+                    "section_title": section_title,
+                    "section_number": section_number,
+                    "text": body,
+                })
+            lines.clear()
+
+        for line in text.splitlines():
+            heading = _heading(line)
+            if heading is None:
+                lines.append(line)
+                continue
+            flush()
+            section_number, section_title = heading
+            if section_title.lower() in _END_HEADINGS:
+                return title, chunks
+        flush()
+    return title, chunks
+
+
+def extract_sections(data: bytes) -> Tuple[str, List[dict]]:
+    """Extract the text of every page and split it into sections (runs in a pool process)."""
+    from pypdf import PdfReader
+    from pypdf.errors import PyPdfError
+
+    try:
+        pages = [page.extract_text() or "" for page in PdfReader(io.BytesIO(data)).pages]
+    except PyPdfError as e:
+        raise PdfTextError(f"pypdf could not read the PDF: {e}") from e
+    return split_sections(pages)
+
+
+def count_pages(data: bytes) -> int:
+    """Number of pages of a PDF, or 0 if pypdf cannot read it."""
+    from pypdf import PdfReader
+
+    try:
+        return len(PdfReader(io.BytesIO(data)).pages)
+    except Exception:
+        return 0
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_pdf_text_pool() -> ProcessPoolExecutor:
+    """Process-wide pool of PDF_FALLBACK_WORKERS processes.
+
+    Started with ``spawn``: forking a worker that runs tasks in threads could
+    copy locks held by other threads into the children.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PDF_FALLBACK_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def parse_pdf_locally(pdf: bytes | BinaryIO, filename: str = "paper.pdf") -> List[Document]:
+    """Parse a PDF into section documents without Grobid.
+
+    Documents carry the same metadata as ``parse_tei`` output, with
+    ``pages`` set to the single page of the chunk and ``extractor`` set to
+    ``pypdf`` so they can be told apart and re-parsed with Grobid later.
+
+    Raises:
+        PdfTextError: If the PDF cannot be read or has no text.
+    """
+    global _pool
+    data = pdf if isinstance(pdf, bytes) else pdf.read()
+    try:
+        title, chunks = get_pdf_text_pool().submit(extract_sections, data).result()
+    except BrokenProcessPool as e:
+        # A pool process died (e.g. out of memory); start a new pool next time.
+        logger.warning(f"PDF text pool broke ({e}); extracting {filename} in this process")
+        with _pool_lock:
+            _pool = None
+        title, chunks = extract_sections(data)
+    except (AssertionError, OSError) as e:
+        # Daemonic prefork children may not start processes of their own.
+        logger.warning(f"PDF text pool unavailable ({e}); extracting {filename} in this process")
+        title, chunks = extract_sections(data)
+    if not chunks:
+        raise PdfTextError(f"No text could be extracted from {filename}")
+    logger.info(f"Extracted {len(chunks)} page sections from {filename} with pypdf")
+    return [
+        Document(
+            page_content=chunk["text"],
+            metadata={
+                "kind": "section",
+                "section_title": chunk["section_title"],
+                "section_number": chunk["section_number"],
+                "para": "0",
+                "pages": str((str(chunk["page"]), str(chunk["page"]))),
+                "paper_title": title or "No title found",
+                "extractor": EXTRACTOR,
+            },
+        )
+        for chunk in chunks
+    ]
@@ -1,38 +1,88 @@
 import re
-import requests
 
 from langchain_core.documents import Document
 from app.core.config import QdrantConfig
 from langchain_qdrant import QdrantVectorStore
 from qdrant_client import QdrantClient
-from qdrant_client.models import Filter, FieldCondition, MatchAny
+from qdrant_client.models import Filter, FieldCondition, MatchAny, PointIdsList, PointStruct, WithLookup
 from qdrant_client.http.models import Distance, VectorParams
 from app.core.schema import ArxivPaper
 from app.core.schema import S2Paper
 import arxiv
-from pathlib import Path
 import logging
-from langchain_community.document_loaders.generic import GenericLoader
-from langchain_community.document_loaders.parsers import GrobidParser
-from collections import defaultdict
+import threading
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_classic.retrievers import ParentDocumentRetriever
 from app.agent.RedisDocumentStore import RedisDocumentStore
+from app.agent.CachedDocumentStore import CachedDocumentStore
+from app.agent.TieredDocumentStore import TieredDocumentStore
+from app.services.retriever import ParentWindowRetriever, build_parent_windows
+from app.services.chunk_ids import find_duplicates, parent_document_id
+from app.services.qdrant_parent_store import QdrantParentStore
+from app.services.embedding import ConcurrentBatchEmbeddings
+from app.services.artifact_cache import get_artifact_cache, sha256_of
+from app.services.grobid import GrobidError, get_grobid_pool, page_ranges
+from app.services.pdf_text import count_pages, parse_pdf_locally
+from app.services.resilience import DependencyUnavailable, get_dependency
+from app.services.tei_parser import TeiParseError, parse_tei
+from app.services.pdf_download import spool_pdf
+from app.services.pdf_source import arxiv_client
 from langchain_openai import OpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
 from app.core.config import settings
 from langchain_core.runnables import ConfigurableField
-from typing import List
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Callable, List
+from collections import defaultdict
 
 
-embeddings = OpenAIEmbeddings(model=settings.EMBEDDING_MODEL_NAME)
+embeddings = ConcurrentBatchEmbeddings(
+    OpenAIEmbeddings(model=settings.EMBEDDING_MODEL_NAME, chunk_size=settings.EMBEDDING_MAX_BATCH_SIZE),
+    max_batch_tokens=settings.EMBEDDING_MAX_BATCH_TOKENS,
+    max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+    max_concurrency=settings.EMBEDDING_CONCURRENCY,
+)
 logger = logging.getLogger(__name__)
-kv_store = RedisDocumentStore(redis_url=settings.REDIS_URL)
+redis_store = RedisDocumentStore(redis_url=settings.REDIS_URL, compress=settings.PARENT_STORE_COMPRESSION)
+parent_store = (
+    TieredDocumentStore(redis_store, settings.PARENT_COLD_STORE_PATH, settings.PARENT_HOT_TTL_SECONDS)
+    if settings.PARENT_STORE_BACKEND == "tiered"
+    else redis_store
+)
+kv_store = (
+    CachedDocumentStore(parent_store, max_bytes=settings.PARENT_CACHE_MAX_BYTES, redis_client=redis_store.client)
+    if settings.PARENT_CACHE_MAX_BYTES > 0
+    else parent_store
+)
+
+
+def _cache_late_tei(future: Future, cache, sha256: str, filename: str) -> None:
+    """Keep TEI that arrived after the fallback parser took over, for re-processing."""
+    if future.exception() is not None:
+        return
+    try:
+        cache.put_tei(sha256, future.result())
+    except Exception as e:
+        logger.warning(f"Could not cache late Grobid TEI of {filename}: {e}")
+
+
+def _submit_to_grobid(pdf: bytes | BinaryIO, filename: str) -> Future:
+    """Queue a PDF on the Grobid pool, in page ranges parsed concurrently if it is long."""
+    data = pdf if isinstance(pdf, bytes) else pdf.read()
+    ranges = None
+    if settings.GROBID_SPLIT_MIN_PAGES > 0:
+        pages = count_pages(data)
+        if pages >= settings.GROBID_SPLIT_MIN_PAGES:
+            ranges = page_ranges(pages, settings.GROBID_PAGES_PER_RANGE)
+            logger.info(f"Parsing {filename} ({pages} pages) with Grobid in {len(ranges)} page ranges")
+    return get_grobid_pool().submit(data, filename=filename, page_ranges=ranges)
 
 
 class QdrantService:
 
-    def __init__(self, config: QdrantConfig):
+    def __init__(self, config: QdrantConfig, embedding: Embeddings | None = None):
         self.config = config
+        self.embedding = embedding or embeddings
         self.client = QdrantClient(url=self.config.url, api_key=self.config.api_key or None, timeout=60)
 
         self.child_splitter = RecursiveCharacterTextSplitter(
@@ -60,17 +110,36 @@ class QdrantService:
             field_schema="keyword",
         )
 
+        # Parents live either in Redis (kv_store) or, in single-store mode, in a
+        # payload-only Qdrant collection that search can join in one request.
+        # The tiered kv_store also keeps every parent in that collection.
+        if self.config.parent_store_backend == "qdrant":
+            # group_by needs the parent ID indexed for the lookup join.
+            self.client.create_payload_index(
+                collection_name=collection,
+                field_name="metadata.doc_id",
+                field_schema="keyword",
+            )
+            self.docstore = QdrantParentStore(self.client, f"{collection}_parents")
+        else:
+            if isinstance(parent_store, TieredDocumentStore) and parent_store.authority is None:
+                # Shared by every node: serves parents this node's disk never saw.
+                parent_store.authority = QdrantParentStore(self.client, f"{collection}_parents")
+            self.docstore = kv_store
+
         self.vector_store = QdrantVectorStore(
             client=self.client,
             collection_name=collection,
-            embedding=embeddings,
+            embedding=self.embedding,
         )
 
-        self.retriever = ParentDocumentRetriever(
+        self.parent_retriever = ParentWindowRetriever(
             vectorstore=self.vector_store,
-            docstore=kv_store,
-            child_splitter=self.child_splitter
-        ).configurable_fields(
+            docstore=self.docstore,
+            child_splitter=self.child_splitter,
+            window_chars=settings.PARENT_WINDOW_CHARS,
+        )
+        self.retriever = self.parent_retriever.configurable_fields(
             search_kwargs=ConfigurableField(
                 id="search_kwargs",
                 name="Search Arguments",
@@ -79,50 +148,115 @@ class QdrantService:
         )
 
     
-    def download_pdf(self, paper: 'ArxivPaper'):
-        client = arxiv.Client()
+    def download_pdf(self, paper: 'ArxivPaper') -> SpooledTemporaryFile:
+        """Download the arXiv PDF of a paper into a private spooled file."""
+        client = arxiv_client()
         result = list(client.results(arxiv.Search(id_list=[paper.id])))
         if not result:
             raise ValueError(f"No result found for paper {paper.id}")
-        file_name = re.sub(r'[<>:"/\\|?*]', '_', result[0].title.replace(" ", "_"))
-        Path(self.config.output_dir).mkdir(parents=True, exist_ok=True)
-        result[0].download_pdf(dirpath=self.config.output_dir, filename=file_name+".pdf")
-        logging.info(f"Downloaded PDF for paper {paper.id} to {self.config.output_dir}/{file_name}.pdf")
-
-    def download_pdf_batch(self, papers: list['ArxivPaper']):
-        client = arxiv.Client()
-        search = arxiv.Search(id_list=[paper.id for paper in papers])
-        results = client.results(search)
-        cnt = 0
-        for result in results:
-            file_name = re.sub(r'[<>:"/\\|?*]', '_', result.title.replace(" ", "_"))
-            Path(self.config.output_dir).mkdir(parents=True, exist_ok=True)
-            result.download_pdf(dirpath=self.config.output_dir, filename=file_name+".pdf")
-            cnt += 1
-        logging.info(f"Downloaded {cnt} papers to {self.config.output_dir}")
-
-    def empty_pdf_folder(self):
-        for file in Path(self.config.output_dir).glob("*.pdf"):
-            file.unlink()
-        logging.info(f"Emptied PDF folder {self.config.output_dir}")
+        pdf = spool_pdf(result[0].pdf_url)
+        logging.info(f"Downloaded PDF for paper {paper.id}")
+        return pdf
+
+    def download_pdf_batch(self, papers: list['ArxivPaper']) -> list[tuple['ArxivPaper', SpooledTemporaryFile]]:
+        """Download the arXiv PDFs of several papers with one metadata query.
+
+        Returns:
+            (paper, spooled PDF) pairs for the papers that were found.
+        """
+        client = arxiv_client()
+        by_id = {paper.id: paper for paper in papers}
+        downloaded = []
+        for result in client.results(arxiv.Search(id_list=list(by_id))):
+            paper = by_id.get(re.sub(r"v\d+$", "", result.get_short_id()))
+            if paper is not None:
+                downloaded.append((paper, spool_pdf(result.pdf_url)))
+        logging.info(f"Downloaded {len(downloaded)} papers")
+        return downloaded
+
+    def parse_pdf(
+        self,
+        pdf: bytes | BinaryIO,
+        filename: str,
+        on_fallback: Callable[[], None] | None = None,
+        allow_fallback: bool = True,
+    ) -> list[Document]:
+        """Split a PDF into section documents with Grobid.
+
+        With the artifact cache enabled, TEI of a PDF parsed before (same
+        sha256) is reused instead of calling Grobid again, and new TEI is
+        cached once it parses.
+
+        With PDF_FALLBACK_ENABLED, a PDF that Grobid fails on or does not
+        finish within GROBID_LATENCY_BUDGET_SECONDS is parsed locally with
+        pypdf instead (see ``parse_pdf_locally``) and ``on_fallback`` is
+        called so the paper can be re-parsed with Grobid later. TEI that
+        arrives after the budget is still cached.
+
+        PDFs of GROBID_SPLIT_MIN_PAGES pages or more are sent to Grobid as
+        ranges of GROBID_PAGES_PER_RANGE pages, parsed concurrently across
+        the pool and stitched back together (see ``GrobidPool.submit``).
+        """
+        cache = get_artifact_cache()
+        sha256 = sha256_of(pdf) if cache is not None else None
+        tei = cache.get_tei(sha256) if cache is not None else None
+        cached = tei is not None
+        if cached:
+            logger.info(f"Using cached TEI for {filename}")
+        elif allow_fallback and settings.PDF_FALLBACK_ENABLED:
+            data = pdf if isinstance(pdf, bytes) else pdf.read()
+            tei = self._grobid_within_budget(data, filename, cache, sha256)
+            if tei is None:
+                docs = parse_pdf_locally(data, filename)
+                if on_fallback is not None:
+                    on_fallback()
+                return docs
+        else:
+            tei = get_dependency("grobid").call(lambda: _submit_to_grobid(pdf, filename).result())
+        try:
+            docs = parse_tei(tei)
+        except TeiParseError:
+            logger.error(f"Could not parse Grobid TEI for {filename}: len={len(tei)} preview={tei[:400]!r}")
+            raise
+        if cache is not None and not cached:
+            cache.put_tei(sha256, tei)
+        return docs
+
+    def _grobid_within_budget(self, data: bytes, filename: str, cache, sha256: str | None) -> bytes | None:
+        """TEI from Grobid, or None if it failed, overran its latency budget or is shedding load."""
+        grobid = get_dependency("grobid")
+        try:
+            started = grobid.start()
+        except DependencyUnavailable as e:
+            logger.warning(f"Not sending {filename} to Grobid ({e}), using pypdf")
+            return None
+        try:
+            future = _submit_to_grobid(data, filename)
+        except BaseException as e:
+            grobid.finish(started, e)
+            raise
+        # The slot is held until Grobid answers, even after the fallback took over.
+        future.add_done_callback(lambda f: grobid.finish(started, f.exception()))
+        try:
+            return future.result(timeout=settings.GROBID_LATENCY_BUDGET_SECONDS)
+        except FutureTimeoutError:
+            logger.warning(
+                f"Grobid did not parse {filename} within {settings.GROBID_LATENCY_BUDGET_SECONDS}s, using pypdf"
+            )
+            if cache is not None:
+                future.add_done_callback(lambda f: _cache_late_tei(f, cache, sha256, filename))
+        except GrobidError as e:
+            logger.warning(f"Grobid failed on {filename} ({e}), using pypdf")
+        return None
 
     def add_paper(self, paper: ArxivPaper):
-        self.empty_pdf_folder()
-        self.download_pdf(paper)
-        loader = GenericLoader.from_filesystem(
-            self.config.output_dir,
-            glob="*",
-            suffixes=[".pdf"],
-            parser=GrobidParser(
-                segment_sentences=False,
-                grobid_server=settings.GROBID_SERVER_URL),
+        with self.download_pdf(paper) as pdf:
+            docs = self.parse_pdf(pdf, f"{paper.id}.pdf")
+        for doc in docs:
+            doc.metadata.update(paper.model_dump())
+        self.vector_store.add_documents(
+            docs, ids=[parent_document_id(d) for d in docs], batch_size=settings.INGEST_UPSERT_BATCH_SIZE
         )
-        docs = loader.load()
-        if not docs:
-            raise ValueError("No docs found")
-        for i in range(len(docs)):
-            docs[i].metadata.update(paper.model_dump())
-        self.vector_store.add_documents(docs)
         logging.info(f"Added paper {paper.id} to Qdrant")
     
     def add_paper_with_chunks(self, paper: ArxivPaper, chunks: list[str], para_indices: list[int] | None = None):
@@ -134,41 +268,34 @@ class QdrantService:
             Document(page_content=chunk, metadata={**base_metadata, "para": para_idx})
             for chunk, para_idx in zip(chunks, para_indices)
         ]
-        self.retriever.add_documents(docs)
+        self.retriever.add_documents(docs, batch_size=settings.INGEST_UPSERT_BATCH_SIZE)
         logging.info(f"Added {len(docs)} chunks to Qdrant")
 
     
     def add_papers_batch(self, papers: list['ArxivPaper']):
-        self.empty_pdf_folder()
-        self.download_pdf_batch(papers)
-        loader = GenericLoader.from_filesystem(
-            self.config.output_dir,
-            glob="*",
-            suffixes=[".pdf"],
-            parser=GrobidParser(segment_sentences=False, grobid_server=settings.GROBID_SERVER_URL),
-        )
-        docs = loader.load()
+        docs = []
+        for paper, pdf in self.download_pdf_batch(papers):
+            with pdf:
+                paper_docs = self.parse_pdf(pdf, f"{paper.id}.pdf")
+            for doc in paper_docs:
+                doc.metadata.update(paper.model_dump())
+            docs.extend(paper_docs)
         if not docs:
             raise ValueError("No docs found")
-        paper_idx = 0
-        docs[0].metadata.update(papers[paper_idx].model_dump())
-        for i in range(1, len(docs)):
-            if docs[i].metadata["paper_title"] != docs[i-1].metadata["paper_title"]:
-                paper_idx += 1
-            docs[i].metadata.update(papers[paper_idx].model_dump())
-
-        self.vector_store.add_documents(docs)
+        self.vector_store.add_documents(
+            docs, ids=[parent_document_id(d) for d in docs], batch_size=settings.INGEST_UPSERT_BATCH_SIZE
+        )
         logging.info(f"Added {len(papers)} papers to Qdrant")
 
     # ============================
     # S2Paper ingestion methods
     # ============================
 
-    def _download_s2_pdf(self, paper: S2Paper) -> str:
+    def _download_s2_pdf(self, paper: S2Paper, cancel: threading.Event | None = None) -> SpooledTemporaryFile:
         """Download open-access PDF for an S2Paper.
         
         Returns:
-            The file path of the downloaded PDF.
+            A private spooled file holding the PDF, positioned at the start.
         
         Raises:
             ValueError: If no open-access PDF URL is available or download fails.
@@ -176,19 +303,9 @@ class QdrantService:
         if not paper.openAccessPdf or not paper.openAccessPdf.get("url"):
             raise ValueError(f"No open-access PDF URL for paper {paper.paperId}")
 
-        pdf_url = paper.openAccessPdf["url"]
-        safe_title = re.sub(r'[<>:"/\\|?*]', '_', (paper.title or paper.paperId).replace(" ", "_"))
-        file_name = f"{safe_title}.pdf"
-
-        Path(self.config.output_dir).mkdir(parents=True, exist_ok=True)
-        file_path = Path(self.config.output_dir) / file_name
-
-        response = requests.get(pdf_url, timeout=60)
-        response.raise_for_status()
-
-        file_path.write_bytes(response.content)
-        logger.info(f"Downloaded S2 PDF for paper {paper.paperId} to {file_path}")
-        return str(file_path)
+        pdf = spool_pdf(paper.openAccessPdf["url"], cancel=cancel)
+        logger.info(f"Downloaded S2 PDF for paper {paper.paperId}")
+        return pdf
 
     def _s2_paper_metadata(self, paper: S2Paper) -> dict:
         """Build a JSON-serializable metadata dict from an S2Paper."""
@@ -197,76 +314,83 @@ class QdrantService:
         data["id"] = paper.paperId
         return data
 
-    def add_s2_paper(self, file_name: str, paper_id: str) -> int:
-        import requests as _requests
+    def add_s2_paper(
+        self,
+        pdf: bytes | BinaryIO,
+        paper_id: str,
+        filename: str = "paper.pdf",
+        on_stage: Callable[[str], None] | None = None,
+        on_fallback: Callable[[], None] | None = None,
+    ) -> int:
+        """Parse a PDF with a single Grobid call and index its sections.
 
-        # ── Diagnostic block — covers all known failure scenarios ─────────
-        pdf_dir = Path(self.config.output_dir)
-        glob_pattern = file_name + ".pdf"
-        all_pdfs = list(pdf_dir.glob("*.pdf"))
-        matched = list(pdf_dir.glob(glob_pattern))
-        logger.info(
-            f"[grobid-debug] dir={pdf_dir} | glob='{glob_pattern}' | "
-            f"all_pdfs={[f.name for f in all_pdfs]} | "
-            f"matched={[f.name for f in matched]}"
-        )
-        # Scenario 1: file size (detects empty/corrupt download)
-        for f in matched:
-            logger.info(f"[grobid-debug] '{f.name}' size={f.stat().st_size} bytes")
+        Args:
+            pdf: PDF content, or a binary file object such as the spooled
+                file returned by ``spool_pdf``
+            paper_id: Paper ID stored as ``metadata.id``
+            filename: Name reported to Grobid and in logs
+            on_stage: Called with "parsing" and then "embedding" as work starts
+            on_fallback: Called if the PDF was parsed without Grobid
 
-        # Scenario 2+3+5: probe GROBID directly to see raw status + response
-        # (bypasses LangChain so we see exactly what GROBID returns)
-        if matched:
-            try:
-                with open(matched[0], "rb") as _pdf:
-                    _r = _requests.post(
-                        settings.GROBID_SERVER_URL,
-                        files={"input": (matched[0].name, _pdf, "application/pdf", {"Expires": "0"})},
-                        data={
-                            "generateIDs": "1",
-                            "consolidateHeader": "0",
-                            "segmentSentences": "1",
-                            "teiCoordinates": ["head", "s"],
-                        },
-                        timeout=60,
-                    )
-                logger.info(
-                    f"[grobid-debug] GROBID status={_r.status_code} "
-                    f"content-type={_r.headers.get('content-type')} "
-                    f"len={len(_r.text)} "
-                    f"preview={_r.text[:400]!r}"
-                )
-            except Exception as _e:
-                logger.error(f"[grobid-debug] GROBID direct POST failed: {type(_e).__name__}: {_e}")
-        # ── End diagnostic block ──────────────────────────────────────────
-
-        loader = GenericLoader.from_filesystem(
-            self.config.output_dir,
-            glob=file_name+".pdf",
-            suffixes=[".pdf"],
-            parser=GrobidParser(segment_sentences=False, grobid_server=settings.GROBID_SERVER_URL),
-        )
-        docs = loader.load()
-        if not docs:
-            raise ValueError(f"GROBID produced no chunks for paper {file_name}")
+        Returns:
+            Number of parent documents (sections and captions) stored.
+        """
+        if on_stage is not None:
+            on_stage("parsing")
+        docs = self.parse_pdf(pdf, filename, on_fallback=on_fallback)
+        return self.add_s2_sections(docs, paper_id, on_stage=on_stage)
+
+    def add_s2_sections(
+        self,
+        new_docs: list[Document],
+        paper_id: str,
+        on_stage: Callable[[str], None] | None = None,
+    ) -> int:
+        """Index section documents parsed from a paper's TEI.
 
-        section_docs = defaultdict(list)
-        for doc in docs:
-            section_docs[doc.metadata.get("section_title", "General")].append(doc)
-        new_docs = []
-        for docs in section_docs.values():
-            metadata = docs[0].metadata.copy()
-            del metadata["text"]
-            del metadata["file_path"]
-            del metadata["bboxes"]
-            metadata["id"] = paper_id
-            new_docs.append(Document(page_content="\n\n".join([doc.page_content for doc in docs]), metadata=metadata))
-        
-        self.retriever.add_documents(new_docs)
+        Returns:
+            Number of parent documents stored.
+        """
+        if on_stage is not None:
+            on_stage("embedding")
+        for doc in new_docs:
+            doc.metadata["id"] = paper_id
 
-        logger.info(f"Added S2 paper {file_name} to Qdrant ({len(new_docs)} chunks)")
+        self.retriever.add_documents(new_docs, batch_size=settings.INGEST_UPSERT_BATCH_SIZE)
+
+        logger.info(
+            f"Added S2 paper {paper_id} to Qdrant ({len(new_docs)} chunks, "
+            f"embedding: {getattr(self.embedding, 'last_stats', {})})"
+        )
         return len(new_docs)
 
+    def upsert_embedded(
+        self,
+        chunks: list[Document],
+        chunk_ids: list[str],
+        vectors: list[list[float]],
+        parents: list[tuple[str, Document]],
+    ) -> None:
+        """Write chunks whose embeddings were computed elsewhere, plus their parents.
+
+        Used by the staged ingestion pipeline, where embedding and upserting
+        run as separate tasks. Inputs come from ``parent_retriever.split_for_indexing``.
+        """
+        payloads = QdrantVectorStore._build_payloads(
+            [chunk.page_content for chunk in chunks],
+            [chunk.metadata for chunk in chunks],
+            self.vector_store.content_payload_key,
+            self.vector_store.metadata_payload_key,
+        )
+        points = [
+            PointStruct(id=point_id, vector={self.vector_store.vector_name: vector}, payload=payload)
+            for point_id, vector, payload in zip(chunk_ids, vectors, payloads)
+        ]
+        batch_size = settings.INGEST_UPSERT_BATCH_SIZE
+        for i in range(0, len(points), batch_size):
+            self.client.upsert(collection_name=self.config.collection, points=points[i:i + batch_size])
+        self.docstore.mset(parents)
+
     def add_s2_paper_abstract_only(self, paper: S2Paper) -> int:
         """Fallback ingestion: embed title + abstract as a single document
         when no open-access PDF is available.
@@ -287,7 +411,7 @@ class QdrantService:
         metadata = self._s2_paper_metadata(paper)
 
         doc = Document(page_content=content, metadata=metadata)
-        self.retriever.add_documents([doc])
+        self.retriever.add_documents([doc], batch_size=settings.INGEST_UPSERT_BATCH_SIZE)
         logger.info(f"Added S2 paper {paper.paperId} abstract-only to Qdrant")
         return 1
 
@@ -334,6 +458,8 @@ class QdrantService:
         return results
     
     def search_selected_ids(self, ids: list[str], query: str, k: int = 10, score_threshold: float = None) -> List[Document]:
+        if self.config.parent_store_backend == "qdrant":
+            return self._search_selected_ids_with_lookup(ids, query, k, score_threshold)
         filter = Filter(
             must=[
                 FieldCondition(
@@ -356,6 +482,137 @@ class QdrantService:
         )
         return results
 
+    def _search_selected_ids_with_lookup(self, ids: list[str], query: str, k: int, score_threshold: float | None) -> List[Document]:
+        """Single-store retrieval: child search and parent fetch in one Qdrant request.
+
+        Children are grouped by their parent ID and each group is joined with
+        the parent collection, so no second request (and no Redis) is needed.
+        Mirrors the retriever's output: the parents of the ``k`` best children,
+        or bounded windows around those children when PARENT_WINDOW_CHARS is set.
+        """
+        window_chars = settings.PARENT_WINDOW_CHARS
+        result = self.client.query_points_groups(
+            collection_name=self.config.collection,
+            query=self.embedding.embed_query(query),
+            query_filter=Filter(must=[FieldCondition(key="metadata.id", match=MatchAny(any=ids))]),
+            group_by="metadata.doc_id",
+            # Each of the k best children is among the k best of its group, and
+            # its group is among the k best groups; trimmed to those k below.
+            limit=k,
+            group_size=k,
+            score_threshold=score_threshold,
+            # Whole parents only need the scores of their children.
+            with_payload=window_chars > 0,
+            with_lookup=WithLookup(collection=self.docstore.collection_name, with_payload=True, with_vectors=False),
+        )
+        ranked = sorted(
+            ((i, hit) for i, group in enumerate(result.groups) for hit in group.hits),
+            key=lambda pair: -pair[1].score,
+        )
+        best_hits = defaultdict(list)
+        for i, hit in ranked[:k]:
+            best_hits[i].append(hit)
+
+        parents = {}
+        children = []
+        for i, group in enumerate(result.groups):
+            if i not in best_hits:
+                continue
+            parent = QdrantParentStore.payload_to_document(group.lookup.payload if group.lookup else None)
+            if parent is None:
+                continue
+            parents[str(group.id)] = parent
+            if window_chars > 0:
+                children.extend(
+                    Document(page_content=hit.payload.get("page_content", ""), metadata=hit.payload.get("metadata") or {})
+                    for hit in best_hits[i]
+                )
+        if window_chars > 0:
+            return build_parent_windows(children, parents, window_chars)
+        return list(parents.values())
+
+    def reconcile_duplicates(self, dry_run: bool = True, batch_size: int = 1000) -> dict[str, int]:
+        """Remove duplicate chunks left by ingestion runs that used random IDs.
+
+        Scrolls the whole collection, keeps one copy of every parent (per
+        paper and identical set of children) and deletes the rest together
+        with their parent documents. Whole-paper chunks, which have no
+        parent, are deduplicated by paper, section and content. Pages are
+        hashed as they are scrolled, so memory holds only IDs and hashes.
+
+        Args:
+            dry_run: Only report what would be deleted.
+            batch_size: Scroll page size and delete batch size.
+
+        Returns:
+            Counts of scanned points and of points/parents (to be) deleted.
+        """
+        scanned = 0
+
+        def scan():
+            nonlocal scanned
+            offset = None
+            while True:
+                records, offset = self.client.scroll(
+                    collection_name=self.config.collection,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=["metadata", "page_content"],
+                    with_vectors=False,
+                )
+                scanned += len(records)
+                for record in records:
+                    yield record.id, record.payload or {}
+                if offset is None:
+                    return
+
+        point_ids, parent_ids = find_duplicates(scan())
+        if not dry_run:
+            for i in range(0, len(point_ids), batch_size):
+                self.client.delete(
+                    collection_name=self.config.collection,
+                    points_selector=PointIdsList(points=point_ids[i:i + batch_size]),
+                )
+            if parent_ids:
+                self.docstore.mdelete(parent_ids)
+        logger.info(
+            f"reconcile_duplicates(dry_run={dry_run}): scanned={scanned} "
+            f"duplicate_points={len(point_ids)} duplicate_parents={len(parent_ids)}"
+        )
+        return {"scanned": scanned, "duplicate_points": len(point_ids), "duplicate_parents": len(parent_ids)}
+
+    def delete_paper(self, paper_id: str, batch_size: int = 1000) -> int:
+        """Delete every chunk of a paper and the parents they point to.
+
+        Returns:
+            Number of chunks deleted.
+        """
+        paper_filter = Filter(must=[FieldCondition(key="metadata.id", match=MatchAny(any=[paper_id]))])
+        parent_ids = set()
+        count = 0
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self.config.collection,
+                scroll_filter=paper_filter,
+                limit=batch_size,
+                offset=offset,
+                with_payload=["metadata"],
+                with_vectors=False,
+            )
+            count += len(records)
+            for record in records:
+                parent_id = ((record.payload or {}).get("metadata") or {}).get(self.parent_retriever.id_key)
+                if parent_id:
+                    parent_ids.add(parent_id)
+            if offset is None:
+                break
+        self.client.delete(collection_name=self.config.collection, points_selector=paper_filter)
+        if parent_ids:
+            self.docstore.mdelete(sorted(parent_ids))
+        logger.info(f"Deleted paper {paper_id} ({count} chunks, {len(parent_ids)} parents)")
+        return count
+
     def check_paper_exists(self, paper_id: str) -> bool:
         result = self.client.count(
             collection_name=self.config.collection,
@@ -370,4 +627,37 @@ class QdrantService:
             exact=False,
         )
         logger.info(f"check_paper_exists({paper_id!r}): count={result.count}")
-        return result.count > 0
\ No newline at end of file
+        return result.count > 0
+
+    def get_paper_chunk_counts(self, paper_ids: list[str]) -> dict[str, int]:
+        """Count indexed chunks for several papers in a single facet request.
+
+        Args:
+            paper_ids: Paper IDs to look up (matched against ``metadata.id``).
+
+        Returns:
+            Mapping of every requested paper ID to its chunk count; papers
+            with no vectors in the collection map to 0.
+        """
+        unique_ids = list(dict.fromkeys(paper_ids))
+        if not unique_ids:
+            return {}
+        result = self.client.facet(
+            collection_name=self.config.collection,
+            key="metadata.id",
+            facet_filter=Filter(
+                must=[
+                    FieldCondition(
+                        key="metadata.id",
+                        match=MatchAny(any=unique_ids)
+                    )
+                ]
+            ),
+            limit=len(unique_ids),
+            exact=True,
+        )
+        counts = {pid: 0 for pid in unique_ids}
+        for hit in result.hits:
+            counts[str(hit.value)] = hit.count
+        logger.info(f"get_paper_chunk_counts({len(unique_ids)} papers): {counts}")
+        return counts
\ No newline at end of file
@@ -0,0 +1,79 @@
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.stores import BaseStore
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointIdsList, PointStruct
+
+
+class QdrantParentStore(BaseStore[str, Document]):
+    """Parent Document store backed by a payload-only Qdrant collection.
+
+    Used by the single-store mode: parents live next to the child vectors, so
+    QdrantService can fetch them in the same request as the vector search via
+    ``query_points_groups(..., with_lookup=...)`` instead of a second hop to
+    Redis. Keys must be valid Qdrant point IDs (UUID strings), which the
+    ParentDocumentRetriever's parent IDs are.
+    """
+
+    def __init__(self, client: QdrantClient, collection_name: str, batch_size: int = 256):
+        self.client = client
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        if not self.client.collection_exists(collection_name):
+            # No vectors: this collection is only looked up by point ID.
+            self.client.create_collection(collection_name=collection_name, vectors_config={})
+
+    @staticmethod
+    def payload_to_document(payload: Optional[dict]) -> Optional[Document]:
+        if not payload:
+            return None
+        return Document(page_content=payload.get("page_content", ""), metadata=payload.get("metadata") or {})
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[Document]]:
+        if not keys:
+            return []
+        found = {}
+        for i in range(0, len(keys), self.batch_size):
+            records = self.client.retrieve(
+                collection_name=self.collection_name,
+                ids=list(keys[i:i + self.batch_size]),
+                with_payload=True,
+                with_vectors=False,
+            )
+            for record in records:
+                found[str(record.id)] = self.payload_to_document(record.payload)
+        return [found.get(key) for key in keys]
+
+    def mset(self, key_value_pairs: Sequence[Tuple[str, Document]]) -> None:
+        points = [
+            PointStruct(
+                id=key,
+                vector={},
+                payload={"page_content": doc.page_content, "metadata": doc.metadata},
+            )
+            for key, doc in key_value_pairs
+        ]
+        for i in range(0, len(points), self.batch_size):
+            self.client.upsert(collection_name=self.collection_name, points=points[i:i + self.batch_size])
+
+    def mdelete(self, keys: Sequence[str]) -> None:
+        if keys:
+            self.client.delete(collection_name=self.collection_name, points_selector=PointIdsList(points=list(keys)))
+
+    def yield_keys(self, prefix: Optional[str] = None) -> Iterator[str]:
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=self.batch_size,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False,
+            )
+            for record in records:
+                key = str(record.id)
+                if prefix is None or key.startswith(prefix):
+                    yield key
+            if offset is None:
+                break
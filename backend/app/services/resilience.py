@@ -0,0 +1,342 @@
+"""Circuit breakers and adaptive concurrency limits for external services.
+
+Every call to a wrapped dependency (S2, Grobid, Cohere, Tavily) goes through
+a :class:`Dependency`, which combines two mechanisms:
+
+* A :class:`CircuitBreaker` that opens after consecutive failures and then
+  rejects calls immediately with :class:`CircuitOpenError`, instead of
+  letting every caller wait for the full timeout of a service that is down.
+  After a cool-down it lets a single probe through (half-open) and closes
+  again when the probe succeeds.
+* An :class:`AIMDLimiter` on calls in flight. The limit grows by about one
+  per round of calls that finish within the latency target and halves when
+  a call fails or is slow, so a degrading service gets fewer concurrent
+  requests before it starts timing out. Callers over the limit wait briefly
+  and then get :class:`OverloadedError`.
+
+State is per process and exposed by :func:`dependency_stats`.
+"""
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DependencyUnavailable(RuntimeError):
+    """A call was rejected without reaching the external service."""
+
+
+class CircuitOpenError(DependencyUnavailable):
+    """The service failed repeatedly and is not being called for now."""
+
+
+class OverloadedError(DependencyUnavailable):
+    """Too many calls to the service are in flight already."""
+
+
+def counts_as_failure(error: BaseException) -> bool:
+    """Whether an exception means the service is unhealthy.
+
+    HTTP errors (httpx, requests, GrobidError) count only for 429 and 5xx;
+    other 4xx responses are the caller's problem. Everything else counts.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) if response is not None else getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return True
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker counting consecutive failures."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self.opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> None:
+        """Let a call through or raise :class:`CircuitOpenError`."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                logger.info(f"Circuit {self.name} half-open, probing")
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+
+    def abandon(self) -> None:
+        """An admitted call never ran; let the next one be the probe."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit {self.name} closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit {self.name} opened after {self.failures} consecutive failures")
+                    self.opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+class AIMDLimiter:
+    """Concurrency limit adapted with additive increase, multiplicative decrease."""
+
+    def __init__(
+        self,
+        name: str,
+        latency_target: float,
+        max_limit: int,
+        min_limit: int = 1,
+        initial_limit: Optional[int] = None,
+        backoff: float = 0.5,
+    ):
+        self.name = name
+        self.latency_target = latency_target
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(initial_limit or self.max_limit)
+        self.backoff = backoff
+        self.in_flight = 0
+        self.rejected = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self, timeout: float) -> None:
+        """Take a slot, waiting at most ``timeout`` seconds, or raise :class:`OverloadedError`."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected += 1
+                    raise OverloadedError(f"{self.name} has {self.in_flight} calls in flight (limit {int(self.limit)})")
+                self._cond.wait(remaining)
+            self.in_flight += 1
+
+    async def acquire_async(self, timeout: float) -> None:
+        """Like :meth:`acquire`, polling so the event loop is never blocked."""
+        deadline = time.monotonic() + timeout
+        while not self.try_acquire():
+            if time.monotonic() >= deadline:
+                with self._cond:
+                    self.rejected += 1
+                raise OverloadedError(f"{self.name} has {self.in_flight} calls in flight (limit {int(self.limit)})")
+            await asyncio.sleep(0.01)
+
+    def release(self, latency: float, failed: bool) -> None:
+        now = time.monotonic()
+        with self._cond:
+            self.in_flight -= 1
+            if failed or latency > self.latency_target:
+                # Calls that were already running when the limit last dropped
+                # report the same congestion; count it only once.
+                if now - latency >= self._last_decrease:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def abandon(self) -> None:
+        """Give back the slot of a call cut short, without adjusting the limit."""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "limit": int(self.limit),
+                "max_limit": self.max_limit,
+                "in_flight": self.in_flight,
+                "latency_target_s": self.latency_target,
+                "rejected": self.rejected,
+            }
+
+
+class Dependency:
+    """Breaker, limiter and latency counters of one external service.
+
+    ``is_failure`` decides which exceptions count against the service; by
+    default a 404 is the caller's problem and neither opens the breaker nor
+    lowers the limit (see :func:`counts_as_failure`). A call ended by a
+    ``BaseException`` that is not an ``Exception`` (cancellation, Ctrl-C,
+    worker shutdown) says nothing about the service and is abandoned.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        breaker: CircuitBreaker,
+        limiter: AIMDLimiter,
+        max_wait: float = 5.0,
+        is_failure: Callable[[BaseException], bool] = counts_as_failure,
+    ):
+        self.name = name
+        self.breaker = breaker
+        self.limiter = limiter
+        self.max_wait = max_wait
+        self.is_failure = is_failure
+        self.calls = 0
+        self.failures = 0
+        self.total_latency = 0.0
+        self._lock = threading.Lock()
+
+    def start(self) -> float:
+        """Admit one call; returns its start time for :meth:`finish`.
+
+        Raises:
+            CircuitOpenError: If the breaker is open.
+            OverloadedError: If no slot freed up within ``max_wait``.
+        """
+        self.breaker.allow()
+        try:
+            self.limiter.acquire(self.max_wait)
+        except OverloadedError:
+            self.breaker.abandon()
+            raise
+        return time.monotonic()
+
+    async def start_async(self) -> float:
+        self.breaker.allow()
+        try:
+            await self.limiter.acquire_async(self.max_wait)
+        except OverloadedError:
+            self.breaker.abandon()
+            raise
+        return time.monotonic()
+
+    def finish(self, started: float, error: Optional[BaseException] = None) -> None:
+        if error is not None and not isinstance(error, Exception):
+            self.limiter.abandon()
+            self.breaker.abandon()
+            return
+        latency = time.monotonic() - started
+        failed = error is not None and self.is_failure(error)
+        self.limiter.release(latency, failed)
+        if failed:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        with self._lock:
+            self.calls += 1
+            self.failures += failed
+            self.total_latency += latency
+
+    @contextmanager
+    def guard(self):
+        started = self.start()
+        try:
+            yield
+        except BaseException as e:
+            self.finish(started, e)
+            raise
+        self.finish(started)
+
+    @asynccontextmanager
+    async def aguard(self):
+        started = await self.start_async()
+        try:
+            yield
+        except BaseException as e:
+            self.finish(started, e)
+            raise
+        self.finish(started)
+
+    def call(self, fn: Callable, *args, **kwargs):
+        with self.guard():
+            return fn(*args, **kwargs)
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls, failures, total = self.calls, self.failures, self.total_latency
+        return {
+            "calls": calls,
+            "failures": failures,
+            "mean_latency_s": round(total / calls, 3) if calls else None,
+            "breaker": self.breaker.stats(),
+            "limiter": self.limiter.stats(),
+        }
+
+
+# Latency above which a call counts as slow, and the most calls in flight
+DEPENDENCY_LIMITS: Dict[str, tuple] = {
+    "s2": (5.0, 16),
+    "grobid": (30.0, 16),
+    "cohere": (5.0, 8),
+    "tavily": (15.0, 4),
+}
+
+_dependencies: Dict[str, Dependency] = {}
+_dependencies_lock = threading.Lock()
+
+
+def get_dependency(name: str) -> Dependency:
+    """Process-wide :class:`Dependency` for one of ``DEPENDENCY_LIMITS``."""
+    with _dependencies_lock:
+        if name not in _dependencies:
+            latency_target, max_limit = DEPENDENCY_LIMITS[name]
+            _dependencies[name] = Dependency(
+                name,
+                CircuitBreaker(
+                    name,
+                    failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+                    recovery_timeout=settings.CIRCUIT_RECOVERY_SECONDS,
+                ),
+                AIMDLimiter(name, latency_target=latency_target, max_limit=max_limit),
+                max_wait=settings.DEPENDENCY_MAX_WAIT_SECONDS,
+            )
+        return _dependencies[name]
+
+
+def dependency_stats() -> Dict[str, dict]:
+    with _dependencies_lock:
+        dependencies = dict(_dependencies)
+    return {name: dep.stats() for name, dep in sorted(dependencies.items())}
@@ -0,0 +1,205 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_classic.retrievers import ParentDocumentRetriever
+from langchain_classic.retrievers.multi_vector import SearchType
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+
+from app.services.chunk_ids import child_point_id, parent_document_id
+
+
+def _snap_start(text: str, pos: int) -> int:
+    """Move a window start forward to the next word boundary."""
+    if pos <= 0:
+        return 0
+    if text[pos - 1].isspace():
+        return pos
+    nxt = text.find(" ", pos)
+    return pos if nxt == -1 else nxt + 1
+
+
+def _snap_end(text: str, pos: int) -> int:
+    """Move a window end backward to the previous word boundary."""
+    if pos >= len(text):
+        return len(text)
+    if text[pos].isspace():
+        return pos
+    prev = text.rfind(" ", 0, pos)
+    return pos if prev == -1 else prev
+
+
+def _child_span(child: Document, parent_text: str) -> Optional[tuple[int, int]]:
+    """Locate a child chunk inside its parent text.
+
+    Uses the ``start_index`` written by the child splitter and falls back to a
+    substring search for chunks stored before start indices were recorded.
+    """
+    start = child.metadata.get("start_index")
+    if not isinstance(start, int) or start < 0:
+        start = parent_text.find(child.page_content)
+        if start == -1:
+            return None
+    return start, min(len(parent_text), start + len(child.page_content))
+
+
+def build_parent_windows(
+    sub_docs: List[Document],
+    parents: Dict[str, Document],
+    window_chars: int,
+    id_key: str = "doc_id",
+) -> List[Document]:
+    """Build bounded context windows around matched child chunks.
+
+    Each child is widened to roughly ``window_chars`` characters of its parent,
+    centred on the child. Overlapping windows from the same parent are merged so
+    the same text is never returned twice.
+
+    Args:
+        sub_docs: Child chunks in rank order, as returned by the vector search.
+        parents: Parent documents keyed by parent ID.
+        window_chars: Target window size in characters.
+        id_key: Metadata key on the child that holds its parent ID.
+
+    Returns:
+        One Document per merged window, ordered by the rank of its best child.
+    """
+    spans: Dict[str, List[List[int]]] = {}
+    order: List[str] = []
+    for child in sub_docs:
+        parent_id = child.metadata.get(id_key)
+        parent = parents.get(parent_id)
+        if parent is None:
+            continue
+        text = parent.page_content
+        span = _child_span(child, text)
+        if span is None:
+            continue
+        start, end = span
+        pad = max(0, (window_chars - (end - start)) // 2)
+        lo = _snap_start(text, max(0, start - pad))
+        hi = _snap_end(text, min(len(text), end + pad))
+        if hi <= lo:
+            lo, hi = start, end
+        if parent_id not in spans:
+            spans[parent_id] = []
+            order.append(parent_id)
+        spans[parent_id].append([lo, hi])
+
+    windows = []
+    for parent_id in order:
+        parent = parents[parent_id]
+        merged: List[List[int]] = []
+        for lo, hi in sorted(spans[parent_id]):
+            if merged and lo <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], hi)
+            else:
+                merged.append([lo, hi])
+        for lo, hi in merged:
+            metadata = parent.metadata.copy()
+            metadata[id_key] = parent_id
+            metadata["window_start"] = lo
+            metadata["window_end"] = hi
+            # Evidence is deduplicated on (id, para); make each window distinct.
+            metadata["para"] = f"{metadata.get('para', parent_id)}@{lo}-{hi}"
+            windows.append(Document(page_content=parent.page_content[lo:hi], metadata=metadata))
+    return windows
+
+
+class ParentWindowRetriever(ParentDocumentRetriever):
+    """ParentDocumentRetriever that can return bounded windows instead of whole parents.
+
+    With ``window_chars`` set to 0 it behaves exactly like the base retriever and
+    returns full parent documents (whole Grobid sections). With a positive value
+    each matched child is expanded to a neighbourhood of about that many
+    characters taken from its parent, which keeps QA prompts small.
+    """
+
+    window_chars: int = 0
+
+    def split_for_indexing(
+        self,
+        documents: List[Document],
+        ids: Optional[List[str]] = None,
+    ) -> Tuple[List[Document], List[str], List[Tuple[str, Document]]]:
+        """Split parents into child chunks and assign deterministic IDs.
+
+        Parent IDs default to a hash of (paper id, section, content) and child
+        point IDs to a hash of (parent id, start index, content), so indexing
+        the same paper twice overwrites the first copy instead of duplicating it.
+
+        Returns:
+            (child chunks, child point IDs, (parent ID, parent) pairs)
+        """
+        if ids is None:
+            ids = [parent_document_id(doc) for doc in documents]
+        docs, full_docs = self._split_docs_for_adding(documents, ids, add_to_docstore=True)
+        child_ids = [child_point_id(doc.metadata[self.id_key], doc) for doc in docs]
+        return docs, child_ids, full_docs
+
+    def add_documents(
+        self,
+        documents: List[Document],
+        ids: Optional[List[str]] = None,
+        add_to_docstore: bool = True,
+        **kwargs: Any,
+    ) -> None:
+        """Add parents and their child chunks under deterministic IDs (see ``split_for_indexing``)."""
+        docs, child_ids, full_docs = self.split_for_indexing(documents, ids)
+        self.vectorstore.add_documents(docs, ids=child_ids, **kwargs)
+        if add_to_docstore:
+            self.docstore.mset(full_docs)
+
+    def _windows(self, sub_docs: List[Document], parent_docs: List[Optional[Document]], ids: List[str]) -> List[Document]:
+        parents = {pid: doc for pid, doc in zip(ids, parent_docs) if doc is not None}
+        return build_parent_windows(sub_docs, parents, self.window_chars, id_key=self.id_key)
+
+    def _parent_ids(self, sub_docs: List[Document]) -> List[str]:
+        ids = []
+        for d in sub_docs:
+            if self.id_key in d.metadata and d.metadata[self.id_key] not in ids:
+                ids.append(d.metadata[self.id_key])
+        return ids
+
+    def _search_children(self, query: str) -> List[Document]:
+        """Child chunks for ``query``, searched the way ``search_type`` asks."""
+        if self.search_type == SearchType.mmr:
+            return self.vectorstore.max_marginal_relevance_search(query, **self.search_kwargs)
+        if self.search_type == SearchType.similarity_score_threshold:
+            scored = self.vectorstore.similarity_search_with_relevance_scores(query, **self.search_kwargs)
+            return [doc for doc, _ in scored]
+        return self.vectorstore.similarity_search(query, **self.search_kwargs)
+
+    async def _asearch_children(self, query: str) -> List[Document]:
+        if self.search_type == SearchType.mmr:
+            return await self.vectorstore.amax_marginal_relevance_search(query, **self.search_kwargs)
+        if self.search_type == SearchType.similarity_score_threshold:
+            scored = await self.vectorstore.asimilarity_search_with_relevance_scores(query, **self.search_kwargs)
+            return [doc for doc, _ in scored]
+        return await self.vectorstore.asimilarity_search(query, **self.search_kwargs)
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+    ) -> List[Document]:
+        if self.window_chars <= 0:
+            return super()._get_relevant_documents(query, run_manager=run_manager)
+        sub_docs = self._search_children(query)
+        ids = self._parent_ids(sub_docs)
+        return self._windows(sub_docs, self.docstore.mget(ids), ids)
+
+    async def _aget_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: AsyncCallbackManagerForRetrieverRun,
+    ) -> List[Document]:
+        if self.window_chars <= 0:
+            return await super()._aget_relevant_documents(query, run_manager=run_manager)
+        sub_docs = await self._asearch_children(query)
+        ids = self._parent_ids(sub_docs)
+        return self._windows(sub_docs, await self.docstore.amget(ids), ids)
@@ -1,6 +1,7 @@
 import httpx
 from app.core.config import settings
 from app.core.schema import S2Paper
+from app.services.resilience import get_dependency
 from typing import List, Optional
 
 S2_BASE = "https://api.semanticscholar.org/graph/v1"
@@ -11,6 +12,14 @@ class S2Client:
         self._headers = {"x-api-key": settings.S2_API_KEY} if settings.S2_API_KEY else {}
         self._timeout = 30.0
 
+    async def _get(self, path: str, params: dict) -> dict:
+        """GET an S2 endpoint through the ``s2`` circuit breaker and concurrency limit."""
+        async with get_dependency("s2").aguard():
+            async with httpx.AsyncClient(timeout=self._timeout) as client:
+                resp = await client.get(f"{S2_BASE}{path}", params=params, headers=self._headers)
+                resp.raise_for_status()
+        return resp.json()
+
     def _to_paper(self, data: dict) -> Optional[S2Paper]:
         if not data or not data.get("paperId"):
             return None
@@ -58,15 +67,8 @@ class S2Client:
         if sort:
             params["sort"] = sort
 
-        async with httpx.AsyncClient(timeout=self._timeout) as client:
-            resp = await client.get(
-                f"{S2_BASE}/paper/search",
-                params=params,
-                headers=self._headers,
-            )
-            resp.raise_for_status()
-
-        papers = [self._to_paper(item) for item in resp.json().get("data", [])]
+        data = await self._get("/paper/search", params)
+        papers = [self._to_paper(item) for item in data.get("data", [])]
         return [p for p in papers if p is not None]
 
     async def get_paper_citations(
@@ -84,17 +86,10 @@ class S2Client:
             "fields": ",".join(f"citingPaper.{f}" for f in fields),
             "limit": min(limit, 1000),
         }
-        async with httpx.AsyncClient(timeout=self._timeout) as client:
-            resp = await client.get(
-                f"{S2_BASE}/paper/{paper_id}/citations",
-                params=params,
-                headers=self._headers,
-            )
-            resp.raise_for_status()
-
+        data = await self._get(f"/paper/{paper_id}/citations", params)
         return [
             item["citingPaper"]
-            for item in resp.json().get("data", [])
+            for item in data.get("data", [])
             if item.get("citingPaper")
         ]
 
@@ -113,16 +108,9 @@ class S2Client:
             "fields": ",".join(f"citedPaper.{f}" for f in fields),
             "limit": min(limit, 1000),
         }
-        async with httpx.AsyncClient(timeout=self._timeout) as client:
-            resp = await client.get(
-                f"{S2_BASE}/paper/{paper_id}/references",
-                params=params,
-                headers=self._headers,
-            )
-            resp.raise_for_status()
-
+        data = await self._get(f"/paper/{paper_id}/references", params)
         return [
             item["citedPaper"]
-            for item in resp.json().get("data", [])
+            for item in data.get("data", [])
             if item.get("citedPaper")
         ]
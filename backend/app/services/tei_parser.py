@@ -0,0 +1,239 @@
+"""Streaming parser for Grobid TEI XML.
+
+Turns the ``processFulltextDocument`` response into section documents and
+figure/table caption documents in a single pass with ``lxml.etree.iterparse``.
+Elements are cleared as soon as they are consumed, so memory stays flat for
+long papers.
+
+Long PDFs are parsed by Grobid in page ranges (see
+``GrobidPool.submit``); :func:`combine_tei` wraps the range results in a
+``teiCorpus`` and :func:`parse_tei` stitches its sections back together.
+"""
+import io
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from lxml import etree
+
+TEI_NS = "http://www.tei-c.org/ns/1.0"
+XML_NS = "http://www.w3.org/XML/1998/namespace"
+
+_TEI = f"{{{TEI_NS}}}TEI"
+_CORPUS = f"{{{TEI_NS}}}teiCorpus"
+_TITLE = f"{{{TEI_NS}}}title"
+_DIV = f"{{{TEI_NS}}}div"
+_FIGURE = f"{{{TEI_NS}}}figure"
+_HEAD = f"{{{TEI_NS}}}head"
+_P = f"{{{TEI_NS}}}p"
+_S = f"{{{TEI_NS}}}s"
+_LABEL = f"{{{TEI_NS}}}label"
+_FIGDESC = f"{{{TEI_NS}}}figDesc"
+
+
+class TeiParseError(ValueError):
+    """Raised when a Grobid response is not well-formed TEI."""
+
+
+def _text(elem: Optional[etree._Element]) -> str:
+    if elem is None:
+        return ""
+    return " ".join("".join(elem.itertext()).split())
+
+
+def _pages(coords: List[str]) -> Optional[Tuple[str, str]]:
+    """First and last page of a list of Grobid ``coords`` attributes."""
+    pages = [box.split(",", 1)[0] for value in coords for box in value.split(";") if box]
+    if not pages:
+        return None
+    return pages[0], pages[-1]
+
+
+def _shift_pages(coords: str, first_page: int) -> str:
+    """Make the page numbers of a page-range TEI absolute.
+
+    Boxes on a page before the range's ``first_page`` are numbered from the
+    start of the range and are moved by it. Every range before the last has
+    the same length, so a range-relative page is always below ``first_page``
+    and absolute page numbers are left alone.
+    """
+    boxes = []
+    for box in coords.split(";"):
+        page, sep, rest = box.partition(",")
+        if page.isdigit() and int(page) < first_page:
+            page = str(int(page) + first_page - 1)
+        boxes.append(page + sep + rest)
+    return ";".join(boxes)
+
+
+def _paragraph(p: etree._Element) -> Tuple[str, List[str]]:
+    sentences = p.findall(_S)
+    if not sentences:
+        return _text(p), [p.get("coords")] if p.get("coords") else []
+    text = " ".join(t for t in (_text(s) for s in sentences) if t)
+    return text, [s.get("coords") for s in sentences if s.get("coords")]
+
+
+def iter_tei(source: bytes) -> Iterator[Document]:
+    """Yield section and caption documents from a TEI document.
+
+    Sections are ``<div>`` elements with a ``<head>``, as in LangChain's
+    GrobidParser; their paragraphs are joined with blank lines. Figures and
+    tables become separate documents holding the caption text.
+
+    Metadata of every document: ``kind`` (``section``, ``figure`` or
+    ``table``), ``section_title``, ``section_number``, ``para``, ``pages``
+    (first and last page) and ``coords`` (Grobid bounding boxes,
+    ``page,x,y,w,h`` separated by ``;``). ``paper_title`` is filled in by
+    :func:`parse_tei`.
+
+    In a ``teiCorpus`` of page ranges, the title is taken from the first
+    range only, page numbers are made absolute, and paragraphs without a
+    ``<head>`` at the start of a later range are yielded as ``continuation``
+    documents: they belong to the last section of the previous range.
+
+    Raises:
+        TeiParseError: If the XML cannot be parsed.
+    """
+    in_header = True
+    part, first_page, leading = -1, 1, False
+    context = etree.iterparse(
+        io.BytesIO(source),
+        events=("start", "end"),
+        tag=(_TEI, _TITLE, _DIV, _FIGURE),
+        recover=False,
+        huge_tree=True,
+    )
+    try:
+        for event, elem in context:
+            if event == "start":
+                if elem.tag == _TEI:
+                    part += 1
+                    first_page = int(elem.get("n") or 1)
+                    in_header, leading = part == 0, part > 0
+                continue
+            if elem.tag == _TEI:
+                continue
+            if elem.tag == _TITLE:
+                # Only the main title in the header; titles in the bibliography are skipped.
+                if in_header and elem.get("type") == "main":
+                    yield Document(page_content="", metadata={"kind": "title", "paper_title": _text(elem)})
+                    in_header = False
+                continue
+            in_header = False
+            if elem.tag == _DIV:
+                head = elem.find(_HEAD)
+                if head is not None or leading:
+                    paragraphs, coords = [], []
+                    for p in elem.iterfind(_P):
+                        text, p_coords = _paragraph(p)
+                        if text:
+                            paragraphs.append(text)
+                            coords.extend(_shift_pages(c, first_page) if first_page > 1 else c for c in p_coords)
+                    if paragraphs:
+                        yield Document(
+                            page_content="\n\n".join(paragraphs),
+                            metadata={
+                                "kind": "section" if head is not None else "continuation",
+                                "section_title": _text(head),
+                                "section_number": str(head.get("n") if head is not None else None),
+                                "para": "0",
+                                "pages": str(_pages(coords)),
+                                "coords": ";".join(coords),
+                            },
+                        )
+                    leading = leading and head is None
+            else:
+                kind = "table" if elem.get("type") == "table" else "figure"
+                head = _text(elem.find(_HEAD))
+                caption = _text(elem.find(_FIGDESC))
+                if caption:
+                    coords = [elem.get("coords")] if elem.get("coords") else []
+                    if first_page > 1:
+                        coords = [_shift_pages(c, first_page) for c in coords]
+                    yield Document(
+                        page_content=" ".join(t for t in (head, caption) if t),
+                        metadata={
+                            "kind": kind,
+                            "section_title": head or kind.capitalize(),
+                            "section_number": str(elem.get(f"{{{XML_NS}}}id")),
+                            "label": _text(elem.find(_LABEL)),
+                            "para": "0",
+                            "pages": str(_pages(coords)),
+                            "coords": ";".join(coords),
+                        },
+                    )
+            # Nested divs only read their own direct children, so clearing is safe.
+            elem.clear(keep_tail=True)
+    except etree.XMLSyntaxError as e:
+        raise TeiParseError(f"Invalid TEI XML: {e}") from e
+
+
+def combine_tei(parts: List[Tuple[int, bytes]]) -> bytes:
+    """Wrap the TEI of consecutive page ranges in one ``teiCorpus`` document.
+
+    Args:
+        parts: ``(first page, TEI)`` of each range, in page order
+
+    Raises:
+        TeiParseError: If a part is not well-formed XML.
+    """
+    corpus = etree.Element(_CORPUS, nsmap={None: TEI_NS})
+    parser = etree.XMLParser(huge_tree=True)
+    for first_page, tei in parts:
+        try:
+            root = etree.fromstring(tei, parser)
+        except etree.XMLSyntaxError as e:
+            raise TeiParseError(f"Invalid TEI XML for pages from {first_page}: {e}") from e
+        root.set("n", str(first_page))
+        corpus.append(root)
+    return etree.tostring(corpus, xml_declaration=True, encoding="UTF-8")
+
+
+def _append(section: Document, doc: Document) -> None:
+    section.page_content += "\n\n" + doc.page_content
+    section.metadata["coords"] = ";".join(c for c in (section.metadata["coords"], doc.metadata["coords"]) if c)
+    section.metadata["pages"] = str(_pages([section.metadata["coords"]]))
+
+
+def parse_tei(source: bytes) -> List[Document]:
+    """Parse a TEI document into one document per section title plus captions.
+
+    Sections sharing a title (e.g. several unnumbered divs) are merged, in
+    document order, and so is a section that runs across two page ranges of
+    a ``teiCorpus``. Section bounding boxes are reduced to ``pages`` because
+    parent metadata is copied onto every child point; captions keep
+    ``coords``.
+
+    Raises:
+        TeiParseError: If the XML cannot be parsed or contains no text.
+    """
+    title = "No title found"
+    sections: Dict[str, Document] = {}
+    captions: List[Document] = []
+    last: Optional[Document] = None
+    for doc in iter_tei(source):
+        kind = doc.metadata["kind"]
+        if kind == "title":
+            title = doc.metadata["paper_title"] or title
+        elif kind == "section":
+            existing = sections.get(doc.metadata["section_title"])
+            if existing is None:
+                sections[doc.metadata["section_title"]] = last = doc
+            else:
+                _append(existing, doc)
+                last = existing
+        elif kind == "continuation":
+            # Text before any heading is dropped, as in a single TEI document.
+            if last is not None:
+                _append(last, doc)
+        else:
+            captions.append(doc)
+
+    docs = list(sections.values()) + captions
+    if not docs:
+        raise TeiParseError("TEI document contains no sections or captions")
+    for doc in sections.values():
+        del doc.metadata["coords"]
+    for doc in docs:
+        doc.metadata["paper_title"] = title
+    return docs
@@ -1,23 +1,329 @@
 import logging
+import sqlite3
+import threading
+import time
+from typing import BinaryIO, Callable
 from app.celery_app import celery_app
 from app.core.schema import S2Paper
 from app.core.config import settings
+from app.services import artifact_cache, grobid, pdf_text, resilience
 from app.services.qdrant import QdrantService
+from app.services.ingest_events import StageReporter, get_ingest_events
+from app.services.ingest_lease import PaperLeases
+from app.services.ingest_reprocess import get_reprocess_queue
+from app.services.ingest_priority import INTERACTIVE_QUEUE, get_user_slots
+from app.services.pdf_download import race_downloads, spool_pdf
+from app.services.artifact_cache import get_artifact_cache
+from app.services.pdf_source import (
+    PdfSource,
+    known_sources,
+    search_by_title,
+    search_by_titles,
+    strip_version,
+    unpaywall_pdf_url,
+)
 from qdrant_client.http.exceptions import ResponseHandlingException
-import arxiv
-import re
-from pathlib import Path
+from celery.exceptions import Ignore
+from celery.signals import worker_init, worker_process_init
 
 logger = logging.getLogger(__name__)
 
 _qdrant_service: QdrantService | None = None
+_leases: PaperLeases | None = None
+# Tasks of a threads worker share these clients; build each only once.
+_services_lock = threading.Lock()
+
+NOT_ON_ARXIV = "Not available on arXiv — upload the PDF manually to enable Q&A"
 
 
 def _get_qdrant_service() -> QdrantService:
     global _qdrant_service
-    if _qdrant_service is None:
-        _qdrant_service = QdrantService(settings.qdrant_config)
-    return _qdrant_service
+    with _services_lock:
+        if _qdrant_service is None:
+            _qdrant_service = QdrantService(settings.qdrant_config)
+        return _qdrant_service
+
+
+def _get_leases() -> PaperLeases:
+    global _leases
+    with _services_lock:
+        if _leases is None:
+            _leases = PaperLeases.from_url(settings.REDIS_URL, ttl=settings.INGEST_LEASE_TTL_SECONDS)
+        return _leases
+
+
+def _warm_up_services() -> None:
+    """Build the shared clients before the first task arrives."""
+    try:
+        _get_qdrant_service()
+        _get_leases()
+        grobid.get_grobid_pool()
+        artifact_cache.get_artifact_cache()
+    except Exception as e:
+        # Not fatal: the getters try again when a task needs them.
+        logger.warning(f"Could not set up ingestion services at worker start: {e}")
+
+
+@worker_process_init.connect
+def _init_worker_process(**_) -> None:
+    """Prefork child: drop clients inherited from the parent and build fresh ones.
+
+    Sockets, SQLite connections and held locks must not cross a fork.
+    """
+    global _qdrant_service, _leases
+    _qdrant_service = _leases = None
+    grobid._pool = None
+    pdf_text._pool = None
+    resilience._dependencies = {}
+    artifact_cache._cache = None
+    _warm_up_services()
+
+
+@worker_init.connect
+def _init_worker(sender=None, **_) -> None:
+    # Thread and solo pools run tasks in the main process; prefork
+    # children set themselves up in _init_worker_process instead.
+    if "prefork" not in str(getattr(sender, "pool_cls", "")):
+        _warm_up_services()
+
+
+def stage_reporter(task_id: str | None, paper_id: str) -> StageReporter:
+    """Publishes a paper's stages for ``GET /ingest/events`` under its status task ID."""
+    return StageReporter(get_ingest_events(), task_id, paper_id)
+
+
+def flag_for_reprocess(paper_dict: dict) -> Callable[[], None]:
+    """``on_fallback`` callback recording a paper indexed without Grobid for ``scripts.reprocess_fallback``."""
+    return lambda: get_reprocess_queue().add(paper_dict)
+
+
+def _skipped(paper_id: str) -> dict:
+    return {
+        "paperId": paper_id,
+        "method": "skipped",
+        "chunk_count": 0,
+        "success": True,
+    }
+
+
+def _failed(paper_id: str, error: str, source: str | None = None) -> dict:
+    return {
+        "paperId": paper_id,
+        "method": "failed",
+        "source": source,
+        "chunk_count": 0,
+        "success": False,
+        "error": error,
+    }
+
+
+def _download(qdrant: QdrantService, paper: S2Paper, source: PdfSource, cancel: threading.Event):
+    if source.source == "open_access":
+        return qdrant._download_s2_pdf(paper, cancel=cancel)
+    if source.source == "unpaywall":
+        return spool_pdf(unpaywall_pdf_url(source.url), cancel=cancel)
+    return spool_pdf(source.url, cancel=cancel)
+
+
+def _race(
+    qdrant: QdrantService, paper: S2Paper, sources: list[PdfSource], errors: list[str]
+) -> tuple[PdfSource | None, BinaryIO | None]:
+    source, pdf, failures = race_downloads(
+        sources, lambda s, cancel: _download(qdrant, paper, s, cancel), settings.PDF_HEDGE_DELAY_SECONDS
+    )
+    for failed, e in failures:
+        logger.warning(f"PDF download from {failed.source} failed for {paper.paperId}: {e}")
+        errors.append(f"{failed.source} download failed — {e}")
+    return source, pdf
+
+
+def _cache_aliases(paper: S2Paper, sources: list[PdfSource]) -> list[str]:
+    arxiv_ids = [(paper.externalIds or {}).get("ArXiv")] + [s.arxiv_id for s in sources]
+    return [f"s2:{paper.paperId}"] + [f"arxiv:{strip_version(a)}" for a in dict.fromkeys(arxiv_ids) if a]
+
+
+def download_from_sources(
+    qdrant: QdrantService,
+    paper: S2Paper,
+    sources: list[PdfSource],
+    title_search: bool = True,
+    progress: Callable[[str], None] | None = None,
+) -> tuple[PdfSource | None, BinaryIO | None, dict | None]:
+    """Download the PDF from whichever source delivers it first.
+
+    A PDF in the local artifact cache (by paper or arXiv ID) is used without
+    downloading. Otherwise the sources are raced (see ``race_downloads``):
+    the next one starts when one fails or after PDF_HEDGE_DELAY_SECONDS, and
+    the rest are cancelled once a valid PDF arrives. If all fail and
+    ``title_search`` is set, an arXiv title search is tried last.
+    Downloaded PDFs are cached.
+    ``progress`` is told when downloading or the title search starts.
+
+    Returns:
+        (source, open PDF file, None) on success, or (None, None, failure result).
+    """
+    cache = get_artifact_cache()
+    if cache is not None:
+        pdf = cache.open_pdf(_cache_aliases(paper, sources))
+        if pdf is not None:
+            logger.info(f"Using cached PDF for {paper.paperId}")
+            arxiv_id = next((s.arxiv_id for s in sources if s.arxiv_id), None)
+            return PdfSource(source="cache", url=pdf.name, arxiv_id=arxiv_id), pdf, None
+
+    errors = []
+    if sources:
+        if progress is not None:
+            progress("downloading")
+        source, pdf = _race(qdrant, paper, sources, errors)
+    else:
+        source = pdf = None
+    if pdf is None and title_search:
+        if progress is not None:
+            progress("resolving")
+        try:
+            found = search_by_title(paper)
+        except Exception as e:
+            logger.warning(f"arXiv search failed for {paper.paperId}: {e}")
+            errors.append(f"arXiv search failed — {e}")
+            found = None
+        if found is not None:
+            if progress is not None:
+                progress("downloading")
+            source, pdf = _race(qdrant, paper, [found], errors)
+
+    if pdf is not None:
+        if cache is not None:
+            try:
+                cache.put_pdf(pdf, _cache_aliases(paper, [source]))
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Could not cache PDF of {paper.paperId}: {e}")
+                pdf.seek(0)
+        return source, pdf, None
+
+    if errors:
+        return None, None, _failed(paper.paperId, "; ".join(errors))
+    # Paper not found on arXiv — do not fall back to abstract-only.
+    # The abstract is already passed directly to the QA agent via paper metadata;
+    # storing it in Qdrant would pollute the vector store and block future re-ingestion.
+    logger.info(f"Paper {paper.paperId} not found on arXiv")
+    return None, None, _failed(paper.paperId, NOT_ON_ARXIV)
+
+
+def release_paper(paper_id: str, token: str, result: dict | None) -> None:
+    """Release the paper's lease and report ``result`` to the tasks following it."""
+    for task_id in _get_leases().release(paper_id, token, result):
+        celery_app.backend.mark_as_done(task_id, result)
+        stage_reporter(task_id, paper_id).finish(result)
+
+
+def send_admitted(user_id: str, admitted: list[tuple[str, dict]]) -> None:
+    """Queue the papers ``UserSlots`` admitted; each gives its interactive slot back when done."""
+    for task_id, paper_dict in admitted:
+        async_result = ingest_paper_task.apply_async(
+            args=[paper_dict], kwargs={"user_id": user_id}, task_id=task_id, queue=INTERACTIVE_QUEUE
+        )
+        del async_result  # callers on the API run this in a thread, not on the event loop
+
+
+def release_slot(user_id: str, task_id: str) -> None:
+    """Give an interactive slot back, sending the user's next waiting paper in its place."""
+    send_admitted(user_id, get_user_slots().release(user_id, task_id))
+
+
+def claim_paper(
+    qdrant: QdrantService, paper_id: str, follow_as: str | None = None
+) -> tuple[str | None, dict | None]:
+    """Take the paper's ingestion lease, or wait for the task holding it.
+
+    With ``follow_as`` (a status task ID) nothing waits: the task holding
+    the lease is asked to report its result under that ID as well.
+
+    Returns:
+        (lease token, None) if the caller should ingest the paper,
+        (None, result) if another task ingested it meanwhile, or
+        (None, None) if the caller follows the holder.
+    """
+    leases = _get_leases()
+    deadline = time.monotonic() + settings.INGEST_LEASE_WAIT_SECONDS
+    while True:
+        token = leases.acquire(paper_id)
+        if token is not None:
+            # The previous holder may have finished just before we got the lease.
+            if qdrant.check_paper_exists(paper_id):
+                release_paper(paper_id, token, _skipped(paper_id))
+                return None, _skipped(paper_id)
+            return token, None
+        if follow_as is not None:
+            if leases.follow(paper_id, follow_as):
+                logger.info(f"Paper {paper_id} is being ingested by another task, which will report it")
+                return None, None
+            continue  # the holder just let go: try to take the lease
+        logger.info(f"Paper {paper_id} is being ingested by another task, waiting for its result")
+        try:
+            result = leases.wait(paper_id, timeout=deadline - time.monotonic())
+        except TimeoutError as e:
+            return None, _failed(paper_id, f"Concurrent ingestion did not finish — {e}")
+        if result is not None:
+            return None, result
+        # Lease released for retry or expired: try to take it over.
+
+
+def pdf_filename(paper: S2Paper, source: PdfSource) -> str:
+    return f"{(source.arxiv_id or paper.paperId).replace('/', '_')}.pdf"
+
+
+def _ingest_from_sources(
+    qdrant: QdrantService,
+    paper: S2Paper,
+    sources: list[PdfSource],
+    title_search: bool = True,
+    progress: Callable[[str], None] | None = None,
+) -> dict:
+    """Download, parse and index a paper unless another task already is; the result records the PDF source used."""
+    token, result = claim_paper(qdrant, paper.paperId)
+    if result is not None:
+        return result
+    leases = _get_leases()
+    result = None
+    try:
+        with leases.heartbeat(paper.paperId, token):
+            result = _ingest_pdf(qdrant, paper, sources, title_search, progress)
+    finally:
+        # Released without a result if this raised and will be retried.
+        release_paper(paper.paperId, token, result)
+    return result
+
+
+def _ingest_pdf(
+    qdrant: QdrantService,
+    paper: S2Paper,
+    sources: list[PdfSource],
+    title_search: bool,
+    progress: Callable[[str], None] | None = None,
+) -> dict:
+    source, pdf, failure = download_from_sources(qdrant, paper, sources, title_search, progress)
+    if failure is not None:
+        return failure
+    try:
+        with pdf:
+            chunk_count = qdrant.add_s2_paper(
+                pdf,
+                paper.paperId,
+                filename=pdf_filename(paper, source),
+                on_stage=progress,
+                on_fallback=flag_for_reprocess(paper.model_dump(mode="json")),
+            )
+    except Exception as e:
+        logger.warning(f"PDF ingestion failed for {paper.paperId}: {e}")
+        return _failed(paper.paperId, f"PDF processing failed — {e}", source=source.source)
+    logger.info(f"Ingested paper {paper.paperId} via PDF from {source.source} ({chunk_count} chunks)")
+    return {
+        "paperId": paper.paperId,
+        "method": "full_pdf",
+        "source": source.source,
+        "chunk_count": chunk_count,
+        "success": True,
+    }
 
 
 @celery_app.task(
@@ -29,95 +335,177 @@ def _get_qdrant_service() -> QdrantService:
     retry_backoff_max=60,
     retry_jitter=True,
 )
-def ingest_paper_task(self, paper_dict: dict) -> dict:
+def ingest_paper_task(
+    self, paper_dict: dict, user_id: str | None = None, priority: str = "interactive"
+) -> dict:
     """Celery task that ingests a single S2Paper into Qdrant.
 
-    Attempts full-PDF ingestion first.  If no open-access PDF is available,
-    falls back to abstract-only ingestion.
+    The PDF comes from the paper's ArXiv external ID, then its S2
+    open-access PDF, and only then from an arXiv title search. Papers
+    without a PDF are not ingested. If another task is ingesting the same
+    paper, this one waits for and returns its result.
 
     Args:
         paper_dict: JSON-serializable dict representing an S2Paper.
+        user_id: Set when the task holds one of the user's interactive
+            queue slots, which it gives back when done.
+        priority: "bulk" when sent to the bulk queue, so that the staged
+            pipeline keeps the paper behind interactive ones too.
 
     Returns:
-        Status dict with paperId, method used, chunk_count, and success flag.
+        Status dict with paperId, method used, PDF source, chunk_count, and success flag.
     """
+    handed_off = False
+    try:
+        return _ingest_paper(self.request.id, paper_dict, user_id, priority)
+    except Ignore:
+        # The staged pipeline took the paper over; its upsert stage gives the slot back.
+        handed_off = True
+        raise
+    finally:
+        if user_id is not None and not handed_off:
+            release_slot(user_id, self.request.id)
+
+
+def _ingest_paper(task_id: str, paper_dict: dict, user_id: str | None = None, priority: str = "interactive") -> dict:
     paper = S2Paper(**paper_dict)
     qdrant = _get_qdrant_service()
+    report = stage_reporter(task_id, paper.paperId)
     logger.info(f"[ingest] paperId={paper.paperId!r} title={paper.title!r}")
+    report("resolving")
 
     if qdrant.check_paper_exists(paper.paperId):
         logger.info(f"Paper {paper.paperId} already exists in Qdrant, skipping ingestion")
-        return {
-            "paperId": paper.paperId,
-            "method": "skipped",
-            "chunk_count": 0,
-            "success": True,
-        }
-    
-    # Try to search the paper in arxiv for downloading
-    arxiv_paper = None
-    try:
-        client = arxiv.Client(
-            delay_seconds=3.0,
-            num_retries=3
-        )
-        search = arxiv.Search(
-            query=f'ti:"{paper.title}"',
-            max_results=1,
-            sort_by=arxiv.SortCriterion.Relevance,
-            sort_order=arxiv.SortOrder.Descending
+        return report.finish(_skipped(paper.paperId))
+
+    if settings.INGEST_PIPELINE == "staged":
+        # Imported here: the pipeline module imports this one.
+        from app.tasks.pipeline import dispatch_pipeline, new_context
+
+        dispatch_pipeline([
+            new_context(paper_dict, task_id, known_sources(paper), title_search=True, user_id=user_id, priority=priority)
+        ])
+        # The upsert stage stores the final result under this task's ID.
+        raise Ignore()
+
+    return report.finish(_ingest_from_sources(qdrant, paper, known_sources(paper), progress=report))
+
+
+@celery_app.task(
+    bind=True,
+    name="ingest_pdf",
+    max_retries=3,
+    autoretry_for=(ResponseHandlingException,),
+    retry_backoff=True,
+    retry_backoff_max=60,
+    retry_jitter=True,
+)
+def ingest_pdf_task(self, paper_dict: dict, sources: list[dict], title_search: bool = False) -> dict:
+    """Per-paper stage of a batch: download, parse and embed from already resolved sources."""
+    paper = S2Paper(**paper_dict)
+    report = stage_reporter(self.request.id, paper.paperId)
+    result = _ingest_from_sources(
+        _get_qdrant_service(), paper, [PdfSource(**s) for s in sources], title_search=title_search, progress=report
+    )
+    return report.finish(result)
+
+
+@celery_app.task(bind=True, name="ingest_batch")
+def ingest_batch_task(self, paper_dicts: list[dict], task_ids: list[str]) -> dict:
+    """Celery task that resolves many papers at once and fans out per-paper ingestion.
+
+    ``task_ids`` are assigned by the caller, one per paper (paper IDs must be
+    unique), and are the IDs reported by ``/ingest/status``. Papers with an
+    ArXiv external ID or an open-access PDF need no lookup; the others are
+    searched on arXiv by title, several per query. Papers that are already indexed or cannot be
+    found get their final result stored under their ID right away; the
+    others are ingested by ``ingest_pdf_task`` running under that ID, or
+    with INGEST_PIPELINE=staged by one staged pipeline for the whole batch.
+    If the batch crashes, every paper not yet settled or dispatched gets a
+    failed result, so no pre-assigned ID stays PENDING forever.
+
+    Args:
+        paper_dicts: JSON-serializable dicts representing S2Papers.
+        task_ids: Pre-assigned status task ID for each paper.
+
+    Returns:
+        Counts of dispatched, skipped and failed papers.
+    """
+    papers = [S2Paper(**d) for d in paper_dicts]
+    task_of = {paper.paperId: task_id for paper, task_id in zip(papers, task_ids)}
+    # Task IDs nobody will report under yet; failed below if the batch crashes.
+    pending = set(task_ids)
+    summary = {"dispatched": 0, "skipped": 0, "failed": 0}
+
+    staged = []
+    if settings.INGEST_PIPELINE == "staged":
+        # Imported here: the pipeline module imports this one.
+        from app.tasks.pipeline import dispatch_pipeline, new_context
+
+    def done(paper: S2Paper, result: dict) -> None:
+        task_id = task_of[paper.paperId]
+        self.backend.mark_as_done(task_id, result)
+        pending.discard(task_id)
+        stage_reporter(task_id, paper.paperId).finish(result)
+
+    def dispatch(paper: S2Paper, sources: list[PdfSource], title_search: bool) -> None:
+        summary["dispatched"] += 1
+        stage_reporter(task_of[paper.paperId], paper.paperId)("queued")
+        if settings.INGEST_PIPELINE == "staged":
+            staged.append(new_context(
+                paper.model_dump(mode="json"), task_of[paper.paperId], sources, title_search, priority="bulk"
+            ))
+            return
+        ingest_pdf_task.apply_async(
+            args=[paper.model_dump(mode="json"), [s.model_dump() for s in sources], title_search],
+            task_id=task_of[paper.paperId],
         )
-        results = client.results(search)
-        for result in results:
-            arxiv_paper = result
-            break
-    except Exception as e:
-        logger.warning(f"arXiv search failed for {paper.paperId}: {e}")
-        return {
-            "paperId": paper.paperId,
-            "method": "failed",
-            "chunk_count": 0,
-            "success": False,
-            "error": f"arXiv search failed — {e}",
-        }
-
-    if arxiv_paper is None:
-        # Paper not found on arXiv — do not fall back to abstract-only.
-        # The abstract is already passed directly to the QA agent via paper metadata;
-        # storing it in Qdrant would pollute the vector store and block future re-ingestion.
-        logger.info(f"Paper {paper.paperId} not found on arXiv")
-        return {
-            "paperId": paper.paperId,
-            "method": "failed",
-            "chunk_count": 0,
-            "success": False,
-            "error": "Not available on arXiv — upload the PDF manually to enable Q&A",
-        }
+        pending.discard(task_of[paper.paperId])
+
+    def fail(paper: S2Paper, error: str) -> None:
+        done(paper, _failed(paper.paperId, error))
+        summary["failed"] += 1
 
     try:
-        file_name = re.sub(r'[<>:"/\\|?*]', '_', arxiv_paper.title.replace(" ", "_"))
-        pdf_path = Path(settings.PDF_DOWNLOAD_DIR) / (file_name + ".pdf")
-        Path(settings.PDF_DOWNLOAD_DIR).mkdir(parents=True, exist_ok=True)
-        arxiv_paper.download_pdf(dirpath=settings.PDF_DOWNLOAD_DIR, filename=file_name+".pdf")
+        qdrant = _get_qdrant_service()
+        counts = qdrant.get_paper_chunk_counts([p.paperId for p in papers])
+        unresolved = []
+        for paper in papers:
+            if counts.get(paper.paperId, 0) > 0:
+                done(paper, _skipped(paper.paperId))
+                summary["skipped"] += 1
+            elif sources := known_sources(paper):
+                # Per-paper title search is the last resort if these downloads fail.
+                dispatch(paper, sources, title_search=True)
+            else:
+                unresolved.append(paper)
 
-        try:
-            chunk_count = qdrant.add_s2_paper(file_name, paper.paperId)
-            logger.info(f"Ingested paper {paper.paperId} via PDF ({chunk_count} chunks)")
-            return {
-                "paperId": paper.paperId,
-                "method": "full_pdf",
-                "chunk_count": chunk_count,
-                "success": True,
-            }
-        finally:
-            pdf_path.unlink(missing_ok=True)
-            logger.debug(f"Deleted temp PDF {pdf_path}")
+        if unresolved:
+            for paper in unresolved:
+                stage_reporter(task_of[paper.paperId], paper.paperId)("resolving")
+            try:
+                found = search_by_titles(unresolved)
+            except Exception as e:
+                logger.warning(f"arXiv batch title search failed: {e}")
+                for paper in unresolved:
+                    fail(paper, f"arXiv search failed — {e}")
+            else:
+                for paper in unresolved:
+                    if paper.paperId in found:
+                        dispatch(paper, [found[paper.paperId]], title_search=False)
+                    else:
+                        fail(paper, NOT_ON_ARXIV)
+
+        if staged:
+            dispatch_pipeline(staged)
+            pending.clear()
     except Exception as e:
-        logger.warning(f"PDF ingestion failed for {paper.paperId}: {e}")
-        return {
-            "paperId": paper.paperId,
-            "method": "failed",
-            "chunk_count": 0,
-            "success": False,
-            "error": f"PDF processing failed — {e}",
-        }
+        for paper in papers:
+            if task_of[paper.paperId] in pending:
+                try:
+                    done(paper, _failed(paper.paperId, f"Batch ingestion failed — {e}"))
+                except Exception:
+                    logger.exception(f"Could not report the failure of paper {paper.paperId}")
+        raise
+    logger.info(f"[ingest-batch] {len(papers)} papers: {summary}")
+    return summary
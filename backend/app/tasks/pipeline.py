@@ -0,0 +1,300 @@
+"""Staged ingestion: download -> parse -> embed -> upsert as chained Celery tasks.
+
+Each stage runs on its own queue (``task_routes`` in app/celery_app.py), so
+worker concurrency can be sized per bottleneck: many download workers, a few
+parse workers matched to Grobid capacity, one or two embed workers. Stages pass a small context dict;
+chunks and vectors are stored in Redis by ``ArtifactStore`` and only their
+keys travel through the broker. PDFs stay on the worker's disk (in the
+artifact cache, or a temporary file when INGEST_CACHE_DIR is unset), so the
+download and parse queues must be served on the same host.
+
+A stage never raises: failures are recorded in the context and passed
+along, and the upsert stage stores the final per-paper result under the
+status task ID the API handed out, so ``/ingest/status`` works the same as
+with the single-task pipeline. The download stage takes the paper's
+ingestion lease, each stage keeps it alive and extends it over the hand-off
+to the next one, and the upsert stage releases it. If another task holds
+the lease, the paper follows it instead of waiting (which would hold up the
+rest of its chord): it drops out of the pipeline and the holder reports the
+result under its status task ID. Papers submitted together are embedded
+together, in one token-packed ``embed_documents`` call.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from celery import chain, chord, group
+
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.core.schema import S2Paper
+from app.services.artifact_cache import get_artifact_cache, sha256_of
+from app.services.artifacts import ArtifactStore, document_from_dict, document_to_dict
+from app.services.ingest_priority import BULK_PRIORITY
+from app.services.pdf_source import PdfSource
+from app.tasks.ingest import (
+    _failed,
+    _get_leases,
+    _get_qdrant_service,
+    claim_paper,
+    download_from_sources,
+    flag_for_reprocess,
+    pdf_filename,
+    release_paper,
+    release_slot,
+    stage_reporter,
+)
+
+logger = logging.getLogger(__name__)
+
+_artifacts: ArtifactStore | None = None
+_artifacts_lock = threading.Lock()
+
+
+def _get_artifacts() -> ArtifactStore:
+    global _artifacts
+    with _artifacts_lock:
+        if _artifacts is None:
+            _artifacts = ArtifactStore.from_url(settings.REDIS_URL, ttl=settings.INGEST_ARTIFACT_TTL_SECONDS)
+        return _artifacts
+
+
+def new_context(
+    paper_dict: dict,
+    task_id: str,
+    sources: list[PdfSource],
+    title_search: bool,
+    user_id: str | None = None,
+    priority: str = "interactive",
+) -> dict:
+    """Initial context of one paper going through the staged pipeline.
+
+    ``user_id`` is set when the paper holds one of the user's interactive
+    queue slots; the upsert stage gives it back once the paper is done.
+    ``priority`` ("interactive" or "bulk") is the priority of its stage tasks.
+    """
+    ctx = {
+        "paper": paper_dict,
+        "task_id": task_id,
+        "sources": [s.model_dump() for s in sources],
+        "title_search": title_search,
+        "priority": priority,
+    }
+    if user_id is not None:
+        ctx["user_id"] = user_id
+    return ctx
+
+
+def _in_flight(ctx: dict) -> bool:
+    """Whether this pipeline still has work to do for the paper."""
+    return "result" not in ctx and not ctx.get("followed")
+
+
+def _report(ctx: dict, stage: str) -> None:
+    stage_reporter(ctx["task_id"], ctx["paper"]["paperId"])(stage)
+
+
+def _fail(ctx: dict, stage: str, e: Exception) -> dict:
+    paper_id = ctx["paper"]["paperId"]
+    logger.warning(f"[pipeline] {stage} failed for {paper_id}: {type(e).__name__}: {e}")
+    ctx["result"] = _failed(paper_id, f"{stage} failed — {e}", source=ctx.get("source"))
+    return ctx
+
+
+def _keep_pdf(ctx: dict, pdf) -> None:
+    """Leave the downloaded PDF on local disk for the parse stage and record where."""
+    cache = get_artifact_cache()
+    if cache is not None:
+        # download_from_sources already stored it, unless caching it failed.
+        sha256 = sha256_of(pdf)
+        if cache.has_pdf(sha256):
+            ctx["pdf_sha256"] = sha256
+            return
+    fd, path = tempfile.mkstemp(prefix="ingest-", suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        shutil.copyfileobj(pdf, f)
+    ctx["pdf_path"] = path
+
+
+def _open_pdf(ctx: dict):
+    if "pdf_sha256" in ctx:
+        cache = get_artifact_cache()
+        pdf = cache.open_pdf_by_sha256(ctx["pdf_sha256"]) if cache is not None else None
+        if pdf is None:
+            raise FileNotFoundError(f"PDF {ctx['pdf_sha256']} is not in this worker's artifact cache")
+        return pdf
+    return open(ctx["pdf_path"], "rb")
+
+
+@contextmanager
+def _holding(*ctxs: dict):
+    """Keep the ingestion leases of papers still in flight alive during a stage.
+
+    Afterwards the context waits in the next stage's queue, or for the rest
+    of its chord to be parsed, with nobody renewing the lease; it is
+    extended to INGEST_PIPELINE_LEASE_TTL_SECONDS to cover that hand-off.
+    """
+    leases = _get_leases()
+    held = [ctx for ctx in ctxs if "lease" in ctx and _in_flight(ctx)]
+    with ExitStack() as stack:
+        for ctx in held:
+            stack.enter_context(leases.heartbeat(ctx["paper"]["paperId"], ctx["lease"]))
+        yield
+    for ctx in held:
+        if not leases.renew(ctx["paper"]["paperId"], ctx["lease"], ttl=settings.INGEST_PIPELINE_LEASE_TTL_SECONDS):
+            logger.warning(f"[pipeline] Ingestion lease for {ctx['paper']['paperId']} was lost")
+
+
+@celery_app.task(bind=True, name="ingest_stage_download")
+def download_stage(self, ctx: dict) -> dict:
+    """Fetch the PDF from the first working source onto this worker's disk."""
+    try:
+        paper = S2Paper(**ctx["paper"])
+        qdrant = _get_qdrant_service()
+        token, result = claim_paper(qdrant, paper.paperId, follow_as=ctx["task_id"])
+        if result is not None:
+            ctx["result"] = result
+            return ctx
+        if token is None:
+            # The lease holder reports this paper; it leaves the pipeline here.
+            ctx["followed"] = True
+            if "user_id" in ctx:
+                release_slot(ctx.pop("user_id"), ctx["task_id"])
+            return ctx
+        ctx["lease"] = token
+        sources = [PdfSource(**s) for s in ctx["sources"]]
+        progress = stage_reporter(ctx["task_id"], paper.paperId)
+        with _holding(ctx):
+            source, pdf, failure = download_from_sources(qdrant, paper, sources, ctx["title_search"], progress)
+        if failure is not None:
+            ctx["result"] = failure
+            return ctx
+        with pdf:
+            _keep_pdf(ctx, pdf)
+        ctx["source"] = source.source
+        ctx["filename"] = pdf_filename(paper, source)
+    except Exception as e:
+        return _fail(ctx, "PDF download", e)
+    return ctx
+
+
+@celery_app.task(bind=True, name="ingest_stage_parse")
+def parse_stage(self, ctx: dict) -> dict:
+    """Run Grobid on the PDF (or reuse cached TEI) and split the sections into child chunks."""
+    if not _in_flight(ctx):
+        return ctx
+    artifacts = _get_artifacts()
+    try:
+        qdrant = _get_qdrant_service()
+        _report(ctx, "parsing")
+        with _holding(ctx), _open_pdf(ctx) as pdf:
+            docs = qdrant.parse_pdf(pdf, filename=ctx["filename"], on_fallback=flag_for_reprocess(ctx["paper"]))
+        for doc in docs:
+            doc.metadata["id"] = ctx["paper"]["paperId"]
+        chunks, chunk_ids, parents = qdrant.parent_retriever.split_for_indexing(docs)
+        ctx["chunks"] = artifacts.put_json("chunks", {
+            "chunks": [document_to_dict(c) for c in chunks],
+            "chunk_ids": chunk_ids,
+            "parent_ids": [key for key, _ in parents],
+            "parents": [document_to_dict(p) for _, p in parents],
+        })
+        ctx["parent_count"] = len(parents)
+    except Exception as e:
+        return _fail(ctx, "PDF processing", e)
+    finally:
+        ctx.pop("pdf_sha256", None)
+        if "pdf_path" in ctx:
+            Path(ctx.pop("pdf_path")).unlink(missing_ok=True)
+    return ctx
+
+
+@celery_app.task(bind=True, name="ingest_stage_embed")
+def embed_stage(self, ctxs: dict | list[dict]) -> list[dict]:
+    """Embed the chunks of every paper in the batch with one embed_documents call."""
+    ctxs = [ctxs] if isinstance(ctxs, dict) else ctxs
+    artifacts = _get_artifacts()
+    live = [ctx for ctx in ctxs if _in_flight(ctx)]
+    for ctx in live:
+        _report(ctx, "embedding")
+    try:
+        texts_per_paper = [
+            [c["page_content"] for c in artifacts.get_json(ctx["chunks"])["chunks"]] for ctx in live
+        ]
+        with _holding(*live):
+            vectors = _get_qdrant_service().embedding.embed_documents([t for texts in texts_per_paper for t in texts])
+    except Exception as e:
+        for ctx in live:
+            _fail(ctx, "Embedding", e)
+        return ctxs
+    offset = 0
+    for ctx, texts in zip(live, texts_per_paper):
+        ctx["vectors"] = artifacts.put_vectors(vectors[offset:offset + len(texts)])
+        offset += len(texts)
+    return ctxs
+
+
+@celery_app.task(bind=True, name="ingest_stage_upsert")
+def upsert_stage(self, ctxs: dict | list[dict]) -> list[dict]:
+    """Write vectors and parents, then publish each paper's final status."""
+    ctxs = [ctxs] if isinstance(ctxs, dict) else ctxs
+    artifacts = _get_artifacts()
+    qdrant = _get_qdrant_service()
+    results = []
+    for ctx in ctxs:
+        if ctx.get("followed"):
+            continue
+        if "result" not in ctx:
+            try:
+                data = artifacts.get_json(ctx["chunks"])
+                with _holding(ctx):
+                    qdrant.upsert_embedded(
+                        [document_from_dict(c) for c in data["chunks"]],
+                        data["chunk_ids"],
+                        artifacts.get_vectors(ctx["vectors"]),
+                        [(k, document_from_dict(p)) for k, p in zip(data["parent_ids"], data["parents"])],
+                    )
+                ctx["result"] = {
+                    "paperId": ctx["paper"]["paperId"],
+                    "method": "full_pdf",
+                    "source": ctx["source"],
+                    "chunk_count": ctx["parent_count"],
+                    "success": True,
+                }
+                logger.info(f"[pipeline] Ingested paper {ctx['paper']['paperId']} ({ctx['parent_count']} chunks)")
+            except Exception as e:
+                _fail(ctx, "Upsert", e)
+        try:
+            artifacts.delete(ctx.get("chunks"), ctx.get("vectors"))
+            self.backend.mark_as_done(ctx["task_id"], ctx["result"])
+            stage_reporter(ctx["task_id"], ctx["paper"]["paperId"]).finish(ctx["result"])
+            if "lease" in ctx:
+                release_paper(ctx["paper"]["paperId"], ctx.pop("lease"), ctx["result"])
+        finally:
+            if "user_id" in ctx:
+                release_slot(ctx.pop("user_id"), ctx["task_id"])
+        results.append(ctx["result"])
+    return results
+
+
+def dispatch_pipeline(contexts: list[dict]) -> None:
+    """Start the staged pipeline for papers submitted together.
+
+    Download and parse run per paper; a chord joins them so the whole batch
+    is embedded and upserted together. Every stage task of a bulk batch is
+    sent with BULK_PRIORITY, behind interactive papers on the same queues.
+    """
+    if not contexts:
+        return
+    options = {"priority": BULK_PRIORITY} if contexts[0].get("priority") == "bulk" else {}
+    tail = chain(embed_stage.s().set(**options), upsert_stage.s().set(**options))
+    if len(contexts) == 1:
+        chain(download_stage.s(contexts[0]).set(**options), parse_stage.s().set(**options), tail).apply_async()
+    else:
+        chord(
+            group(chain(download_stage.s(ctx).set(**options), parse_stage.s().set(**options)) for ctx in contexts),
+            tail,
+        ).apply_async()
@@ -3,6 +3,7 @@ from langchain.tools import tool, ToolRuntime
 from typing import List, Optional
 from app.services.qdrant import QdrantService
 from app.services.s2_client import S2Client
+from app.services.resilience import get_dependency
 from app.core.config import settings
 from pydantic import BaseModel, Field
 from langgraph.types import Command
@@ -299,7 +300,7 @@ def tavily_research_overview(reasoning: str, query: str) -> str:
             include_images=False
         )
         
-        results = tavily.invoke({"query": query})
+        results = get_dependency("tavily").call(tavily.invoke, {"query": query})
         
         # Format results for better readability
         if isinstance(results, list):
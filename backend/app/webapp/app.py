@@ -1,12 +1,26 @@
 import asyncio
+import time
+import uuid
+from typing import Literal
 
-from fastapi import FastAPI
+import jwt
+import orjson
+import redis.asyncio
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from app.auth import user_identity
 from app.core.schema import S2Paper
-from app.tasks.ingest import ingest_paper_task
+from app.tasks.ingest import ingest_batch_task, ingest_paper_task, send_admitted
 from app.celery_app import celery_app
+from app.services.qdrant import kv_store, parent_store
+from app.services.grobid import get_grobid_pool
+from app.core.config import settings
+from app.services.ingest_events import TERMINAL_STAGES, get_ingest_events, terminal_stage
+from app.services.ingest_priority import BULK_PRIORITY, BULK_QUEUE, get_user_slots
+from app.services.resilience import dependency_stats
 
 app = FastAPI()
 
@@ -23,6 +37,8 @@ app.add_middleware(
 class IngestRequest(BaseModel):
     """POST body for /ingest."""
     papers: list[S2Paper]
+    # "bulk" queues behind interactive work, for backfills
+    priority: Literal["interactive", "bulk"] = "interactive"
 
 
 class TaskRef(BaseModel):
@@ -41,19 +57,39 @@ class TaskStatus(BaseModel):
     result: dict | None = None
 
 
-def _send_ingest_task(paper_dict: dict) -> str:
-    """Synchronous helper — keeps Celery proxy resolution off the event loop.
+async def _current_user(authorization: str | None = Header(None)) -> str:
+    """The signed-in user, from the same Clerk token the LangGraph API checks."""
+    try:
+        return await user_identity(authorization)
+    except jwt.PyJWTError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+
+def _send_ingest_task(paper_dict: dict, priority: str, user_id: str) -> str:
+    """Synchronous helper — keeps Celery proxy resolution and Redis off the event loop.
     Returns only the task ID string so the AsyncResult is never passed to the event loop."""
-    async_result = ingest_paper_task.delay(paper_dict)
-    task_id = async_result.id
-    del async_result  # ensure __del__ fires here in the thread, not on the event loop
+    task_id = str(uuid.uuid4())
+    if priority == "bulk":
+        async_result = ingest_paper_task.apply_async(
+            args=[paper_dict], kwargs={"priority": "bulk"}, task_id=task_id, queue=BULK_QUEUE, priority=BULK_PRIORITY
+        )
+        del async_result  # ensure __del__ fires here in the thread, not on the event loop
+    else:
+        # Sent now if the user has a free interactive slot, else when one frees up.
+        send_admitted(user_id, get_user_slots().submit(user_id, task_id, paper_dict))
     return task_id
 
 
 @app.post("/ingest", response_model=IngestResponse, status_code=202)
-async def ingest_papers(req: IngestRequest):
+async def ingest_papers(req: IngestRequest, user_id: str = Depends(_current_user)):
     """Accept a list of S2Paper objects and dispatch one Celery task per paper.
 
+    Requires the caller's Clerk session token. Papers go to the interactive
+    queue, ahead of bulk loads, at most INGEST_INTERACTIVE_SLOTS_PER_USER
+    of the user's at a time; the rest are held back and sent, oldest
+    first, as the user's earlier papers finish. A held-back paper reports
+    ``PENDING`` until then.
+
     Returns 202 Accepted with a list of {paperId, taskId} so the caller can
     poll for status later.
     """
@@ -61,12 +97,41 @@ async def ingest_papers(req: IngestRequest):
     for paper in req.papers:
         # Serialize to JSON-safe dict before sending to Celery
         paper_dict = paper.model_dump(mode="json")
-        task_id = await asyncio.to_thread(_send_ingest_task, paper_dict)
+        task_id = await asyncio.to_thread(_send_ingest_task, paper_dict, req.priority, user_id)
         tasks.append(TaskRef(paperId=paper.paperId, taskId=task_id))
 
     return IngestResponse(tasks=tasks)
 
 
+def _send_ingest_batch(paper_dicts: list[dict]) -> list[str]:
+    """Dispatch one batch task and return the per-paper status task IDs it will report under."""
+    task_ids = [str(uuid.uuid4()) for _ in paper_dicts]
+    async_result = ingest_batch_task.delay(paper_dicts, task_ids)
+    del async_result  # ensure __del__ fires here in the thread, not on the event loop
+    return task_ids
+
+
+@app.post("/ingest/batch", response_model=IngestResponse, status_code=202)
+async def ingest_papers_batch(req: IngestRequest):
+    """Accept a list of S2Paper objects and dispatch them as a single batch task.
+
+    The batch resolves all papers on arXiv together, then ingests each paper
+    under its own task ID, so the response and the status endpoints are the
+    same as for POST /ingest. Batches always run on the bulk queue. A paper
+    listed more than once is ingested once, and every entry for it gets the
+    same task ID.
+    """
+    if not req.papers:
+        return IngestResponse(tasks=[])
+    unique = {}
+    for paper in req.papers:
+        unique.setdefault(paper.paperId, paper)
+    paper_dicts = [paper.model_dump(mode="json") for paper in unique.values()]
+    task_ids = await asyncio.to_thread(_send_ingest_batch, paper_dicts)
+    task_of = dict(zip(unique, task_ids))
+    return IngestResponse(tasks=[TaskRef(paperId=paper.paperId, taskId=task_of[paper.paperId]) for paper in req.papers])
+
+
 def _check_task(task_id: str) -> TaskStatus:
     """Synchronous helper — safe to run in a thread."""
     result = celery_app.AsyncResult(task_id)
@@ -93,3 +158,132 @@ async def get_batch_status(req: BatchStatusRequest):
     """Check the status of multiple ingestion tasks at once."""
     statuses = [await asyncio.to_thread(_check_task, tid) for tid in req.task_ids]
     return {"statuses": statuses}
+
+
+# Idle streams send a comment this often so proxies keep them open; it is
+# also when tasks that died without publishing are looked up in Celery.
+SSE_KEEPALIVE_SECONDS = 15.0
+
+_events_redis: redis.asyncio.Redis | None = None
+
+
+def _open_pubsub():
+    global _events_redis
+    if _events_redis is None:
+        _events_redis = redis.asyncio.from_url(settings.REDIS_URL)
+    return _events_redis.pubsub()
+
+
+def _sse(event: dict) -> bytes:
+    return b"data: " + orjson.dumps(event) + b"\n\n"
+
+
+async def _stream_ingest_events(task_ids: list[str]):
+    """Yield each task's latest stage, then every later transition, until all are final.
+
+    A stream lasts at most INGEST_EVENTS_TTL_SECONDS, as long as the events
+    it replays are kept; it then ends with an ``expired`` event listing the
+    tasks that are not final yet, e.g. papers still waiting for one of the
+    user's interactive slots.
+    """
+    events = get_ingest_events()
+    pubsub = _open_pubsub()
+    deadline = time.monotonic() + settings.INGEST_EVENTS_TTL_SECONDS
+    try:
+        # Subscribe before reading the snapshot so no transition falls in between.
+        await pubsub.subscribe(*[events.channel(t) for t in task_ids])
+        pending = set(task_ids)
+        last_seq: dict[str, int] = {}
+
+        def emit(event: dict) -> bytes | None:
+            task_id = event["taskId"]
+            if task_id not in pending or event["seq"] <= last_seq.get(task_id, 0):
+                return None
+            last_seq[task_id] = event["seq"]
+            if event["stage"] in TERMINAL_STAGES:
+                pending.discard(task_id)
+            return _sse(event)
+
+        latest = await asyncio.to_thread(events.latest, task_ids)
+        for task_id in task_ids:
+            if task_id in latest and (chunk := emit(latest[task_id])):
+                yield chunk
+
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                yield b"event: expired\ndata: " + orjson.dumps({"taskIds": sorted(pending)}) + b"\n\n"
+                return
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=min(SSE_KEEPALIVE_SECONDS, remaining)
+            )
+            if message is not None:
+                if chunk := emit(orjson.loads(message["data"])):
+                    yield chunk
+                continue
+            yield b": keepalive\n\n"
+            for task_id in sorted(pending):
+                status = await asyncio.to_thread(_check_task, task_id)
+                if status.state not in ("SUCCESS", "FAILURE"):
+                    continue
+                result = status.result or {}
+                if status.state == "FAILURE":
+                    result = {"success": False, "method": "failed", **result}
+                event = {
+                    "seq": last_seq.get(task_id, 0) + 1,
+                    "taskId": task_id,
+                    "paperId": result.get("paperId"),
+                    "stage": terminal_stage(result),
+                    "ts": time.time(),
+                    "result": result,
+                }
+                if chunk := emit(event):
+                    yield chunk
+    finally:
+        await pubsub.aclose()
+
+
+@app.get("/ingest/events")
+async def stream_ingest_events(task_ids: list[str] = Query(...)):
+    """Server-Sent Events with the stage transitions of the given ingestion tasks.
+
+    Each event is a JSON object with taskId, paperId, stage (queued,
+    resolving, downloading, parsing, embedding, then indexed, skipped or
+    failed) and ts; final events also carry the task's result. The stream
+    closes once every task has reached a final stage.
+    """
+    return StreamingResponse(
+        _stream_ingest_events(list(dict.fromkeys(task_ids))),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/metrics/parent-cache")
+async def get_parent_cache_metrics():
+    """Hit/miss/eviction counters of the in-process parent document cache."""
+    if not hasattr(kv_store, "stats"):
+        return {"enabled": False}
+    return {"enabled": True, **kv_store.stats()}
+
+
+@app.get("/metrics/parent-store")
+async def get_parent_store_metrics():
+    """Per-tier hit counters and size accounting of the tiered parent store."""
+    if not hasattr(parent_store, "stats"):
+        return {"tiered": False}
+    return {"tiered": True, **await asyncio.to_thread(parent_store.stats)}
+
+
+@app.get("/metrics/grobid")
+async def get_grobid_metrics():
+    """Probe every configured Grobid server via /api/isalive."""
+    pool = get_grobid_pool()
+    await asyncio.to_thread(pool.check_health)
+    return {"instances": pool.stats()}
+
+
+@app.get("/metrics/dependencies")
+async def get_dependency_metrics():
+    """Circuit breaker state and adaptive concurrency limit of each external service called by this process."""
+    return {"dependencies": dependency_stats()}
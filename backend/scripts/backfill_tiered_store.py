@@ -0,0 +1,31 @@
+"""Copy parents written before PARENT_STORE_BACKEND=tiered into the Qdrant parent collection.
+
+Parents stored by the plain Redis backend have no TTL and exist nowhere
+else. This writes each of them to ``<collection>_parents`` and this node's
+cold tier, then lets its Redis copy expire like any other. Run once after
+switching to the tiered backend; it is safe to run again.
+
+Run from the backend directory:
+    uv run python -m scripts.backfill_tiered_store [--batch-size 500]
+"""
+import argparse
+
+from app.agent.TieredDocumentStore import TieredDocumentStore
+from app.core.config import settings
+from app.services.qdrant import QdrantService, parent_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    if not isinstance(parent_store, TieredDocumentStore):
+        parser.error("PARENT_STORE_BACKEND is not 'tiered'")
+
+    QdrantService(settings.qdrant_config)  # attaches the Qdrant parent collection
+    stats = parent_store.backfill(batch_size=args.batch_size)
+    print(f"scanned={stats['scanned']} backfilled={stats['backfilled']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Compare ingestion throughput of the monolithic and staged pipelines against a stub Grobid.
+
+Starts a local HTTP stub that serves a fake PDF and answers Grobid requests
+with canned TEI after a fixed delay, runs in-process Celery workers (one per
+queue for the staged pipeline), and ingests the same synthetic papers through
+both pipelines into a throwaway collection. Embeddings are faked with a fixed
+per-request latency, so the numbers reflect scheduling, not model speed.
+Needs live Redis (broker and artifacts) and Qdrant.
+
+    uv run python -m scripts.bench_ingest_pipeline [--papers 40] [--grobid-ms 1500]
+"""
+import argparse
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from celery.contrib.testing.worker import start_worker
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.services import grobid
+from app.services.pdf_source import PdfSource
+from app.services.qdrant import QdrantService
+from app.tasks import ingest, pipeline
+
+TEI_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0"><teiHeader><fileDesc><titleStmt>
+<title level="a" type="main">Benchmark paper</title></titleStmt></fileDesc></teiHeader>
+<text><body>{sections}</body></text></TEI>"""
+
+
+def _tei(sections: int) -> bytes:
+    body = "".join(
+        f'<div><head n="{s}">Section {s}</head><p><s>'
+        + " ".join(f"section{s} token{i}" for i in range(400))
+        + "</s></p></div>"
+        for s in range(sections)
+    )
+    return TEI_TEMPLATE.format(sections=body).encode()
+
+
+def _stub_server(tei: bytes, grobid_delay: float, download_delay: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, body: bytes, content_type: str):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/api/isalive":
+                self._send(b"true", "text/plain")
+            else:
+                time.sleep(download_delay)
+                self._send(b"%PDF-1.7\n" + b"0" * 200_000, "application/pdf")
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(grobid_delay)
+            self._send(tei, "application/xml")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class SlowFakeEmbedding(Embeddings):
+    """Deterministic vectors with a fixed latency per embed_documents call."""
+
+    def __init__(self, size: int, latency: float):
+        self.base = DeterministicFakeEmbedding(size=size)
+        self.latency = latency
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.base.embed_query(text)
+
+
+def _run(mode: str, papers: list[dict], pdf_url: str, workers: dict, timeout: float) -> float:
+    settings.INGEST_PIPELINE = mode
+    source = PdfSource(source="arxiv_id", url=pdf_url, arxiv_id="bench")
+    task_ids = [str(uuid.uuid4()) for _ in papers]
+    with ExitStack() as stack:
+        for queue, concurrency in workers.items():
+            stack.enter_context(start_worker(
+                celery_app, pool="threads", concurrency=concurrency, queues=[queue],
+                hostname=f"bench-{queue}@localhost", perform_ping_check=False, shutdown_timeout=60,
+            ))
+        start = time.perf_counter()
+        if mode == "staged":
+            pipeline.dispatch_pipeline([
+                pipeline.new_context(p, tid, [source], title_search=False) for p, tid in zip(papers, task_ids)
+            ])
+        else:
+            for p, tid in zip(papers, task_ids):
+                ingest.ingest_pdf_task.apply_async(args=[p, [source.model_dump()], False], task_id=tid)
+        results = [celery_app.AsyncResult(tid) for tid in task_ids]
+        while not all(r.ready() for r in results):
+            if time.perf_counter() - start > timeout:
+                raise TimeoutError(f"{mode}: papers still running after {timeout}s")
+            time.sleep(0.2)
+        elapsed = time.perf_counter() - start
+    failed = [r.result for r in results if not (isinstance(r.result, dict) and r.result.get("success"))]
+    if failed:
+        print(f"{mode}: {len(failed)} papers failed, e.g. {failed[0]}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--papers", type=int, default=40)
+    parser.add_argument("--sections", type=int, default=20)
+    parser.add_argument("--grobid-ms", type=int, default=1500)
+    parser.add_argument("--download-ms", type=int, default=300)
+    parser.add_argument("--embed-ms", type=int, default=400, help="latency of one embedding request")
+    parser.add_argument("--workers", type=int, default=8, help="worker threads of the monolithic pipeline")
+    parser.add_argument("--download-workers", type=int, default=8)
+    parser.add_argument("--parse-workers", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    server = _stub_server(_tei(args.sections), args.grobid_ms / 1000, args.download_ms / 1000)
+    stub_url = f"http://127.0.0.1:{server.server_port}"
+    settings.GROBID_SERVER_URLS = stub_url
+    settings.GROBID_MAX_CONCURRENCY_PER_INSTANCE = max(args.workers, args.parse_workers)
+    grobid._pool = None
+
+    config = settings.qdrant_config.model_copy(update={"collection": f"{settings.QDRANT_COLLECTION}_bench_ingest"})
+    service = QdrantService(config, embedding=SlowFakeEmbedding(config.vector_size, args.embed_ms / 1000))
+    ingest._qdrant_service = service
+
+    queues = {
+        "monolithic": {"ingest.bulk": args.workers},
+        "staged": {
+            "ingest.download": args.download_workers,
+            "ingest.parse": args.parse_workers,
+            "ingest.embed": 1,
+            "ingest.upsert": 1,
+        },
+    }
+    try:
+        for mode, workers in queues.items():
+            # Distinct paper IDs per run so nothing is skipped as already indexed.
+            papers = [{"paperId": f"bench-{mode}-{i}", "title": f"Benchmark paper {i}"} for i in range(args.papers)]
+            elapsed = _run(mode, papers, f"{stub_url}/paper.pdf", workers, args.timeout)
+            print(f"{mode:>10}: {args.papers} papers in {elapsed:.1f}s ({args.papers / elapsed:.2f} papers/s)")
+    finally:
+        service.client.delete_collection(config.collection)
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
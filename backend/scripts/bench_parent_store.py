@@ -0,0 +1,82 @@
+"""Compare QA retrieval latency of the Redis and single-store (Qdrant) parent modes.
+
+Ingests a synthetic paper into throwaway collections, runs the same searches
+in both modes and prints latency percentiles. Query embeddings are faked so
+the numbers reflect storage round trips only. Needs live Qdrant and Redis.
+
+    uv run python -m scripts.bench_parent_store [--queries 200] [--sections 40]
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from app.core.config import settings
+from app.services.qdrant import QdrantService
+
+BENCH_PAPER_ID = "bench-parent-store"
+
+
+def _synthetic_sections(n: int) -> list[Document]:
+    return [
+        Document(
+            page_content=" ".join(f"section{s} token{i} value{(i * 7 + s) % 97}" for i in range(600)),
+            metadata={"id": BENCH_PAPER_ID, "section_title": f"Section {s}", "para": str(s)},
+        )
+        for s in range(n)
+    ]
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def bench(mode: str, sections: int, queries: int, k: int) -> dict:
+    config = settings.qdrant_config.model_copy(update={
+        "collection": f"{settings.QDRANT_COLLECTION}_bench_{mode}",
+        "parent_store_backend": mode,
+    })
+    service = QdrantService(config, embedding=DeterministicFakeEmbedding(size=config.vector_size))
+    parent_ids = [str(uuid.uuid4()) for _ in range(sections)]
+    try:
+        service.retriever.add_documents(_synthetic_sections(sections), ids=parent_ids)
+        latencies = []
+        for i in range(queries):
+            # Measure the storage path, not the in-process cache.
+            if hasattr(service.docstore, "clear"):
+                service.docstore.clear()
+            start = time.perf_counter()
+            service.search_selected_ids([BENCH_PAPER_ID], f"token{i % 600} value{i % 97}", k=k)
+            latencies.append((time.perf_counter() - start) * 1000)
+        return {
+            "mode": mode,
+            "mean_ms": statistics.mean(latencies),
+            "p50_ms": _percentile(latencies, 0.50),
+            "p95_ms": _percentile(latencies, 0.95),
+        }
+    finally:
+        if mode == "redis":
+            service.docstore.mdelete(parent_ids)
+        else:
+            service.client.delete_collection(service.docstore.collection_name)
+        service.client.delete_collection(config.collection)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sections", type=int, default=40)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    for mode in ("redis", "qdrant"):
+        r = bench(mode, args.sections, args.queries, args.k)
+        print(f"{r['mode']:>7}: mean={r['mean_ms']:.1f}ms p50={r['p50_ms']:.1f}ms p95={r['p95_ms']:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
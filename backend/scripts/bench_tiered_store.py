@@ -0,0 +1,64 @@
+"""Measure hot (Redis) vs cold (local SQLite) fetch latency of the tiered parent store.
+
+Writes synthetic parents under a throwaway Redis namespace and SQLite file,
+then times batched reads with the documents in Redis, after dropping them from
+Redis (cold, promoted back on read), and again once promoted. Needs a live Redis.
+
+    uv run python -m scripts.bench_tiered_store [--docs 2000] [--batch 10]
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+from app.agent.RedisDocumentStore import RedisDocumentStore
+from app.agent.TieredDocumentStore import TieredDocumentStore
+from app.core.config import settings
+
+
+def _timed_reads(store: TieredDocumentStore, keys: list[str], batch: int) -> list[float]:
+    latencies = []
+    for i in range(0, len(keys), batch):
+        start = time.perf_counter()
+        store.mget(keys[i:i + batch])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def _report(label: str, latencies: list[float]) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{label:>9}: mean={statistics.mean(latencies):.2f}ms p50={statistics.median(latencies):.2f}ms p95={p95:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=10, help="parents per mget, like one QA retrieval")
+    args = parser.parse_args()
+
+    hot = RedisDocumentStore(redis_url=settings.REDIS_URL, namespace="parent_docs_bench")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TieredDocumentStore(hot, str(Path(tmp) / "bench.sqlite3"), hot_ttl=600)
+        keys = [f"bench-{i}" for i in range(args.docs)]
+        section = "Synthetic section text for the tiered store benchmark. " * 60
+        store.mset([(k, Document(page_content=section, metadata={"id": "bench", "para": k})) for k in keys])
+        try:
+            _report("hot", _timed_reads(store, keys, args.batch))
+            hot.mdelete(keys)  # simulate expiry/eviction from Redis
+            _report("cold", _timed_reads(store, keys, args.batch))
+            _report("promoted", _timed_reads(store, keys, args.batch))
+            stats = store.stats()
+            print(
+                f"hot: {stats['hot_documents']} docs / {stats['hot_bytes']} bytes, "
+                f"cold: {stats['cold_documents']} docs / {stats['cold_bytes']} bytes"
+            )
+        finally:
+            store.mdelete(keys)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Build the offline arXiv title index from an arXiv metadata snapshot.
+
+The snapshot is the JSON-lines dump published by arXiv (one record per line
+in the format of ``ArxivPaper``, e.g. ``arxiv-metadata-oai-snapshot.json``,
+optionally gzipped). Only ``id`` and ``title`` are read. The index is written
+to --out (default ARXIV_INDEX_DIR); point ARXIV_INDEX_DIR at it and restart
+the workers to resolve papers by title without arXiv API calls.
+
+Run from the backend directory:
+    uv run python -m scripts.build_arxiv_index arxiv-metadata-oai-snapshot.json [--out DIR]
+"""
+import argparse
+import gzip
+import json
+import time
+from typing import Iterator, Tuple
+
+from app.core.config import settings
+from app.services.arxiv_index import ArxivIndex, build_arxiv_index
+
+
+def read_snapshot(path: str, skipped: list) -> Iterator[Tuple[str, str]]:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                yield record["id"], record["title"]
+            except (ValueError, KeyError):
+                skipped.append(line[:80])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("snapshot", help="arXiv metadata JSON-lines file (.json or .json.gz)")
+    parser.add_argument("--out", default=settings.ARXIV_INDEX_DIR, help="index directory (default: ARXIV_INDEX_DIR)")
+    args = parser.parse_args()
+    if not args.out:
+        parser.error("--out is required when ARXIV_INDEX_DIR is not set")
+
+    started = time.perf_counter()
+    skipped: list = []
+    count = build_arxiv_index(read_snapshot(args.snapshot, skipped), args.out)
+    print(f"indexed={count} skipped={len(skipped)} in {time.perf_counter() - started:.0f}s -> {args.out}")
+
+    index = ArxivIndex(args.out, settings.ARXIV_INDEX_MIN_SIMILARITY)
+    sample = index.title(0)
+    started = time.perf_counter()
+    found = index.lookup(sample)
+    print(f"lookup({sample[:60]!r}) = {found} in {(time.perf_counter() - started) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
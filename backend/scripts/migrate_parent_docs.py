@@ -0,0 +1,33 @@
+"""Rewrite pickled parent documents in Redis with the compact codec.
+
+Run from the backend directory:
+    uv run python -m scripts.migrate_parent_docs [--dry-run]
+"""
+import argparse
+
+from app.agent.RedisDocumentStore import RedisDocumentStore
+from app.core.config import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be migrated")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    store = RedisDocumentStore(
+        redis_url=settings.REDIS_URL,
+        compress=settings.PARENT_STORE_COMPRESSION,
+        batch_size=args.batch_size,
+    )
+    stats = store.migrate_legacy_documents(dry_run=args.dry_run)
+    saved = stats["bytes_before"] - stats["bytes_after"]
+    print(
+        f"scanned={stats['scanned']} migrated={stats['migrated']} failed={stats['failed']} "
+        f"bytes {stats['bytes_before']} -> {stats['bytes_after']} (saved {saved})"
+        + (" [dry run]" if args.dry_run else "")
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Re-index papers from cached Grobid TEI, e.g. after changing the chunking.
+
+Every paper with TEI in the local artifact cache (INGEST_CACHE_DIR) has its
+chunks and parents deleted and rebuilt with the current splitter settings,
+without downloading the PDF or calling Grobid. Papers whose TEI was evicted
+are listed and left alone.
+
+Run from the backend directory:
+    uv run python -m scripts.rechunk_from_cache [--paper-id ID ...] [--dry-run]
+"""
+import argparse
+
+from app.core.config import settings
+from app.services.artifact_cache import get_artifact_cache
+from app.services.qdrant import QdrantService
+from app.services.tei_parser import parse_tei
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paper-id", action="append", help="only these papers (default: every cached paper)")
+    parser.add_argument("--dry-run", action="store_true", help="only list what would be re-indexed")
+    args = parser.parse_args()
+
+    cache = get_artifact_cache()
+    if cache is None:
+        parser.error("INGEST_CACHE_DIR is not set")
+    service = QdrantService(settings.qdrant_config)
+
+    wanted = set(args.paper_id or [])
+    rechunked = missing = 0
+    for alias, sha256 in cache.iter_aliases("s2:"):
+        paper_id = alias.removeprefix("s2:")
+        if wanted and paper_id not in wanted:
+            continue
+        tei = cache.get_tei(sha256)
+        if tei is None:
+            print(f"{paper_id}: no cached TEI, skipped")
+            missing += 1
+            continue
+        if args.dry_run:
+            print(f"{paper_id}: would re-index")
+        else:
+            docs = parse_tei(tei)
+            service.delete_paper(paper_id)
+            print(f"{paper_id}: {service.add_s2_sections(docs, paper_id)} parents")
+        rechunked += 1
+
+    print(f"rechunked={rechunked} missing_tei={missing}" + (" [dry run]" if args.dry_run else ""))
+
+
+if __name__ == "__main__":
+    main()
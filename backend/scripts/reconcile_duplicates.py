@@ -0,0 +1,31 @@
+"""Delete duplicate chunks and parents written before chunk IDs were deterministic.
+
+Parent/child chunks are compared per parent; whole-paper chunks written by
+add_paper / add_papers_batch (no parent ID) by paper, section and content.
+
+Run from the backend directory:
+    uv run python -m scripts.reconcile_duplicates [--apply]
+"""
+import argparse
+
+from app.core.config import settings
+from app.services.qdrant import QdrantService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apply", action="store_true", help="delete duplicates (default is a dry run)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    service = QdrantService(settings.qdrant_config)
+    stats = service.reconcile_duplicates(dry_run=not args.apply, batch_size=args.batch_size)
+    print(
+        f"scanned={stats['scanned']} duplicate_points={stats['duplicate_points']} "
+        f"duplicate_parents={stats['duplicate_parents']}"
+        + ("" if args.apply else " [dry run]")
+    )
+
+
+if __name__ == "__main__":
+    main()
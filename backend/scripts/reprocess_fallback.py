@@ -0,0 +1,62 @@
+"""Re-parse with Grobid the papers that were indexed from the pypdf fallback.
+
+Papers land on the re-processing list when Grobid failed or overran
+GROBID_LATENCY_BUDGET_SECONDS during ingestion. Each one is fetched again
+(from the local artifact cache when possible, where late Grobid TEI may also
+be waiting), parsed with Grobid only, and its fallback chunks are replaced.
+Papers that still fail stay on the list.
+
+Run from the backend directory once Grobid has capacity again:
+    uv run python -m scripts.reprocess_fallback [--limit N] [--dry-run]
+"""
+import argparse
+
+from app.core.config import settings
+from app.core.schema import S2Paper
+from app.services.ingest_reprocess import get_reprocess_queue
+from app.services.pdf_source import known_sources
+from app.services.qdrant import QdrantService
+from app.tasks.ingest import download_from_sources, pdf_filename
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limit", type=int, default=0, help="re-process at most this many papers (default: all)")
+    parser.add_argument("--dry-run", action="store_true", help="only list the flagged papers")
+    args = parser.parse_args()
+
+    queue = get_reprocess_queue()
+    papers = [S2Paper(**d) for d in queue.items()]
+    if args.limit:
+        papers = papers[:args.limit]
+    if args.dry_run:
+        for paper in papers:
+            print(f"{paper.paperId}: {paper.title or ''}")
+        print(f"flagged={len(queue)} [dry run]")
+        return
+
+    service = QdrantService(settings.qdrant_config)
+    done = failed = 0
+    for paper in papers:
+        source, pdf, failure = download_from_sources(service, paper, known_sources(paper))
+        if failure is not None:
+            print(f"{paper.paperId}: download failed — {failure['error']}")
+            failed += 1
+            continue
+        try:
+            with pdf:
+                docs = service.parse_pdf(pdf, pdf_filename(paper, source), allow_fallback=False)
+        except Exception as e:
+            print(f"{paper.paperId}: Grobid failed — {e}")
+            failed += 1
+            continue
+        service.delete_paper(paper.paperId)
+        print(f"{paper.paperId}: {service.add_s2_sections(docs, paper.paperId)} parents")
+        queue.remove(paper.paperId)
+        done += 1
+
+    print(f"reprocessed={done} failed={failed} remaining={len(queue)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,41 @@
 import pytest
 from httpx import ASGITransport, AsyncClient
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from qdrant_client import QdrantClient
 
+import app.services.qdrant as qdrant_module
+from app.core.config import settings
+from app.services import artifact_cache, arxiv_rate_limit, resilience
 from app.webapp.app import app
 
 
+@pytest.fixture(autouse=True)
+def _fresh_dependencies(monkeypatch):
+    """Circuit breakers must not carry failures from one test into the next."""
+    monkeypatch.setattr(resilience, "_dependencies", {})
+
+
+@pytest.fixture(autouse=True)
+def _no_arxiv_rate_limit(monkeypatch):
+    """The shared arXiv rate limit needs Redis; tests that want it install a fake limiter."""
+    monkeypatch.setattr(settings, "ARXIV_API_INTERVAL_SECONDS", 0)
+    monkeypatch.setattr(settings, "ARXIV_PDF_INTERVAL_SECONDS", 0)
+    monkeypatch.setattr(arxiv_rate_limit, "_limiter", None)
+
+
+@pytest.fixture(autouse=True)
+def _no_ingest_cache(monkeypatch):
+    """A cache directory from .env would leak artifacts between tests; cache tests pass a tmp_path."""
+    monkeypatch.setattr(settings, "INGEST_CACHE_DIR", "")
+    monkeypatch.setattr(artifact_cache, "_cache", None)
+
+
+@pytest.fixture(autouse=True)
+def _no_unpaywall(monkeypatch):
+    """With UNPAYWALL_EMAIL from .env, resolving PDF sources for a DOI would call the Unpaywall API."""
+    monkeypatch.setattr(settings, "UNPAYWALL_EMAIL", "")
+
+
 @pytest.fixture
 async def client():
     async with AsyncClient(
@@ -11,3 +43,19 @@ async def client():
         base_url="http://test",
     ) as ac:
         yield ac
+
+
+@pytest.fixture
+def qdrant_service(monkeypatch):
+    """Build QdrantServices on an in-memory Qdrant.
+
+    Defaults to parents in the Qdrant parent collection and 16-dimensional
+    fake embeddings; keyword arguments override ``QdrantConfig`` fields.
+    """
+    monkeypatch.setattr(qdrant_module, "QdrantClient", lambda **_: QdrantClient(":memory:"))
+
+    def make(embedding=None, **config) -> qdrant_module.QdrantService:
+        config = settings.qdrant_config.model_copy(update={"parent_store_backend": "qdrant", "vector_size": 16, **config})
+        return qdrant_module.QdrantService(config, embedding=embedding or DeterministicFakeEmbedding(size=16))
+
+    return make
@@ -0,0 +1,56 @@
+import io
+
+from app.core.config import settings
+from app.services import artifact_cache
+from app.services.artifact_cache import ArtifactCache, sha256_of
+from tests.services.test_tei_parser import TEI, stub_grobid_pool
+
+
+class TestArtifactCache:
+    def test_pdf_by_alias_and_tei_by_hash(self, tmp_path):
+        cache = ArtifactCache(str(tmp_path), max_bytes=1 << 20)
+        pdf = io.BytesIO(b"%PDF-1.7 attention")
+
+        sha256 = cache.put_pdf(pdf, ["s2:a", "arxiv:1706.03762"])
+        cache.put_tei(sha256, TEI)
+
+        assert pdf.read() == b"%PDF-1.7 attention"
+        assert sha256 == sha256_of(b"%PDF-1.7 attention")
+        with cache.open_pdf(["arxiv:1706.03762"]) as cached:
+            assert cached.read() == b"%PDF-1.7 attention"
+        assert cache.get_tei(sha256) == TEI
+        assert cache.open_pdf(["s2:other"]) is None
+        assert cache.stats()["pdf_hits"] == 1 and cache.stats()["pdf_misses"] == 1
+
+    def test_evicts_least_recently_used_by_bytes(self, tmp_path):
+        cache = ArtifactCache(str(tmp_path), max_bytes=250)
+        for name in ("a", "b"):
+            cache.put_pdf(io.BytesIO(name.encode() * 100), [f"s2:{name}"])
+        cache.open_pdf(["s2:a"]).close()
+
+        cache.put_pdf(io.BytesIO(b"c" * 100), ["s2:c"])
+
+        assert cache.lookup(["s2:b"]) is None
+        assert cache.open_pdf(["s2:a"]) is not None and cache.open_pdf(["s2:c"]) is not None
+        stats = cache.stats()
+        assert stats["pdf_files"] == 2 and stats["pdf_bytes"] == 200 and stats["evictions"] == 1
+
+
+class TestParsePdfWithCache:
+    def test_grobid_runs_once_per_pdf(self, monkeypatch, tmp_path, qdrant_service):
+        import app.services.qdrant as qdrant_module
+
+        monkeypatch.setattr(settings, "INGEST_CACHE_DIR", str(tmp_path))
+        monkeypatch.setattr(artifact_cache, "_cache", None)
+        pool = stub_grobid_pool(return_value=TEI)
+        monkeypatch.setattr(qdrant_module, "get_grobid_pool", lambda: pool)
+        service = qdrant_service()
+
+        first = service.add_s2_paper(io.BytesIO(b"%PDF-1.7"), "paper-1")
+        chunks = service.get_paper_chunk_counts(["paper-1"])["paper-1"]
+        assert service.delete_paper("paper-1") == chunks
+        assert not service.check_paper_exists("paper-1")
+        second = service.add_s2_paper(b"%PDF-1.7", "paper-1")
+
+        pool.process.assert_called_once()
+        assert first == second and service.get_paper_chunk_counts(["paper-1"])["paper-1"] == chunks
@@ -0,0 +1,50 @@
+import pytest
+
+from app.core.config import settings
+from app.core.schema import S2Paper
+from app.services import arxiv_index
+from app.services.arxiv_index import ArxivIndex, build_arxiv_index
+from app.services.pdf_source import known_sources
+
+RECORDS = [
+    ("1706.03762", "Attention Is All You Need"),
+    ("1810.04805", "BERT: Pre-training of Deep Bidirectional Transformers for\n  Language Understanding"),
+    ("2005.14165", "Language Models are Few-Shot Learners"),
+    ("math/0211159", "The entropy formula for the Ricci flow and its geometric applications"),
+    ("0000.00000", "???"),
+]
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    assert build_arxiv_index(RECORDS, str(tmp_path)) == 4
+    return str(tmp_path)
+
+
+class TestArxivIndex:
+    def test_exact_title_ignores_case_and_punctuation(self, index_dir):
+        index = ArxivIndex(index_dir)
+
+        assert index.lookup("attention is all you need!") == "1706.03762"
+        assert index.lookup("BERT: Pre-training of Deep Bidirectional Transformers for Language Understanding") == (
+            "1810.04805"
+        )
+        assert index.lookup("math/0211159") is None
+
+    def test_fuzzy_title_needs_similarity(self, index_dir):
+        index = ArxivIndex(index_dir, min_similarity=0.8)
+
+        assert index.lookup("The entropy formula for the Ricci flow and its geometric application") == "math/0211159"
+        assert index.lookup("Language Models are Zero-Shot Reasoners") is None
+        assert index.lookup("") is None
+
+    def test_known_sources_consult_the_index(self, index_dir, monkeypatch):
+        monkeypatch.setattr(settings, "ARXIV_INDEX_DIR", index_dir)
+        monkeypatch.setattr(arxiv_index, "_index", None)
+
+        sources = known_sources(S2Paper(paperId="s2-1", title="Language Models are Few-Shot Learners"))
+
+        assert [(s.source, s.arxiv_id, s.url) for s in sources] == [
+            ("title_index", "2005.14165", "https://arxiv.org/pdf/2005.14165")
+        ]
+        assert known_sources(S2Paper(paperId="s2-2", title="Unknown paper")) == []
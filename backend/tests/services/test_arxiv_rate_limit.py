@@ -0,0 +1,106 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core.config import settings
+from app.services import arxiv_rate_limit, pdf_download
+from app.services.arxiv_rate_limit import API, PDF, ArxivRateLimited, ArxivRateLimiter, ThrottledArxivClient
+from app.services.pdf_download import DownloadCancelled, spool_pdf
+
+
+class FakeReserve:
+    """In-memory stand-in for the reservation script, on a shared clock."""
+
+    def __init__(self):
+        self.next_free = {}
+
+    def __call__(self, keys, args):
+        now = int(time.monotonic() * 1000)
+        interval, max_wait = args
+        slot = max(now, self.next_free.get(keys[0], 0))
+        if slot - now > max_wait:
+            return -1
+        self.next_free[keys[0]] = slot + interval
+        return slot - now
+
+
+def fake_limiter(intervals, max_wait=10.0):
+    client = MagicMock()
+    client.register_script.return_value = FakeReserve()
+    return ArxivRateLimiter(client, intervals, max_wait)
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setattr(settings, "ARXIV_API_INTERVAL_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "ARXIV_PDF_INTERVAL_SECONDS", 0.05)
+    limiter = fake_limiter({API: 0.05, PDF: 0.05})
+    monkeypatch.setattr(arxiv_rate_limit, "_limiter", limiter)
+    return limiter
+
+
+class TestArxivRateLimiter:
+    def test_slots_are_spaced_per_kind(self):
+        limiter = fake_limiter({API: 3.0, PDF: 1.0})
+
+        assert limiter.reserve(API) == 0
+        assert limiter.reserve(API) == pytest.approx(3.0, abs=0.01)
+        assert limiter.reserve(PDF) == 0
+        assert limiter.reserve(PDF) == pytest.approx(1.0, abs=0.01)
+
+    def test_full_schedule_rejects_without_reserving(self):
+        limiter = fake_limiter({API: 3.0}, max_wait=5.0)
+        limiter.reserve(API), limiter.reserve(API)
+        booked = dict(limiter._reserve.next_free)
+
+        with pytest.raises(ArxivRateLimited):
+            limiter.reserve(API)
+        assert limiter._reserve.next_free == booked
+
+    def test_cancel_ends_the_wait(self):
+        limiter = fake_limiter({PDF: 5.0})
+        limiter.reserve(PDF)
+        cancel = threading.Event()
+        cancel.set()
+
+        assert limiter.wait(PDF, cancel) is False
+
+
+class TestThrottledRequests:
+    def test_only_arxiv_downloads_wait(self, limiter, monkeypatch, tmp_path):
+        monkeypatch.setattr(settings, "PDF_DOWNLOAD_DIR", str(tmp_path))
+        response = MagicMock()
+        response.__enter__.return_value = response
+        monkeypatch.setattr(pdf_download.requests, "get", MagicMock(return_value=response))
+        response.iter_content.side_effect = lambda chunk_size: iter([b"%PDF-1.7"])
+        reserve = MagicMock(wraps=limiter.reserve)
+        monkeypatch.setattr(limiter, "reserve", reserve)
+
+        spool_pdf("https://example.org/a.pdf").close()
+        spool_pdf("https://arxiv.org/pdf/1706.03762").close()
+        spool_pdf("https://export.arxiv.org/pdf/1706.03762").close()
+
+        assert reserve.call_args_list == [((PDF,),), ((PDF,),)]
+
+    def test_cancelled_while_waiting_for_arxiv(self, limiter, monkeypatch):
+        monkeypatch.setattr(limiter, "reserve", lambda kind: 5.0)
+        get = MagicMock()
+        monkeypatch.setattr(pdf_download.requests, "get", get)
+        cancel = threading.Event()
+        cancel.set()
+
+        with pytest.raises(DownloadCancelled):
+            spool_pdf("https://arxiv.org/pdf/1706.03762", cancel=cancel)
+        get.assert_not_called()
+
+    def test_every_feed_page_waits_for_an_api_slot(self, limiter):
+        client = ThrottledArxivClient(delay_seconds=0)
+        with patch("arxiv.Client._parse_feed", return_value="feed") as parse:
+            started = time.monotonic()
+            assert client._parse_feed("https://export.arxiv.org/api/query?start=0") == "feed"
+            assert client._parse_feed("https://export.arxiv.org/api/query?start=100", first_page=False) == "feed"
+
+        assert parse.call_count == 2
+        assert time.monotonic() - started >= 0.04
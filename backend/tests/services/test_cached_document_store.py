@@ -0,0 +1,83 @@
+from unittest.mock import MagicMock
+
+import orjson
+from langchain_core.documents import Document
+from langchain_core.stores import InMemoryStore
+
+from app.agent.CachedDocumentStore import CachedDocumentStore
+
+
+def _doc(text: str) -> Document:
+    return Document(page_content=text, metadata={"id": "paper-1"})
+
+
+class CountingStore(InMemoryStore):
+    def __init__(self):
+        super().__init__()
+        self.mget_calls = []
+
+    def mget(self, keys):
+        self.mget_calls.append(list(keys))
+        return super().mget(keys)
+
+
+class TestCachedDocumentStore:
+    def test_repeated_reads_are_served_from_memory(self):
+        backing = CountingStore()
+        backing.mset([("a", _doc("alpha")), ("b", _doc("beta"))])
+        cache = CachedDocumentStore(backing, max_bytes=10_000)
+
+        first = cache.mget(["a", "b", "missing"])
+        second = cache.mget(["a", "b"])
+
+        assert [d.page_content if d else None for d in first] == ["alpha", "beta", None]
+        assert [d.page_content for d in second] == ["alpha", "beta"]
+        assert backing.mget_calls == [["a", "b", "missing"]]
+        stats = cache.stats()
+        assert stats["hits"] == 2 and stats["misses"] == 3
+
+    def test_evicts_least_recently_used_by_bytes(self):
+        backing = InMemoryStore()
+        backing.mset([(k, _doc(k * 100)) for k in ("a", "b", "c")])
+        cache = CachedDocumentStore(backing, max_bytes=250)
+
+        cache.mget(["a"])
+        cache.mget(["b"])
+        cache.mget(["a"])  # a is now most recently used
+        cache.mget(["c"])  # must evict b
+
+        assert set(cache._entries) == {"a", "c"}
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["bytes"] <= 250
+
+    def test_writes_invalidate_and_publish(self):
+        backing = InMemoryStore()
+        backing.mset([("a", _doc("old"))])
+        redis_client = MagicMock()
+        cache = CachedDocumentStore(backing, max_bytes=10_000, redis_client=redis_client)
+        cache.mget(["a"])
+
+        cache.mset([("a", _doc("new"))])
+
+        assert cache.mget(["a"])[0].page_content == "new"
+        channel, payload = redis_client.publish.call_args.args
+        assert orjson.loads(payload) == ["a"]
+
+    def test_remote_invalidation_message(self):
+        backing = InMemoryStore()
+        backing.mset([("a", _doc("alpha"))])
+        cache = CachedDocumentStore(backing, max_bytes=10_000)
+        cache.mget(["a"])
+
+        cache._on_invalidation({"data": orjson.dumps(["a"])})
+
+        assert cache.stats()["entries"] == 0
+
+    def test_returned_documents_are_copies(self):
+        backing = InMemoryStore()
+        backing.mset([("a", _doc("alpha"))])
+        cache = CachedDocumentStore(backing, max_bytes=10_000)
+
+        cache.mget(["a"])[0].metadata["id"] = "mutated"
+
+        assert cache.mget(["a"])[0].metadata["id"] == "paper-1"
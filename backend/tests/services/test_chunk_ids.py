@@ -0,0 +1,96 @@
+from langchain_core.documents import Document
+
+from app.services.chunk_ids import child_point_id, find_duplicates, parent_document_id
+
+
+class TestChunkIds:
+    def test_ids_are_stable_and_content_addressed(self):
+        doc = Document(page_content="Some section text.", metadata={"id": "p1", "section_title": "Intro"})
+        same = Document(page_content="Some section text.", metadata={"id": "p1", "section_title": "Intro"})
+        edited = Document(page_content="Some section text!", metadata={"id": "p1", "section_title": "Intro"})
+        other_paper = Document(page_content="Some section text.", metadata={"id": "p2", "section_title": "Intro"})
+
+        assert parent_document_id(doc) == parent_document_id(same)
+        assert parent_document_id(doc) != parent_document_id(edited)
+        assert parent_document_id(doc) != parent_document_id(other_paper)
+
+    def test_child_id_depends_on_start_index(self):
+        first = Document(page_content="repeated", metadata={"start_index": 0})
+        second = Document(page_content="repeated", metadata={"start_index": 100})
+        assert child_point_id("parent", first) != child_point_id("parent", second)
+        assert child_point_id("parent", first) == child_point_id("parent", Document(**first.model_dump()))
+
+
+class TestFindDuplicates:
+    @staticmethod
+    def _point(point_id, parent_id, text, start=0, paper="p1"):
+        return point_id, {"page_content": text, "metadata": {"id": paper, "doc_id": parent_id, "start_index": start}}
+
+    def test_duplicate_parent_copies_are_removed(self):
+        points = [
+            self._point("a1", "A", "chunk one", 0),
+            self._point("a2", "A", "chunk two", 9),
+            self._point("b1", "B", "chunk one", 0),
+            self._point("b2", "B", "chunk two", 9),
+            self._point("c1", "C", "chunk one", 0, paper="p2"),
+        ]
+
+        point_ids, parent_ids = find_duplicates(points)
+
+        assert parent_ids == ["B"]
+        assert sorted(point_ids) == ["b1", "b2"]
+
+    def test_repeated_children_under_one_parent(self):
+        points = [self._point("a1", "A", "chunk", 0), self._point("a2", "A", "chunk", 0)]
+        assert find_duplicates(points) == (["a2"], [])
+
+    def test_whole_paper_points_without_parent(self):
+        def whole(point_id, text, section="Intro", paper="p1"):
+            return point_id, {"page_content": text, "metadata": {"id": paper, "section_title": section}}
+
+        points = iter([
+            whole("w3", "intro"),
+            whole("w1", "intro"),
+            whole("w2", "intro", section="Method"),
+            whole("w4", "intro", paper="p2"),
+            whole("w5", "intro"),
+        ])
+
+        assert find_duplicates(points) == (["w3", "w5"], [])
+
+
+class TestIdempotentIngestion:
+    def test_reingesting_a_paper_does_not_duplicate(self, qdrant_service):
+        service = qdrant_service()
+        docs = [
+            Document(page_content=" ".join(f"word{i}" for i in range(300)), metadata={"id": "p1", "section_title": "Intro"}),
+            Document(page_content="method " * 50, metadata={"id": "p1", "section_title": "Method"}),
+        ]
+
+        service.retriever.add_documents(docs)
+        first = service.client.count(service.config.collection).count
+        service.retriever.add_documents([Document(**d.model_dump()) for d in docs])
+
+        assert service.client.count(service.config.collection).count == first
+        assert len(list(service.docstore.yield_keys())) == 2
+
+    def test_reconcile_removes_legacy_duplicates(self, qdrant_service):
+        from langchain_classic.retrievers import ParentDocumentRetriever
+
+        service = qdrant_service()
+        doc = Document(page_content=" ".join(f"word{i}" for i in range(300)), metadata={"id": "p1"})
+        # Simulate two legacy ingestions with random uuid4 parent and point IDs.
+        legacy = ParentDocumentRetriever(
+            vectorstore=service.vector_store, docstore=service.docstore, child_splitter=service.child_splitter
+        )
+        legacy.add_documents([doc])
+        legacy.add_documents([Document(**doc.model_dump())])
+        total = service.client.count(service.config.collection).count
+
+        dry = service.reconcile_duplicates(dry_run=True)
+        assert dry["duplicate_parents"] == 1
+        assert service.client.count(service.config.collection).count == total
+
+        service.reconcile_duplicates(dry_run=False)
+        assert service.client.count(service.config.collection).count == total // 2
+        assert len(list(service.docstore.yield_keys())) == 1
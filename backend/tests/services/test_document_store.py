@@ -0,0 +1,194 @@
+import pickle
+
+import pytest
+from langchain_core.documents import Document
+
+from app.agent import document_codec
+from app.agent.document_codec import decode_document, encode_document, is_legacy_pickle
+from app.agent.RedisDocumentStore import RedisDocumentStore
+
+
+class FakeRedis:
+    """Just enough of the redis-py client for RedisDocumentStore."""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def mget(self, keys):
+        return [self.data.get(k) for k in keys]
+
+    def set(self, key, value, ex=None, keepttl=False):
+        self.data[key] = value
+
+    def delete(self, *keys):
+        for k in keys:
+            self.data.pop(k, None)
+
+    def scan_iter(self, match=None, count=None):
+        prefix = match.rstrip("*")
+        return iter([k.encode() for k in self.data if k.startswith(prefix)])
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def _queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+        return _queue
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+LONG_DOC = Document(
+    page_content="Attention is all you need. " * 200,
+    metadata={"id": "paper-1", "section_title": "Introduction", "venue": None},
+)
+
+
+class TestDocumentCodec:
+    def test_round_trip_drops_none_metadata(self):
+        decoded = decode_document(encode_document(LONG_DOC))
+        assert decoded.page_content == LONG_DOC.page_content
+        assert decoded.metadata == {"id": "paper-1", "section_title": "Introduction"}
+
+    def test_large_documents_are_compressed(self):
+        compressed = encode_document(LONG_DOC, compress=True)
+        plain = encode_document(LONG_DOC, compress=False)
+        assert compressed[0] == document_codec.CODEC_VERSION
+        assert compressed[1] & document_codec.FLAG_ZSTD
+        assert len(compressed) < len(plain)
+
+    def test_small_documents_are_not_compressed(self):
+        encoded = encode_document(Document(page_content="short", metadata={}))
+        assert encoded[1] == 0
+
+    def test_legacy_pickle_is_still_readable(self):
+        legacy = pickle.dumps(LONG_DOC)
+        assert is_legacy_pickle(legacy)
+        assert decode_document(legacy).page_content == LONG_DOC.page_content
+
+    def test_unknown_version_is_rejected(self):
+        with pytest.raises(ValueError):
+            decode_document(b"\x09\x00{}")
+
+
+class TestRedisDocumentStore:
+    def test_mset_mget_round_trip(self):
+        store = RedisDocumentStore(client=FakeRedis(), batch_size=2)
+        docs = [(f"k{i}", Document(page_content=f"doc {i}", metadata={"i": i})) for i in range(5)]
+
+        store.mset(docs)
+        result = store.mget(["k0", "missing", "k4"])
+
+        assert result[0].page_content == "doc 0"
+        assert result[1] is None
+        assert result[2].metadata == {"i": 4}
+        assert sorted(store.yield_keys()) == [f"k{i}" for i in range(5)]
+
+    def test_migrate_legacy_documents(self):
+        client = FakeRedis()
+        store = RedisDocumentStore(client=client)
+        client.data["parent_docs/old"] = pickle.dumps(LONG_DOC)
+        store.mset([("new", LONG_DOC)])
+
+        stats = store.migrate_legacy_documents()
+
+        assert stats["scanned"] == 2
+        assert stats["migrated"] == 1
+        assert not is_legacy_pickle(client.data["parent_docs/old"])
+        assert store.mget(["old"])[0].page_content == LONG_DOC.page_content
+
+
+class TestTieredDocumentStore:
+    def _store(self, tmp_path, client=None, authority="new", cold="cold.sqlite3", **kwargs):
+        import fakeredis
+        from langchain_core.stores import InMemoryStore
+
+        from app.agent.TieredDocumentStore import TieredDocumentStore
+
+        client = client or fakeredis.FakeRedis()
+        hot = RedisDocumentStore(client=client)
+        authority = InMemoryStore() if authority == "new" else authority
+        return TieredDocumentStore(hot, str(tmp_path / cold), hot_ttl=60, authority=authority, **kwargs), client
+
+    def test_writes_go_to_every_tier(self, tmp_path):
+        store, client = self._store(tmp_path)
+        store.mset([("a", LONG_DOC)])
+
+        assert client.exists("parent_docs/a")
+        assert 0 < client.ttl("parent_docs/a") <= 60
+        assert store.cold.mget(["a"])[0] is not None
+        assert store.authority.mget(["a"])[0].page_content == LONG_DOC.page_content
+
+    def test_without_authority_redis_copies_never_expire(self, tmp_path):
+        store, client = self._store(tmp_path, authority=None)
+        store.mset([("a", LONG_DOC)])
+        store.mget(["a"])
+
+        assert client.ttl("parent_docs/a") == -1
+
+    def test_cold_documents_are_promoted_on_read(self, tmp_path):
+        store, client = self._store(tmp_path)
+        store.mset([("a", LONG_DOC), ("b", Document(page_content="b", metadata={}))])
+        client.flushdb()  # simulate Redis expiry/eviction
+
+        docs = store.mget(["a", "b", "missing"])
+
+        assert docs[0].page_content == LONG_DOC.page_content
+        assert docs[2] is None
+        assert client.exists("parent_docs/a")
+        stats = store.stats()
+        assert stats["cold_hits"] == 2 and stats["misses"] == 1
+        assert stats["hot_documents"] == 2 and stats["cold_documents"] == 2
+        assert stats["hot_estimated"] is False
+
+    def test_other_nodes_read_through_the_authority(self, tmp_path):
+        worker, client = self._store(tmp_path, cold="worker.sqlite3")
+        api, _ = self._store(tmp_path, client=client, authority=worker.authority, cold="api.sqlite3")
+        worker.mset([("a", LONG_DOC)])
+        client.flushdb()  # expired from Redis; only the worker's disk has it
+
+        assert api.mget(["a"])[0].page_content == LONG_DOC.page_content
+        assert api.stats()["authority_hits"] == 1
+        # Now on the API node's disk, so the Redis copy may expire again.
+        assert api.cold.mget(["a"])[0] is not None
+        assert 0 < client.ttl("parent_docs/a") <= 60
+
+    def test_hot_reads_touch_only_redis(self, tmp_path):
+        store, client = self._store(tmp_path)
+        client.set("parent_docs/x", encode_document(LONG_DOC))  # written before tiering
+
+        assert store.mget(["x"])[0] is not None
+        assert store.stats()["hot_hits"] == 1
+        assert list(store.cold.yield_keys()) == []
+        # Not on disk, so it did not start expiring.
+        assert client.ttl("parent_docs/x") == -1
+
+    def test_backfill_moves_legacy_parents_to_disk_and_authority(self, tmp_path):
+        store, client = self._store(tmp_path)
+        client.set("parent_docs/x", encode_document(LONG_DOC))
+        store.mset([("a", LONG_DOC)])
+
+        assert store.backfill(batch_size=1) == {"scanned": 2, "backfilled": 1}
+        assert store.authority.mget(["x"])[0].page_content == LONG_DOC.page_content
+        assert list(store.cold.yield_keys()) == ["a", "x"]
+        assert 0 < client.ttl("parent_docs/x") <= 60
+
+    def test_hot_size_is_sampled_on_large_keyspaces(self, tmp_path):
+        store, client = self._store(tmp_path, stats_sample=10)
+        store.mset([(f"d{i}", LONG_DOC) for i in range(50)])
+        client.set("unrelated", b"x")
+
+        stats = store.stats()
+
+        assert stats["hot_estimated"] is True
+        assert 40 <= stats["hot_documents"] <= 51
+        assert stats["hot_bytes"] == pytest.approx(stats["hot_documents"] * client.strlen("parent_docs/d0"))
+        assert stats["cold_documents"] == 50
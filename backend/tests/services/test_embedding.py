@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from app.services.embedding import ConcurrentBatchEmbeddings
+
+
+class RecordingEmbeddings(Embeddings):
+    def __init__(self, fail_times: int = 0, delay: float = 0.0):
+        self.calls = []
+        self.fail_times = fail_times
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.calls.append(list(texts))
+            if self.fail_times:
+                self.fail_times -= 1
+                raise RuntimeError("rate limited")
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return [[float(len(t))] for t in texts]
+
+    def embed_query(self, text):
+        return [float(len(text))]
+
+
+def _embedder(base, **kwargs):
+    kwargs.setdefault("token_counter", lambda text: len(text.split()))
+    return ConcurrentBatchEmbeddings(base, **kwargs)
+
+
+class TestConcurrentBatchEmbeddings:
+    def test_preserves_order_across_batches(self):
+        base = RecordingEmbeddings()
+        texts = ["word " * (i % 7 + 1) for i in range(100)]
+
+        vectors = _embedder(base, max_concurrency=4, min_batch_size=5).embed_documents(texts)
+
+        assert vectors == [[float(len(t))] for t in texts]
+        assert len(base.calls) >= 4
+
+    def test_batches_respect_token_and_size_limits(self):
+        embedder = _embedder(RecordingEmbeddings(), max_batch_tokens=10, max_batch_size=3, min_batch_size=1, max_concurrency=1)
+        batches = embedder.pack_batches([4, 4, 4, 1, 1, 1, 1, 12])
+
+        assert [list(b) for b in batches] == [[0, 1], [2, 3, 4], [5, 6], [7]]
+
+    def test_runs_batches_concurrently(self):
+        base = RecordingEmbeddings(delay=0.05)
+        embedder = _embedder(base, max_concurrency=4, min_batch_size=1)
+
+        embedder.embed_documents(["a b c"] * 40)
+
+        assert base.max_in_flight > 1
+        assert embedder.last_stats["chunks"] == 40
+        assert embedder.last_stats["tokens"] == 120
+
+    def test_retries_failed_batches(self, monkeypatch):
+        monkeypatch.setattr("app.services.embedding.time.sleep", lambda s: None)
+        base = RecordingEmbeddings(fail_times=2)
+
+        vectors = _embedder(base, max_retries=3).embed_documents(["x"])
+
+        assert vectors == [[1.0]]
+        assert len(base.calls) == 3
+
+    def test_gives_up_after_max_retries(self, monkeypatch):
+        monkeypatch.setattr("app.services.embedding.time.sleep", lambda s: None)
+
+        with pytest.raises(RuntimeError):
+            _embedder(RecordingEmbeddings(fail_times=5), max_retries=1).embed_documents(["x"])
+
+    def test_concurrency_limit_is_shared_by_concurrent_callers(self):
+        base = RecordingEmbeddings(delay=0.02)
+        embedder = _embedder(base, max_concurrency=3, min_batch_size=1)
+        stats = {}
+
+        def ingest(n):
+            embedder.embed_documents(["a b"] * n)
+            stats[n] = embedder.last_stats["chunks"]
+
+        threads = [threading.Thread(target=ingest, args=(n,)) for n in (10, 20, 30, 40)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert base.max_in_flight <= 3
+        # Each thread sees the stats of its own call.
+        assert stats == {10: 10, 20: 20, 30: 30, 40: 40}
@@ -0,0 +1,128 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services import grobid
+from app.services.grobid import GrobidError, GrobidPool, fulltext_endpoint, page_ranges, process_fulltext
+from app.services.tei_parser import parse_tei
+from tests.services.test_tei_parser import FIRST_RANGE, SECOND_RANGE, TEI, stub_grobid_pool
+
+
+class TestGrobidClient:
+    def test_endpoint_accepts_base_or_full_url(self):
+        assert fulltext_endpoint("http://grobid:8070/") == "http://grobid:8070/api/processFulltextDocument"
+        assert fulltext_endpoint("http://grobid:8070/api/processFulltextDocument") == (
+            "http://grobid:8070/api/processFulltextDocument"
+        )
+
+    def test_single_post(self, monkeypatch):
+        post = MagicMock(return_value=MagicMock(status_code=200, content=TEI))
+        monkeypatch.setattr(grobid.requests, "post", post)
+
+        assert process_fulltext(b"%PDF-1.7", server_url="http://grobid:8070") == TEI
+        post.assert_called_once()
+
+    def test_page_range(self, monkeypatch):
+        post = MagicMock(return_value=MagicMock(status_code=200, content=TEI))
+        monkeypatch.setattr(grobid.requests, "post", post)
+
+        process_fulltext(b"%PDF-1.7", server_url="http://grobid:8070", start=21, end=40)
+        assert post.call_args.kwargs["data"]["start"] == "21"
+        assert post.call_args.kwargs["data"]["end"] == "40"
+
+    def test_error_keeps_raw_response(self, monkeypatch):
+        response = MagicMock(status_code=503, content=b"busy", text="busy", headers={})
+        monkeypatch.setattr(grobid.requests, "post", MagicMock(return_value=response))
+
+        with pytest.raises(GrobidError) as exc:
+            process_fulltext(b"%PDF-1.7", server_url="http://grobid:8070")
+        assert exc.value.status_code == 503
+        assert exc.value.response_text == "busy"
+
+
+class TestGrobidPool:
+    def _pool(self, monkeypatch, **kwargs):
+        pool = GrobidPool(["http://g1:8070", "http://g2:8070"], **kwargs)
+        monkeypatch.setattr(pool, "is_alive", lambda instance: True)
+        return pool
+
+    def test_least_outstanding_balancing(self, monkeypatch):
+        pool = self._pool(monkeypatch, max_concurrency_per_instance=2)
+        first = pool._acquire(set())
+        second = pool._acquire(set())
+        assert first.url != second.url
+        pool._release(first, failed=False)
+        assert pool._acquire(set()) is first
+
+    def test_per_instance_limit(self, monkeypatch):
+        pool = self._pool(monkeypatch, max_concurrency_per_instance=1)
+        held = [pool._acquire(set()), pool._acquire(set())]
+        future = pool._executor.submit(pool._acquire, set())
+        with pytest.raises(TimeoutError):
+            future.result(timeout=0.2)
+        pool._release(held[0], failed=False)
+        assert future.result(timeout=2) is held[0]
+
+    def test_failover_marks_instance_unhealthy(self, monkeypatch):
+        pool = self._pool(monkeypatch, health_check_interval=3600)
+        calls = []
+
+        def fake_process(pdf, *, filename, server_url, timeout):
+            calls.append(server_url)
+            if len(calls) == 1:
+                raise GrobidError("connection refused")
+            return TEI
+
+        monkeypatch.setattr(grobid, "process_fulltext", fake_process)
+
+        assert pool.submit(b"%PDF-1.7").result(timeout=2) == TEI
+        assert len(set(calls)) == 2
+        failed = next(i for i in pool.stats() if i["url"] == calls[0])
+        assert failed["healthy"] is False and failed["failures"] == 1
+        assert pool.process(b"%PDF-1.7") == TEI
+        assert calls[-1] == calls[1]
+
+    def test_read_timeout_is_not_retried(self, monkeypatch):
+        pool = self._pool(monkeypatch)
+        post = MagicMock(side_effect=grobid.requests.ReadTimeout("read timed out"))
+        monkeypatch.setattr(grobid.requests, "post", post)
+
+        with pytest.raises(GrobidError) as exc:
+            pool.process(b"%PDF-1.7")
+        assert exc.value.timeout is True
+        assert post.call_count == 1
+        assert all(i["healthy"] for i in pool.stats())
+
+    def test_client_errors_are_not_retried(self, monkeypatch):
+        pool = self._pool(monkeypatch)
+        fake = MagicMock(side_effect=GrobidError("bad pdf", status_code=400))
+        monkeypatch.setattr(grobid, "process_fulltext", fake)
+
+        with pytest.raises(GrobidError):
+            pool.process(b"not a pdf")
+        assert fake.call_count == 1
+        assert all(i["healthy"] for i in pool.stats())
+
+    def test_page_ranges(self):
+        assert page_ranges(45, 20) == [(1, 20), (21, 40), (41, 45)]
+        assert page_ranges(20, 20) == [(1, 20)]
+
+    def test_submit_page_ranges_combines_in_order(self):
+        ranges = {(1, 20): FIRST_RANGE, (21, 25): SECOND_RANGE}
+        pool = stub_grobid_pool(side_effect=lambda pdf, *, filename, pages: ranges[pages])
+
+        tei = pool.submit(b"%PDF-1.7", filename="thesis.pdf", page_ranges=list(ranges)).result(timeout=2)
+
+        assert [d.metadata["section_title"] for d in parse_tei(tei)] == ["Introduction", "Method", "Figure 1:"]
+        assert sorted(c.kwargs["pages"] for c in pool.process.call_args_list) == list(ranges)
+
+    def test_failed_page_range_fails_the_paper(self):
+        def process(pdf, *, filename, pages):
+            if pages[0] > 1:
+                raise GrobidError("Grobid returned status 500", status_code=500)
+            return FIRST_RANGE
+
+        pool = stub_grobid_pool(side_effect=process)
+
+        with pytest.raises(GrobidError):
+            pool.submit(b"%PDF-1.7", page_ranges=[(1, 20), (21, 25)]).result(timeout=2)
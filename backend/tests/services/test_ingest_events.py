@@ -0,0 +1,24 @@
+import fakeredis
+import orjson
+
+from app.services.ingest_events import IngestEvents
+
+
+class TestIngestEvents:
+    def test_events_are_numbered_per_task(self):
+        client = fakeredis.FakeRedis()
+        events = IngestEvents(client, ttl=60)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(events.channel("t1"))
+
+        events.publish("t1", "a", "downloading")
+        events.publish("t1", "a", "parsing")
+        events.publish("t2", "b", "queued")
+
+        messages = [pubsub.get_message(timeout=0.1) for _ in range(4)]  # the first is the subscription
+        published = [orjson.loads(m["data"]) for m in messages if m is not None]
+        assert [(e["stage"], e["seq"]) for e in published] == [("downloading", 1), ("parsing", 2)]
+        latest = events.latest(["t1", "t2", "t3"])
+        assert (latest["t1"]["stage"], latest["t1"]["seq"]) == ("parsing", 2)
+        assert latest["t2"]["seq"] == 1 and "t3" not in latest
+        assert 0 < client.ttl(events.seq_key("t1")) <= 60
@@ -0,0 +1,54 @@
+import fakeredis
+import pytest
+
+from app.services.ingest_lease import PaperLeases
+
+
+@pytest.fixture
+def leases():
+    return PaperLeases(fakeredis.FakeRedis(), ttl=60, poll_interval=0.01)
+
+
+class TestPaperLeases:
+    def test_waiter_gets_the_holders_result(self, leases):
+        token = leases.acquire("p1")
+        assert leases.acquire("p1") is None
+
+        leases.release("p1", token, {"status": "success"})
+
+        assert leases.wait("p1", timeout=1) == {"status": "success"}
+
+    def test_reacquire_drops_the_previous_result(self, leases):
+        token = leases.acquire("p1")
+        leases.release("p1", token, {"status": "failed"})
+
+        token = leases.acquire("p1")
+
+        assert token is not None
+        with pytest.raises(TimeoutError):
+            leases.wait("p1", timeout=0.05)
+        leases.release("p1", token, {"status": "success"})
+        assert leases.wait("p1", timeout=1) == {"status": "success"}
+
+    def test_release_without_result_lets_waiters_retry(self, leases):
+        token = leases.acquire("p1")
+        leases.release("p1", token)
+
+        assert leases.wait("p1", timeout=1) is None
+        assert leases.acquire("p1") is not None
+
+    def test_followers_are_handed_the_result(self, leases):
+        assert leases.follow("p1", "t2") is False  # nobody to follow
+        token = leases.acquire("p1")
+        assert leases.follow("p1", "t2") and leases.follow("p1", "t3")
+
+        assert leases.release("p1", token, {"status": "success"}) == ["t2", "t3"]
+        assert leases.release("p1", token, {"status": "success"}) == []
+
+    def test_followers_wait_for_a_holder_with_a_result(self, leases):
+        token = leases.acquire("p1")
+        leases.follow("p1", "t2")
+        assert leases.release("p1", token) == []
+
+        token = leases.acquire("p1")
+        assert leases.release("p1", token, {"status": "success"}) == ["t2"]
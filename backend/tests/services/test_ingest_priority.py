@@ -0,0 +1,71 @@
+import fakeredis
+import pytest
+
+from app.services import ingest_priority
+from app.services.ingest_priority import UserSlots
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ingest_priority, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def slots(clock):
+    return UserSlots(fakeredis.FakeRedis(), per_user=2, ttl=60)
+
+
+def _paper(i):
+    return {"paperId": f"p{i}"}
+
+
+class TestUserSlots:
+    def test_papers_over_the_share_wait_their_turn(self, slots):
+        admitted = [slots.submit("alice", f"t{i}", _paper(i)) for i in range(4)]
+
+        assert admitted == [[("t0", _paper(0))], [("t1", _paper(1))], [], []]
+        assert slots.in_flight("alice") == 2 and slots.waiting("alice") == 2
+        # Other users have their own share.
+        assert slots.submit("bob", "b0", _paper(9)) == [("b0", _paper(9))]
+
+    def test_release_admits_the_oldest_waiting_paper(self, slots):
+        for i in range(4):
+            slots.submit("alice", f"t{i}", _paper(i))
+
+        assert slots.release("alice", "t1") == [("t2", _paper(2))]
+        assert slots.release("alice", "t0") == [("t3", _paper(3))]
+        assert slots.release("alice", "t2") == []
+        assert slots.in_flight("alice") == 1 and slots.waiting("alice") == 0
+
+    def test_releasing_an_unknown_task_admits_nothing_extra(self, slots):
+        for i in range(3):
+            slots.submit("alice", f"t{i}", _paper(i))
+
+        assert slots.release("alice", "nope") == []
+        assert slots.waiting("alice") == 1
+
+    def test_slots_of_dead_tasks_expire(self, slots, clock):
+        for i in range(3):
+            slots.submit("alice", f"t{i}", _paper(i))
+
+        clock.now += 61
+        assert slots.in_flight("alice") == 0
+        # The next submit reclaims both slots for the waiting paper and itself.
+        assert slots.submit("alice", "t3", _paper(3)) == [("t2", _paper(2)), ("t3", _paper(3))]
+
+    def test_slot_key_expires_with_its_slots(self, slots):
+        slots.submit("alice", "t0", _paper(0))
+
+        assert 0 < slots.client.ttl("ingest_slots/alice") <= 60
+        slots.release("alice", "t0")
+        assert not slots.client.exists("ingest_slots/alice")
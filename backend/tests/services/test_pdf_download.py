@@ -0,0 +1,109 @@
+import io
+import os
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.core.config import settings
+from app.services import pdf_download
+from app.services.pdf_download import race_downloads, spool_pdf
+from tests.services.test_tei_parser import TEI, stub_grobid_pool
+
+
+def _response(chunks):
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.iter_content.return_value = iter(chunks)
+    return response
+
+
+class TestSpoolPdf:
+    def test_small_pdf_stays_in_memory(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(settings, "PDF_DOWNLOAD_DIR", str(tmp_path))
+        monkeypatch.setattr(pdf_download.requests, "get", MagicMock(return_value=_response([b"%PDF-", b"1.7"])))
+
+        with spool_pdf("https://arxiv.org/pdf/1706.03762") as pdf:
+            assert pdf.read() == b"%PDF-1.7"
+            assert os.listdir(tmp_path) == []
+
+    def test_large_pdf_spills_to_private_file(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(settings, "PDF_DOWNLOAD_DIR", str(tmp_path))
+        monkeypatch.setattr(settings, "PDF_SPOOL_MAX_MEMORY_BYTES", 4)
+        monkeypatch.setattr(pdf_download.requests, "get", MagicMock(return_value=_response([b"%PDF-", b"1.7"])))
+
+        with spool_pdf("https://arxiv.org/pdf/1706.03762") as pdf:
+            assert pdf.read() == b"%PDF-1.7"
+        # The spill file is anonymous and removed on close.
+        assert os.listdir(tmp_path) == []
+
+    def test_empty_download(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(settings, "PDF_DOWNLOAD_DIR", str(tmp_path))
+        monkeypatch.setattr(pdf_download.requests, "get", MagicMock(return_value=_response([])))
+
+        with pytest.raises(ValueError):
+            spool_pdf("https://example.org/empty.pdf")
+
+    def test_html_landing_page_is_rejected(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(settings, "PDF_DOWNLOAD_DIR", str(tmp_path))
+        page = b"<!DOCTYPE html><html>" + b" " * 2048 + b"</html>"
+        monkeypatch.setattr(pdf_download.requests, "get", MagicMock(return_value=_response([page])))
+
+        with pytest.raises(ValueError, match="Not a PDF"):
+            spool_pdf("https://example.org/landing")
+
+
+class TestRaceDownloads:
+    def test_failed_mirror_starts_next_without_waiting(self):
+        def fetch(url, cancel):
+            if url == "broken":
+                raise ValueError("404")
+            return io.BytesIO(b"%PDF-1.7")
+
+        started = time.monotonic()
+        winner, pdf, errors = race_downloads(["broken", "good"], fetch, hedge_delay=10)
+
+        assert winner == "good" and pdf.read() == b"%PDF-1.7"
+        assert [(url, str(e)) for url, e in errors] == [("broken", "404")]
+        assert time.monotonic() - started < 5
+
+    def test_all_mirrors_failing(self):
+        def fetch(url, cancel):
+            raise ValueError(url)
+
+        assert race_downloads(["a", "b"], fetch, hedge_delay=0.01)[:2] == (None, None)
+
+
+class TestAddS2PaperFromMemory:
+    def test_bytes_are_parsed_and_indexed(self, monkeypatch, qdrant_service):
+        import app.services.qdrant as qdrant_module
+
+        pool = stub_grobid_pool(return_value=TEI)
+        monkeypatch.setattr(qdrant_module, "get_grobid_pool", lambda: pool)
+        service = qdrant_service()
+
+        count = service.add_s2_paper(b"%PDF-1.7", "paper-1", filename="paper-1.pdf")
+
+        assert count == 4
+        pool.process.assert_called_once_with(b"%PDF-1.7", filename="paper-1.pdf")
+        assert service.get_paper_chunk_counts(["paper-1"])["paper-1"] > 0
+
+    def test_arxiv_papers_are_stored_whole_under_stable_ids(self, monkeypatch, qdrant_service):
+        import app.services.qdrant as qdrant_module
+        from app.core.schema import ArxivPaper
+        from app.services.chunk_ids import parent_document_id
+
+        pool = stub_grobid_pool(return_value=TEI)
+        monkeypatch.setattr(qdrant_module, "get_grobid_pool", lambda: pool)
+        service = qdrant_service(parent_store_backend=settings.PARENT_STORE_BACKEND)
+        monkeypatch.setattr(service, "download_pdf", lambda paper: io.BytesIO(b"%PDF-1.7"))
+        paper = ArxivPaper(id="1706.03762", title="Attention Is All You Need", abstract="")
+
+        service.add_paper(paper)
+        service.add_paper(paper)  # re-adding overwrites instead of duplicating
+
+        parents = service.parse_pdf(b"%PDF-1.7", "1706.03762.pdf")
+        for doc in parents:
+            doc.metadata.update(paper.model_dump())
+        points, _ = service.client.scroll(service.vector_store.collection_name, limit=100)
+        assert sorted(str(p.id) for p in points) == sorted(parent_document_id(d) for d in parents)
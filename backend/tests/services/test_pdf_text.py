@@ -0,0 +1,137 @@
+import threading
+
+import pytest
+
+from app.core.config import settings
+from app.services import artifact_cache, pdf_text
+from app.services.artifact_cache import sha256_of
+from app.services.pdf_text import PdfTextError, parse_pdf_locally, split_sections
+from tests.services.test_tei_parser import FIRST_RANGE, SECOND_RANGE, TEI, stub_grobid_pool
+
+
+def make_pdf(pages: list[list[str]]) -> bytes:
+    """Minimal PDF with one line of Helvetica text per entry of each page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        ops = " ".join(f"1 0 0 1 72 {720 - 20 * i} Tm ({line}) Tj" for i, line in enumerate(lines))
+        stream = f"BT /F1 12 Tf {ops} ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+class TestSplitSections:
+    def test_headings_split_pages_and_references_end_the_text(self):
+        pages = [
+            "Attention Is All You Need\nAbstract\nWe propose the Transformer.\n1 Introduction\nRecurrent models",
+            "are sequential.\n2. Model Architecture\nEncoder and decoder stacks.\nREFERENCES\n[1] Bahdanau et al.",
+        ]
+
+        title, chunks = split_sections(pages)
+
+        assert title == "Attention Is All You Need"
+        assert [(c["page"], c["section_number"], c["section_title"]) for c in chunks] == [
+            (1, "None", "Preamble"),
+            (1, "None", "Abstract"),
+            (1, "1", "Introduction"),
+            (2, "1", "Introduction"),
+            (2, "2", "Model Architecture"),
+        ]
+        assert not any("Bahdanau" in c["text"] for c in chunks)
+
+    def test_sentences_starting_with_numbers_are_not_headings(self):
+        _, chunks = split_sections(["1 Introduction\n3 layers are stacked. Each has 8 heads."])
+
+        assert [c["section_title"] for c in chunks] == ["Introduction"]
+
+
+class TestParsePdfLocally:
+    def test_page_sections_from_pool_process(self):
+        pdf = make_pdf([["Attention Is All You Need", "1 Introduction", "Recurrent models"], ["2 Model", "Stacks"]])
+
+        docs = parse_pdf_locally(pdf, "attention.pdf")
+
+        assert [(d.metadata["section_title"], d.metadata["pages"]) for d in docs] == [
+            ("Preamble", "('1', '1')"),
+            ("Introduction", "('1', '1')"),
+            ("Model", "('2', '2')"),
+        ]
+        assert docs[0].metadata["paper_title"] == "Attention Is All You Need"
+        assert all(d.metadata["extractor"] == "pypdf" for d in docs)
+
+    def test_pdf_without_text(self):
+        with pytest.raises(PdfTextError):
+            parse_pdf_locally(make_pdf([[]]), "scan.pdf")
+
+
+class TestGrobidFallback:
+    def _service(self, monkeypatch, qdrant_service, pool):
+        import app.services.qdrant as qdrant_module
+
+        monkeypatch.setattr(qdrant_module, "get_grobid_pool", lambda: pool)
+        return qdrant_service()
+
+    def test_slow_grobid_falls_back_and_late_tei_is_cached(self, monkeypatch, qdrant_service, tmp_path):
+        monkeypatch.setattr(settings, "GROBID_LATENCY_BUDGET_SECONDS", 0.05)
+        monkeypatch.setattr(settings, "INGEST_CACHE_DIR", str(tmp_path))
+        monkeypatch.setattr(artifact_cache, "_cache", None)
+        release = threading.Event()
+        pool = stub_grobid_pool(side_effect=lambda *a, **kw: release.wait(5) and TEI)
+        service = self._service(monkeypatch, qdrant_service, pool)
+        pdf = make_pdf([["A Paper", "1 Introduction", "Text on page one"]])
+        flagged = []
+
+        chunks = service.add_s2_paper(pdf, "paper-1", on_fallback=lambda: flagged.append("paper-1"))
+
+        assert chunks == 2 and flagged == ["paper-1"]
+        assert service.get_paper_chunk_counts(["paper-1"])["paper-1"] > 0
+        release.set()
+        pool._executor.shutdown(wait=True)
+        assert artifact_cache.get_artifact_cache().get_tei(sha256_of(pdf)) == TEI
+
+    def test_grobid_error_falls_back_unless_disallowed(self, monkeypatch, qdrant_service):
+        from app.services.grobid import GrobidError
+
+        pool = stub_grobid_pool(side_effect=GrobidError("Grobid returned status 503", status_code=503))
+        service = self._service(monkeypatch, qdrant_service, pool)
+        pdf = make_pdf([["A Paper", "Abstract", "Short"]])
+
+        assert [d.metadata["extractor"] for d in service.parse_pdf(pdf, "a.pdf")] == ["pypdf", "pypdf"]
+        with pytest.raises(GrobidError):
+            service.parse_pdf(pdf, "a.pdf", allow_fallback=False)
+
+    def test_long_pdf_is_parsed_in_page_ranges(self, monkeypatch, qdrant_service):
+        monkeypatch.setattr(settings, "GROBID_SPLIT_MIN_PAGES", 3)
+        monkeypatch.setattr(settings, "GROBID_PAGES_PER_RANGE", 2)
+        ranges = {(1, 2): FIRST_RANGE, (3, 3): SECOND_RANGE}
+        pool = stub_grobid_pool(side_effect=lambda pdf, *, filename, pages: ranges[pages])
+        service = self._service(monkeypatch, qdrant_service, pool)
+
+        docs = service.parse_pdf(make_pdf([["One"], ["Two"], ["Three"]]), "thesis.pdf")
+
+        assert [d.metadata["section_title"] for d in docs] == ["Introduction", "Method", "Figure 1:"]
+        assert pool.process.call_count == 2
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _shutdown_pool():
+    yield
+    if pdf_text._pool is not None:
+        pdf_text._pool.shutdown()
+        pdf_text._pool = None
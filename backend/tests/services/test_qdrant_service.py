@@ -0,0 +1,128 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from app.core.config import settings
+from app.services.qdrant import QdrantService
+
+
+def _make_service() -> QdrantService:
+    """Build a QdrantService without touching a live Qdrant instance."""
+    service = QdrantService.__new__(QdrantService)
+    service.config = settings.qdrant_config
+    service.client = MagicMock()
+    return service
+
+
+class TestGetPaperChunkCounts:
+    def test_single_facet_request_for_all_papers(self):
+        service = _make_service()
+        service.client.facet.return_value = SimpleNamespace(hits=[
+            SimpleNamespace(value="p1", count=12),
+            SimpleNamespace(value="p3", count=4),
+        ])
+
+        counts = service.get_paper_chunk_counts(["p1", "p2", "p3"])
+
+        assert counts == {"p1": 12, "p2": 0, "p3": 4}
+        service.client.facet.assert_called_once()
+        kwargs = service.client.facet.call_args.kwargs
+        assert kwargs["key"] == "metadata.id"
+        assert kwargs["limit"] == 3
+
+    def test_duplicate_ids_are_collapsed(self):
+        service = _make_service()
+        service.client.facet.return_value = SimpleNamespace(hits=[])
+
+        counts = service.get_paper_chunk_counts(["p1", "p1"])
+
+        assert counts == {"p1": 0}
+        assert service.client.facet.call_args.kwargs["limit"] == 1
+
+    def test_empty_input_skips_request(self):
+        service = _make_service()
+        assert service.get_paper_chunk_counts([]) == {}
+        service.client.facet.assert_not_called()
+
+
+class TestSingleStoreMode:
+    """Parents in a payload-only Qdrant collection, joined at search time."""
+
+    def test_returns_parents_in_one_query(self, monkeypatch, qdrant_service):
+        from langchain_core.documents import Document
+
+        service = qdrant_service()
+        monkeypatch.setattr(settings, "PARENT_WINDOW_CHARS", 0)
+        section = " ".join(f"token{i}" for i in range(300))
+        service.retriever.add_documents([
+            Document(page_content=section, metadata={"id": "p1", "section_title": "Intro"}),
+            Document(page_content="unrelated " * 80, metadata={"id": "p2"}),
+        ])
+
+        results = service.search_selected_ids(["p1"], "token5", k=5)
+
+        assert [d.page_content for d in results] == [section]
+        assert results[0].metadata["section_title"] == "Intro"
+        assert len(list(service.docstore.yield_keys())) == 2
+
+    def test_window_mode(self, monkeypatch, qdrant_service):
+        from langchain_core.documents import Document
+
+        service = qdrant_service()
+        monkeypatch.setattr(settings, "PARENT_WINDOW_CHARS", 600)
+        section = " ".join(f"token{i}" for i in range(600))
+        service.retriever.add_documents([Document(page_content=section, metadata={"id": "p1"})])
+
+        results = service.search_selected_ids(["p1"], "token5", k=1)
+
+        assert len(results) == 1
+        assert len(results[0].page_content) <= 600
+        assert results[0].page_content in section
+
+    def test_parents_of_the_k_best_children_only(self, monkeypatch, qdrant_service):
+        from langchain_core.documents import Document
+        from langchain_core.embeddings import Embeddings
+
+        class KeywordEmbedding(Embeddings):
+            """Closer to the query "alpha" the more of a text is that word."""
+
+            def embed_query(self, text):
+                words = text.split()
+                share = words.count("alpha") / len(words)
+                return [share, 1 - share] + [0.0] * 14
+
+            def embed_documents(self, texts):
+                return [self.embed_query(t) for t in texts]
+
+        monkeypatch.setattr(settings, "PARENT_WINDOW_CHARS", 0)
+        service = qdrant_service(embedding=KeywordEmbedding())
+        service.retriever.add_documents(
+            [Document(page_content="alpha " * 300, metadata={"id": "p1", "section_title": "All alpha"})]
+            + [Document(page_content=f"alpha beta{i} beta", metadata={"id": "p1"}) for i in range(4)]
+        )
+
+        results = service.search_selected_ids(["p1"], "alpha", k=4)
+
+        # As in Redis mode: the 4 best children all belong to the first parent.
+        assert [d.metadata.get("section_title") for d in results] == ["All alpha"]
+
+    def test_windows_use_at_most_k_children(self, monkeypatch, qdrant_service):
+        from langchain_core.documents import Document
+
+        import app.services.qdrant as qdrant_module
+
+        service = qdrant_service()
+        monkeypatch.setattr(settings, "PARENT_WINDOW_CHARS", 600)
+        service.retriever.add_documents([
+            Document(page_content=" ".join(f"s{s}-token{i}" for i in range(600)), metadata={"id": "p1"})
+            for s in range(4)
+        ])
+        seen = []
+
+        def build_windows(children, parents, window_chars):
+            seen.append(len(children))
+            return []
+
+        monkeypatch.setattr(qdrant_module, "build_parent_windows", build_windows)
+        service.search_selected_ids(["p1"], "s0-token5", k=3)
+
+        assert seen == [3]
@@ -0,0 +1,155 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from app.services import resilience
+from app.services.resilience import AIMDLimiter, CircuitBreaker, CircuitOpenError, Dependency, OverloadedError
+
+
+def _dependency(**breaker) -> Dependency:
+    return Dependency(
+        "svc",
+        CircuitBreaker("svc", **{"failure_threshold": 2, "recovery_timeout": 0.05, **breaker}),
+        AIMDLimiter("svc", latency_target=1.0, max_limit=4),
+        max_wait=0.05,
+    )
+
+
+def _fail():
+    raise ConnectionError("down")
+
+
+class TestCircuitBreaker:
+    def test_opens_then_half_opens_with_a_single_probe(self):
+        dep = _dependency()
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                dep.call(_fail)
+
+        with pytest.raises(CircuitOpenError):
+            dep.call(lambda: "not called")
+        time.sleep(0.06)
+        # The first caller after the cool-down probes; others are still rejected meanwhile.
+        dep.breaker.allow()
+        with pytest.raises(CircuitOpenError):
+            dep.breaker.allow()
+        dep.breaker.record_success()
+
+        assert dep.call(lambda: "ok") == "ok"
+        assert dep.stats()["breaker"] == {
+            "state": "closed", "consecutive_failures": 0, "times_opened": 1, "rejected": 2,
+        }
+
+    def test_failed_probe_reopens(self):
+        dep = _dependency(failure_threshold=1)
+        with pytest.raises(ConnectionError):
+            dep.call(_fail)
+        time.sleep(0.06)
+
+        with pytest.raises(ConnectionError):
+            dep.call(_fail)
+
+        assert dep.breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            dep.call(lambda: "not called")
+
+    def test_client_errors_do_not_count(self):
+        dep = _dependency(failure_threshold=1)
+        response = httpx.Response(404, request=httpx.Request("GET", "https://api.semanticscholar.org/x"))
+
+        def not_found():
+            response.raise_for_status()
+
+        with pytest.raises(httpx.HTTPStatusError):
+            dep.call(not_found)
+
+        assert dep.breaker.state == CircuitBreaker.CLOSED and dep.stats()["failures"] == 0
+
+    def test_cancelled_probe_is_abandoned(self):
+        dep = _dependency(failure_threshold=1)
+        with pytest.raises(ConnectionError):
+            dep.call(_fail)
+        time.sleep(0.06)
+
+        with pytest.raises(KeyboardInterrupt):
+            with dep.guard():
+                raise KeyboardInterrupt
+
+        # Not a failure: the breaker is still half-open and the next call probes.
+        assert dep.breaker.state == CircuitBreaker.HALF_OPEN
+        assert dep.limiter.in_flight == 0 and dep.stats()["failures"] == 1
+        assert dep.call(lambda: "ok") == "ok" and dep.breaker.state == CircuitBreaker.CLOSED
+
+    async def test_cancelled_async_call_keeps_the_limit(self):
+        dep = _dependency()
+        limit = dep.limiter.limit
+
+        async def slow():
+            async with dep.aguard():
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(slow())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert dep.limiter.in_flight == 0 and dep.limiter.limit == limit
+        assert dep.stats()["calls"] == 0 and dep.breaker.failures == 0
+
+
+class TestAIMDLimiter:
+    def test_halves_once_per_congestion_event_and_grows_additively(self):
+        limiter = AIMDLimiter("svc", latency_target=1.0, max_limit=8)
+        for _ in range(3):
+            limiter.acquire(timeout=0)
+        # Three calls started together all come back slow: one decrease.
+        for _ in range(3):
+            limiter.release(latency=2.0, failed=False)
+        assert limiter.limit == 4
+
+        for _ in range(4):
+            limiter.acquire(timeout=0)
+            limiter.release(latency=0.1, failed=False)
+        assert 4.9 < limiter.limit < 5.1
+
+    def test_waits_for_a_slot_then_rejects(self):
+        limiter = AIMDLimiter("svc", latency_target=1.0, max_limit=1)
+        limiter.acquire(timeout=0)
+        threading.Timer(0.02, limiter.release, args=(0.02, False)).start()
+
+        limiter.acquire(timeout=1)
+        with pytest.raises(OverloadedError):
+            limiter.acquire(timeout=0.02)
+        assert limiter.stats()["rejected"] == 1
+
+
+class TestGrobidBreaker:
+    def test_open_breaker_goes_straight_to_fallback(self, monkeypatch):
+        from app.core.config import settings
+        from tests.services.test_pdf_text import make_pdf
+        from tests.services.test_tei_parser import stub_grobid_pool
+
+        import app.services.qdrant as qdrant_module
+
+        pool = stub_grobid_pool()
+        monkeypatch.setattr(qdrant_module, "get_grobid_pool", lambda: pool)
+        monkeypatch.setattr(settings, "CIRCUIT_FAILURE_THRESHOLD", 1)
+        resilience.get_dependency("grobid").breaker.record_failure()
+        service = object.__new__(qdrant_module.QdrantService)
+
+        docs = service.parse_pdf(make_pdf([["A Paper", "Abstract", "Short"]]), "a.pdf")
+
+        pool.process.assert_not_called()
+        assert docs[0].metadata["extractor"] == "pypdf"
+
+
+async def test_dependency_metrics_endpoint(client):
+    resilience.get_dependency("s2")
+
+    resp = await client.get("/metrics/dependencies")
+
+    assert resp.json()["dependencies"]["s2"]["breaker"]["state"] == "closed"
@@ -0,0 +1,105 @@
+from unittest.mock import patch
+
+from langchain_classic.storage import InMemoryStore
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.vectorstores import InMemoryVectorStore
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.services.retriever import ParentWindowRetriever, build_parent_windows
+
+
+SECTION = " ".join(f"word{i:03d}" for i in range(400))  # 3199 chars
+
+
+def _child(start: int, length: int = 80, parent_id: str = "p1") -> Document:
+    return Document(
+        page_content=SECTION[start:start + length],
+        metadata={"doc_id": parent_id, "start_index": start},
+    )
+
+
+class TestBuildParentWindows:
+    def test_window_is_bounded_and_contains_child(self):
+        parents = {"p1": Document(page_content=SECTION, metadata={"id": "paper", "para": "3"})}
+        child = _child(1600)
+
+        windows = build_parent_windows([child], parents, window_chars=400)
+
+        assert len(windows) == 1
+        assert child.page_content in windows[0].page_content
+        assert len(windows[0].page_content) <= 400
+        assert windows[0].metadata["id"] == "paper"
+        assert windows[0].metadata["window_start"] < 1600 < windows[0].metadata["window_end"]
+
+    def test_overlapping_windows_are_merged(self):
+        parents = {"p1": Document(page_content=SECTION, metadata={})}
+
+        windows = build_parent_windows([_child(1000), _child(1100)], parents, window_chars=400)
+
+        assert len(windows) == 1
+        assert SECTION[1000:1180] in windows[0].page_content
+
+    def test_distinct_windows_keep_rank_order_by_parent(self):
+        parents = {
+            "p1": Document(page_content=SECTION, metadata={}),
+            "p2": Document(page_content=SECTION, metadata={}),
+        }
+        hits = [_child(2500, parent_id="p2"), _child(0), _child(2800)]
+
+        windows = build_parent_windows(hits, parents, window_chars=200)
+
+        assert [w.metadata["doc_id"] for w in windows] == ["p2", "p1", "p1"]
+        assert len({w.metadata["para"] for w in windows}) == 3
+
+    def test_missing_parent_and_unknown_start_index(self):
+        parents = {"p1": Document(page_content=SECTION, metadata={})}
+        legacy_child = Document(page_content=SECTION[800:880], metadata={"doc_id": "p1"})
+        orphan = _child(0, parent_id="gone")
+
+        windows = build_parent_windows([orphan, legacy_child], parents, window_chars=300)
+
+        assert len(windows) == 1
+        assert legacy_child.page_content in windows[0].page_content
+
+
+class TestParentWindowRetriever:
+    def _retriever(self, **kwargs) -> ParentWindowRetriever:
+        retriever = ParentWindowRetriever(
+            vectorstore=InMemoryVectorStore(DeterministicFakeEmbedding(size=16)),
+            docstore=InMemoryStore(),
+            child_splitter=RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=0, add_start_index=True),
+            window_chars=300,
+            **kwargs,
+        )
+        retriever.add_documents([Document(page_content=SECTION, metadata={"id": "p1"})])
+        return retriever
+
+    def test_window_path_honours_score_threshold(self):
+        retriever = self._retriever(search_type="similarity_score_threshold", search_kwargs={"score_threshold": 0.9})
+        child = _child(40)
+        child.metadata["doc_id"] = next(retriever.docstore.yield_keys())
+
+        scored_search = patch.object(
+            InMemoryVectorStore, "similarity_search_with_relevance_scores", return_value=[(child, 0.95)]
+        )
+        with scored_search as scored, patch.object(InMemoryVectorStore, "similarity_search") as plain:
+            windows = retriever.invoke("word005")
+
+        scored.assert_called_once_with("word005", score_threshold=0.9)
+        plain.assert_not_called()
+        assert len(windows) == 1 and child.page_content in windows[0].page_content
+
+    async def test_window_path_uses_mmr(self):
+        retriever = self._retriever(search_type="mmr", search_kwargs={"k": 2, "fetch_k": 4})
+
+        store = retriever.vectorstore
+        with patch.object(store, "max_marginal_relevance_search", wraps=store.max_marginal_relevance_search) as mmr, \
+                patch.object(store, "amax_marginal_relevance_search", wraps=store.amax_marginal_relevance_search) as ammr:
+            windows = retriever.invoke("word005")
+            awindows = await retriever.ainvoke("word005")
+
+        mmr.assert_called_once_with("word005", k=2, fetch_k=4)
+        ammr.assert_called_once_with("word005", k=2, fetch_k=4)
+        assert windows and all(len(w.page_content) <= 300 for w in windows)
+        assert [w.page_content for w in awindows] == [w.page_content for w in windows]
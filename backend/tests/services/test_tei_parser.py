@@ -0,0 +1,100 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services.grobid import GrobidPool
+from app.services.tei_parser import TeiParseError, combine_tei, parse_tei
+
+TEI = b"""<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0">
+  <teiHeader>
+    <fileDesc>
+      <titleStmt><title level="a" type="main">Attention Is All You Need</title></titleStmt>
+    </fileDesc>
+  </teiHeader>
+  <text>
+    <body>
+      <div><head n="1">Introduction</head>
+        <p><s coords="1,10,20,30,5">Recurrent models <ref>[1]</ref> are slow.</s><s coords="1,10,30,30,5">We fix that.</s></p>
+        <p><s coords="2,10,20,30,5">Second paragraph.</s></p>
+      </div>
+      <div><head>Notes</head><p><s coords="3,1,1,1,1">First note.</s></p></div>
+      <div><head>Notes</head><p><s coords="4,1,1,1,1">Second note.</s></p></div>
+      <figure xml:id="fig_0" coords="5,1,2,3,4">
+        <head>Figure 1:</head><label>1</label><figDesc>The Transformer architecture.</figDesc>
+      </figure>
+      <figure type="table" xml:id="tab_0"><head>Table 1:</head><figDesc>BLEU scores.</figDesc></figure>
+    </body>
+    <back>
+      <div type="references"><listBibl><biblStruct><analytic><title level="a" type="main">Other paper</title></analytic></biblStruct></listBibl></div>
+    </back>
+  </text>
+</TEI>
+"""
+
+
+def stub_grobid_pool(**process) -> GrobidPool:
+    """Real pool whose ``process`` is a MagicMock built from ``process``, so ``submit`` still runs it."""
+    pool = GrobidPool(["http://grobid:8070"])
+    pool.process = MagicMock(**process)
+    return pool
+
+
+def range_tei(title: str, body: str) -> bytes:
+    """TEI of one page range as Grobid returns it with ``start``/``end``."""
+    return (
+        '<TEI xmlns="http://www.tei-c.org/ns/1.0"><teiHeader><fileDesc><titleStmt>'
+        f'<title level="a" type="main">{title}</title></titleStmt></fileDesc></teiHeader>'
+        f"<text><body>{body}</body></text></TEI>"
+    ).encode()
+
+
+FIRST_RANGE = range_tei(
+    "A Long Thesis",
+    '<div><head n="1">Introduction</head><p><s coords="2,1,1,1,1">Theses are long.</s></p></div>',
+)
+SECOND_RANGE = range_tei(
+    "Chapter 3",
+    '<div><p><s coords="1,1,1,1,1">So they are split.</s></p></div>'
+    '<div><head n="2">Method</head><p><s coords="3,1,1,1,1">Ranges run in parallel.</s></p></div>'
+    '<figure xml:id="fig_0" coords="2,1,2,3,4"><head>Figure 1:</head><figDesc>Ranges.</figDesc></figure>',
+)
+
+
+class TestParseTei:
+    def test_sections_and_captions(self):
+        docs = parse_tei(TEI)
+
+        intro, notes, figure, table = docs
+        assert intro.page_content == "Recurrent models [1] are slow. We fix that.\n\nSecond paragraph."
+        assert intro.metadata["section_title"] == "Introduction"
+        assert intro.metadata["section_number"] == "1"
+        assert intro.metadata["pages"] == str(("1", "2"))
+        assert "coords" not in intro.metadata
+        assert all(d.metadata["paper_title"] == "Attention Is All You Need" for d in docs)
+
+        assert notes.page_content == "First note.\n\nSecond note."
+        assert notes.metadata["pages"] == str(("3", "4"))
+
+        assert figure.metadata["kind"] == "figure"
+        assert figure.page_content == "Figure 1: The Transformer architecture."
+        assert figure.metadata["coords"] == "5,1,2,3,4"
+        assert table.metadata["kind"] == "table"
+
+    def test_page_ranges_are_stitched(self):
+        docs = parse_tei(combine_tei([(1, FIRST_RANGE), (21, SECOND_RANGE)]))
+
+        intro, method, figure = docs
+        assert intro.page_content == "Theses are long.\n\nSo they are split."
+        assert intro.metadata["pages"] == str(("2", "21"))
+        assert method.metadata["pages"] == str(("23", "23"))
+        assert figure.metadata["coords"] == "22,1,2,3,4"
+        assert all(d.metadata["paper_title"] == "A Long Thesis" for d in docs)
+
+    def test_invalid_xml(self):
+        with pytest.raises(TeiParseError):
+            parse_tei(b"<html>Service unavailable")
+
+    def test_empty_document(self):
+        with pytest.raises(TeiParseError):
+            parse_tei(b'<TEI xmlns="http://www.tei-c.org/ns/1.0"><text><body/></text></TEI>')
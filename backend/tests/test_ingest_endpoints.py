@@ -1,21 +1,40 @@
 from unittest.mock import MagicMock, patch
 
+import fakeredis
 import pytest
 
+from app.core.config import settings
+from app.services.ingest_priority import BULK_PRIORITY, UserSlots
+from app.tasks.ingest import release_slot
+
+
+@pytest.fixture(autouse=True)
+def _dev_user(monkeypatch):
+    """Requests are made as the DISABLE_AUTH dev user unless a test turns auth back on."""
+    monkeypatch.setattr(settings, "DISABLE_AUTH", True)
+
+
+@pytest.fixture
+def mock_task():
+    """Patch ingest_paper_task wherever /ingest sends it, with fakeredis-backed user slots."""
+    slots = UserSlots(fakeredis.FakeRedis(), per_user=4, ttl=60)
+    mock_task = MagicMock()
+    mock_task.apply_async.side_effect = lambda **kw: MagicMock(id=kw["task_id"])
+    with patch("app.webapp.app.ingest_paper_task", mock_task), \
+            patch("app.tasks.ingest.ingest_paper_task", mock_task), \
+            patch("app.webapp.app.get_user_slots", return_value=slots), \
+            patch("app.tasks.ingest.get_user_slots", return_value=slots):
+        yield mock_task
+
+
+def _sent(mock_task) -> list[dict]:
+    return [c.kwargs for c in mock_task.apply_async.call_args_list]
+
 
 class TestPostIngest:
     """Tests for POST /ingest endpoint."""
 
-    @pytest.fixture
-    def mock_delay(self):
-        """Patch ingest_paper_task.delay and return the mock."""
-        with patch("app.webapp.app.ingest_paper_task") as mock_task:
-            mock_result = MagicMock()
-            mock_result.id = "task-abc-123"
-            mock_task.delay.return_value = mock_result
-            yield mock_task
-
-    async def test_ingest_single_paper(self, client, mock_delay):
+    async def test_ingest_single_paper(self, client, mock_task):
         payload = {"papers": [{"paperId": "abc123"}]}
         resp = await client.post("/ingest", json=payload)
 
@@ -23,53 +42,38 @@ class TestPostIngest:
         body = resp.json()
         assert len(body["tasks"]) == 1
         assert body["tasks"][0]["paperId"] == "abc123"
-        assert body["tasks"][0]["taskId"] == "task-abc-123"
-        mock_delay.delay.assert_called_once()
-        call_arg = mock_delay.delay.call_args[0][0]
-        assert call_arg["paperId"] == "abc123"
+        [sent] = _sent(mock_task)
+        assert body["tasks"][0]["taskId"] == sent["task_id"]
+        assert sent["args"][0]["paperId"] == "abc123"
 
-    async def test_ingest_multiple_papers(self, client):
+    async def test_ingest_multiple_papers(self, client, mock_task):
         ids = [f"paper-{i}" for i in range(3)]
-        task_ids = [f"task-{i}" for i in range(3)]
-
-        with patch("app.webapp.app.ingest_paper_task") as mock_task:
-            call_count = 0
-
-            def side_effect(*args, **kwargs):
-                nonlocal call_count
-                m = MagicMock()
-                m.id = task_ids[call_count]
-                call_count += 1
-                return m
 
-            mock_task.delay.side_effect = side_effect
-
-            payload = {"papers": [{"paperId": pid} for pid in ids]}
-            resp = await client.post("/ingest", json=payload)
+        payload = {"papers": [{"paperId": pid} for pid in ids]}
+        resp = await client.post("/ingest", json=payload)
 
         assert resp.status_code == 202
         tasks = resp.json()["tasks"]
-        assert len(tasks) == 3
-        for i, t in enumerate(tasks):
-            assert t["paperId"] == ids[i]
-            assert t["taskId"] == task_ids[i]
+        assert [t["paperId"] for t in tasks] == ids
+        assert [t["taskId"] for t in tasks] == [c["task_id"] for c in _sent(mock_task)]
+        assert len({t["taskId"] for t in tasks}) == 3
 
-    async def test_ingest_empty_list(self, client, mock_delay):
+    async def test_ingest_empty_list(self, client, mock_task):
         resp = await client.post("/ingest", json={"papers": []})
         assert resp.status_code == 202
         assert resp.json()["tasks"] == []
-        mock_delay.delay.assert_not_called()
+        mock_task.apply_async.assert_not_called()
 
-    async def test_ingest_missing_paper_id(self, client, mock_delay):
+    async def test_ingest_missing_paper_id(self, client, mock_task):
         # paperId is required on S2Paper
         resp = await client.post("/ingest", json={"papers": [{"title": "no id"}]})
         assert resp.status_code == 422
 
-    async def test_ingest_missing_papers_field(self, client, mock_delay):
+    async def test_ingest_missing_papers_field(self, client, mock_task):
         resp = await client.post("/ingest", json={"not_papers": []})
         assert resp.status_code == 422
 
-    async def test_ingest_paper_with_all_optional_fields(self, client, mock_delay):
+    async def test_ingest_paper_with_all_optional_fields(self, client, mock_task):
         paper = {
             "paperId": "full-paper",
             "abstract": "An abstract",
@@ -94,12 +98,86 @@ class TestPostIngest:
         }
         resp = await client.post("/ingest", json={"papers": [paper]})
         assert resp.status_code == 202
-        call_arg = mock_delay.delay.call_args[0][0]
+        call_arg = mock_task.apply_async.call_args.kwargs["args"][0]
         assert call_arg["paperId"] == "full-paper"
         assert call_arg["abstract"] == "An abstract"
         assert call_arg["citationCount"] == 42
         assert call_arg["journal"]["name"] == "Nature"
 
+    async def test_requires_a_session(self, client, mock_task, monkeypatch):
+        monkeypatch.setattr(settings, "DISABLE_AUTH", False)
+
+        resp = await client.post("/ingest", json={"papers": [{"paperId": "p1"}]})
+
+        assert resp.status_code == 401
+        mock_task.apply_async.assert_not_called()
+
+
+class TestIngestPriority:
+    """Per-user fairness and bulk priority on POST /ingest."""
+
+    async def test_user_over_share_waits_for_a_slot(self, client, mock_task):
+        payload = {"papers": [{"paperId": f"p{i}"} for i in range(6)]}
+        resp = await client.post("/ingest", json=payload)
+
+        assert resp.status_code == 202
+        task_ids = [t["taskId"] for t in resp.json()["tasks"]]
+        sent = _sent(mock_task)
+        # Only the user's share is queued, each holding one of their slots.
+        assert [c["task_id"] for c in sent] == task_ids[:4]
+        assert {c["queue"] for c in sent} == {"ingest.interactive"}
+        assert all(c["kwargs"] == {"user_id": "dev-user"} for c in sent)
+
+        # A finished paper lets the oldest waiting one in.
+        release_slot("dev-user", task_ids[0])
+        assert _sent(mock_task)[-1]["task_id"] == task_ids[4]
+
+    async def test_bulk_priority_skips_slots(self, client, mock_task):
+        payload = {"papers": [{"paperId": f"p{i}"} for i in range(6)], "priority": "bulk"}
+        await client.post("/ingest", json=payload)
+
+        sent = _sent(mock_task)
+        assert len(sent) == 6 and {c["queue"] for c in sent} == {"ingest.bulk"}
+        # No slot to give back; the staged pipeline keeps the papers behind interactive ones.
+        assert all(c["kwargs"] == {"priority": "bulk"} and c["priority"] == BULK_PRIORITY for c in sent)
+
+
+class TestPostIngestBatch:
+    """Tests for POST /ingest/batch endpoint."""
+
+    async def test_single_task_with_preassigned_ids(self, client):
+        with patch("app.webapp.app.ingest_batch_task") as mock_task:
+            payload = {"papers": [{"paperId": "p1"}, {"paperId": "p2"}]}
+            resp = await client.post("/ingest/batch", json=payload)
+
+        assert resp.status_code == 202
+        tasks = resp.json()["tasks"]
+        assert [t["paperId"] for t in tasks] == ["p1", "p2"]
+        mock_task.delay.assert_called_once()
+        paper_dicts, task_ids = mock_task.delay.call_args[0]
+        assert [d["paperId"] for d in paper_dicts] == ["p1", "p2"]
+        assert task_ids == [t["taskId"] for t in tasks]
+        assert len(set(task_ids)) == 2
+
+    async def test_duplicate_papers_share_one_task(self, client):
+        with patch("app.webapp.app.ingest_batch_task") as mock_task:
+            payload = {"papers": [{"paperId": "p1"}, {"paperId": "p2"}, {"paperId": "p1"}]}
+            resp = await client.post("/ingest/batch", json=payload)
+
+        tasks = resp.json()["tasks"]
+        paper_dicts, task_ids = mock_task.delay.call_args[0]
+        assert [d["paperId"] for d in paper_dicts] == ["p1", "p2"]
+        assert [t["paperId"] for t in tasks] == ["p1", "p2", "p1"]
+        assert [t["taskId"] for t in tasks] == [task_ids[0], task_ids[1], task_ids[0]]
+
+    async def test_empty_list(self, client):
+        with patch("app.webapp.app.ingest_batch_task") as mock_task:
+            resp = await client.post("/ingest/batch", json={"papers": []})
+
+        assert resp.status_code == 202
+        assert resp.json()["tasks"] == []
+        mock_task.delay.assert_not_called()
+
 
 # ---------------------------------------------------------------------------
 # GET /ingest/status/{task_id}
@@ -222,3 +300,91 @@ class TestBatchStatus:
         assert len(statuses) == 1
         assert statuses[0]["taskId"] == "only-one"
         assert statuses[0]["state"] == "STARTED"
+
+
+class FakePubSub:
+    """Hands out ``messages`` in turn, then None as if the wait timed out."""
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.channels = []
+        self.closed = False
+
+    async def subscribe(self, *channels):
+        self.channels.extend(channels)
+
+    async def get_message(self, ignore_subscribe_messages, timeout):
+        return self.messages.pop(0) if self.messages else None
+
+    async def aclose(self):
+        self.closed = True
+
+
+class TestIngestEvents:
+    """Tests for the GET /ingest/events SSE stream."""
+
+    @staticmethod
+    def _events(stream: str) -> list[dict]:
+        import orjson
+
+        return [orjson.loads(line[len("data: "):]) for line in stream.splitlines() if line.startswith("data: ")]
+
+    async def test_snapshot_then_transitions_until_final(self, client):
+        import orjson
+
+        from app.services.ingest_events import IngestEvents
+
+        events = IngestEvents(MagicMock(), ttl=60)
+        snapshot = {"taskId": "t1", "paperId": "a", "stage": "parsing", "seq": 2}
+        events.latest = MagicMock(return_value={"t1": snapshot})
+        pubsub = FakePubSub([
+            # Already in the snapshot.
+            {"data": orjson.dumps({"taskId": "t1", "paperId": "a", "stage": "downloading", "seq": 1})},
+            {"data": orjson.dumps({"taskId": "t1", "paperId": "a", "stage": "embedding", "seq": 3})},
+            {"data": orjson.dumps({"taskId": "t2", "paperId": "b", "stage": "skipped", "seq": 1})},
+            {"data": orjson.dumps({"taskId": "t1", "paperId": "a", "stage": "indexed", "seq": 4})},
+        ])
+
+        with patch("app.webapp.app.get_ingest_events", return_value=events), \
+                patch("app.webapp.app._open_pubsub", return_value=pubsub):
+            resp = await client.get("/ingest/events", params={"task_ids": ["t1", "t2"]})
+
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        stages = [(e["taskId"], e["stage"]) for e in self._events(resp.text)]
+        assert stages == [("t1", "parsing"), ("t1", "embedding"), ("t2", "skipped"), ("t1", "indexed")]
+        assert pubsub.channels == ["ingest_events/t1", "ingest_events/t2"] and pubsub.closed
+
+    async def test_task_that_died_silently_is_reported_failed(self, client):
+        from app.services.ingest_events import IngestEvents
+
+        events = IngestEvents(MagicMock(), ttl=60)
+        events.latest = MagicMock(return_value={})
+        crashed = MagicMock(state="FAILURE", result=RuntimeError("worker lost"))
+        crashed.ready.return_value = True
+
+        with patch("app.webapp.app.get_ingest_events", return_value=events), \
+                patch("app.webapp.app._open_pubsub", return_value=FakePubSub([])), \
+                patch("app.webapp.app.celery_app") as mock_celery:
+            mock_celery.AsyncResult.return_value = crashed
+            resp = await client.get("/ingest/events", params={"task_ids": ["t1"]})
+
+        assert ": keepalive" in resp.text
+        [event] = self._events(resp.text)
+        assert event["stage"] == "failed" and event["result"]["error"] == "worker lost"
+
+    async def test_stream_expires_with_the_events_it_replays(self, client, monkeypatch):
+        from app.services.ingest_events import IngestEvents
+
+        monkeypatch.setattr(settings, "INGEST_EVENTS_TTL_SECONDS", 0)
+        events = IngestEvents(MagicMock(), ttl=60)
+        events.latest = MagicMock(return_value={"t1": {"taskId": "t1", "paperId": "a", "stage": "queued", "seq": 1}})
+        pubsub = FakePubSub([])
+
+        with patch("app.webapp.app.get_ingest_events", return_value=events), \
+                patch("app.webapp.app._open_pubsub", return_value=pubsub):
+            resp = await client.get("/ingest/events", params={"task_ids": ["t1", "t2"]})
+
+        assert [e["stage"] for e in self._events(resp.text)[:1]] == ["queued"]
+        assert resp.text.endswith('event: expired\ndata: {"taskIds":["t1","t2"]}\n\n')
+        assert pubsub.closed
@@ -0,0 +1,257 @@
+import io
+import os
+import time
+from unittest.mock import MagicMock, patch
+
+import fakeredis
+import pytest
+from celery import canvas
+
+from app.core.config import settings
+from app.services.artifacts import ArtifactStore
+from app.services.ingest_lease import PaperLeases
+from app.services.ingest_priority import BULK_PRIORITY
+from app.services.pdf_source import PdfSource
+import app.services.qdrant as qdrant_module
+from app.tasks import ingest, pipeline
+from tests.services.test_tei_parser import TEI, stub_grobid_pool
+from tests.test_ingest_tasks import FakeLeases
+
+
+@pytest.fixture(autouse=True)
+def leases():
+    fake = FakeLeases()
+    with patch.object(ingest, "_get_leases", return_value=fake), \
+            patch.object(pipeline, "_get_leases", return_value=fake):
+        yield fake
+
+
+@pytest.fixture(autouse=True)
+def events():
+    fake = MagicMock()
+    with patch.object(ingest, "get_ingest_events", return_value=fake):
+        yield fake
+
+
+class DictRedis:
+    def __init__(self):
+        self.data = {}
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+class TestArtifactStore:
+    def test_vectors_round_trip_as_float32(self):
+        store = ArtifactStore(DictRedis(), ttl=60)
+        key = store.put_vectors([[0.5, -1.0], [2.0, 0.25]])
+        assert store.get_vectors(key) == [[0.5, -1.0], [2.0, 0.25]]
+
+
+class TestStagedPipeline:
+    def test_stages_index_papers_and_report_status(self, monkeypatch, qdrant_service, leases, events):
+        service = qdrant_service()
+        redis = DictRedis()
+        pool = stub_grobid_pool(return_value=TEI)
+        embed_calls = []
+        original = type(service.embedding).embed_documents
+
+        def counting_embed(self, texts):
+            embed_calls.append(len(texts))
+            return original(self, texts)
+
+        monkeypatch.setattr(type(service.embedding), "embed_documents", counting_embed)
+        source = PdfSource(source="arxiv_id", url="https://arxiv.org/pdf/1706.03762", arxiv_id="1706.03762")
+
+        with patch.object(pipeline, "_get_qdrant_service", return_value=service), \
+                patch.object(pipeline, "_artifacts", ArtifactStore(redis, ttl=60)), \
+                patch.object(qdrant_module, "get_grobid_pool", return_value=pool), \
+                patch.object(pipeline, "download_from_sources", side_effect=lambda *a: (source, io.BytesIO(b"%PDF"), None)), \
+                patch.object(pipeline.upsert_stage.backend, "mark_as_done") as mark_as_done:
+            parsed = [
+                pipeline.parse_stage.run(pipeline.download_stage.run(
+                    pipeline.new_context({"paperId": pid}, f"task-{pid}", [source], title_search=False)
+                ))
+                for pid in ("p1", "p2")
+            ]
+            results = pipeline.upsert_stage.run(pipeline.embed_stage.run(parsed))
+
+        assert [r["success"] for r in results] == [True, True]
+        assert results[0]["source"] == "arxiv_id"
+        # Both papers are embedded in a single call.
+        assert len(embed_calls) == 1
+        counts = service.get_paper_chunk_counts(["p1", "p2"])
+        assert counts["p1"] > 0 and counts["p1"] == counts["p2"]
+        assert {call.args[0] for call in mark_as_done.call_args_list} == {"task-p1", "task-p2"}
+        assert redis.data == {}
+        assert [paper_id for paper_id, _ in leases.released] == ["p1", "p2"]
+        assert [c.args[2] for c in events.publish.call_args_list if c.args[0] == "task-p1"] == ["parsing", "embedding"]
+        events.finish.assert_any_call("task-p1", results[0])
+
+    def test_failure_is_passed_through_and_reported(self, monkeypatch, qdrant_service):
+        service = qdrant_service()
+        pool = stub_grobid_pool(side_effect=RuntimeError("grobid down"))
+        source = PdfSource(source="open_access", url="https://example.org/p.pdf")
+
+        with patch.object(pipeline, "_get_qdrant_service", return_value=service), \
+                patch.object(pipeline, "_artifacts", ArtifactStore(DictRedis(), ttl=60)), \
+                patch.object(qdrant_module, "get_grobid_pool", return_value=pool), \
+                patch.object(pipeline, "download_from_sources", return_value=(source, io.BytesIO(b"%PDF"), None)), \
+                patch.object(pipeline.upsert_stage.backend, "mark_as_done") as mark_as_done:
+            ctx = pipeline.parse_stage.run(pipeline.download_stage.run(
+                pipeline.new_context({"paperId": "p1"}, "task-1", [source], title_search=False)
+            ))
+            results = pipeline.upsert_stage.run(pipeline.embed_stage.run(ctx))
+
+        assert results[0]["success"] is False
+        assert "grobid down" in results[0]["error"]
+        mark_as_done.assert_called_once_with("task-1", results[0])
+
+    def test_contended_paper_leaves_the_chord_to_the_lease_holder(self, qdrant_service, leases, events):
+        service = qdrant_service()
+        leases.held["p1"] = "other"
+        source = PdfSource(source="open_access", url="https://example.org/p.pdf")
+        slots = MagicMock()
+
+        with patch.object(pipeline, "_get_qdrant_service", return_value=service), \
+                patch.object(pipeline, "_artifacts", ArtifactStore(DictRedis(), ttl=60)), \
+                patch.object(qdrant_module, "get_grobid_pool", return_value=stub_grobid_pool(return_value=TEI)), \
+                patch.object(ingest, "get_user_slots", return_value=slots), \
+                patch.object(pipeline, "download_from_sources", return_value=(source, io.BytesIO(b"%PDF"), None)) as download, \
+                patch.object(pipeline.upsert_stage.backend, "mark_as_done") as mark_as_done:
+            contexts = [
+                pipeline.parse_stage.run(pipeline.download_stage.run(
+                    pipeline.new_context({"paperId": pid}, f"task-{pid}", [source], title_search=False, user_id="alice")
+                ))
+                for pid in ("p1", "p2")
+            ]
+            # No wait for the other task: p2 goes through on its own.
+            results = pipeline.upsert_stage.run(pipeline.embed_stage.run(contexts))
+            assert [r["paperId"] for r in results] == ["p2"]
+            assert [c.args[0] for c in mark_as_done.call_args_list] == ["task-p2"]
+            assert download.call_count == 1
+            slots.release.assert_any_call("alice", "task-p1")
+
+            # The holder finishes and reports p1 under its task ID too.
+            holder_result = {"paperId": "p1", "method": "full_pdf", "chunk_count": 3, "success": True}
+            ingest.release_paper("p1", "other", holder_result)
+
+        mark_as_done.assert_called_with("task-p1", holder_result)
+        events.finish.assert_any_call("task-p1", holder_result)
+
+    def test_lease_outlives_a_stall_between_stages(self, monkeypatch, qdrant_service):
+        monkeypatch.setattr(settings, "INGEST_PIPELINE_LEASE_TTL_SECONDS", 30)
+        service = qdrant_service()
+        leases = PaperLeases(fakeredis.FakeRedis(), ttl=1)
+        source = PdfSource(source="open_access", url="https://example.org/p.pdf")
+
+        with patch.object(ingest, "_get_leases", return_value=leases), \
+                patch.object(pipeline, "_get_leases", return_value=leases), \
+                patch.object(pipeline, "_get_qdrant_service", return_value=service), \
+                patch.object(pipeline, "_artifacts", ArtifactStore(DictRedis(), ttl=60)), \
+                patch.object(qdrant_module, "get_grobid_pool", return_value=stub_grobid_pool(return_value=TEI)), \
+                patch.object(pipeline, "download_from_sources", return_value=(source, io.BytesIO(b"%PDF"), None)), \
+                patch.object(pipeline.upsert_stage.backend, "mark_as_done"):
+            ctx = pipeline.download_stage.run(
+                pipeline.new_context({"paperId": "p1"}, "task-1", [source], title_search=False)
+            )
+            # Queued for parsing for longer than the lease TTL.
+            time.sleep(1.5)
+            assert leases.acquire("p1") is None
+            results = pipeline.upsert_stage.run(pipeline.embed_stage.run(pipeline.parse_stage.run(ctx)))
+
+        assert results[0]["success"] is True
+        assert leases.acquire("p1") is not None
+
+    def test_interactive_slot_is_held_until_upsert(self, monkeypatch):
+        monkeypatch.setattr(settings, "INGEST_PIPELINE", "staged")
+        qdrant = MagicMock()
+        qdrant.check_paper_exists.return_value = False
+        slots = MagicMock()
+        dispatched = []
+
+        with patch.object(ingest, "_get_qdrant_service", return_value=qdrant), \
+                patch.object(ingest, "get_user_slots", return_value=slots), \
+                patch.object(pipeline, "_get_qdrant_service", return_value=qdrant), \
+                patch.object(pipeline, "dispatch_pipeline", side_effect=dispatched.extend), \
+                patch.object(pipeline.upsert_stage.backend, "mark_as_done"):
+            ingest.ingest_paper_task.apply(args=[{"paperId": "p1"}], kwargs={"user_id": "alice"}, task_id="t1")
+            slots.release.assert_not_called()
+
+            ctx = dispatched[0]
+            ctx["result"] = {"paperId": "p1", "success": False, "error": "PDF download failed"}
+            pipeline.upsert_stage.run(ctx)
+
+        assert ctx["task_id"] == "t1"
+        slots.release.assert_called_once_with("alice", "t1")
+
+    def test_bulk_papers_stage_tasks_are_sent_with_bulk_priority(self):
+        bulk = [pipeline.new_context({"paperId": p}, f"t-{p}", [], False, priority="bulk") for p in ("p1", "p2")]
+        interactive = pipeline.new_context({"paperId": "p3"}, "t-p3", [], False)
+
+        def priorities(sig):
+            if hasattr(sig, "tasks"):
+                return [p for task in sig.tasks for p in priorities(task)]
+            return [sig.options.get("priority")]
+
+        with patch.object(pipeline, "chord") as chord, \
+                patch.object(canvas._chain, "apply_async", autospec=True) as apply_async:
+            pipeline.dispatch_pipeline(bulk)
+            pipeline.dispatch_pipeline([interactive])
+
+        header, body = chord.call_args.args
+        assert priorities(header) + priorities(body) == [BULK_PRIORITY] * 6
+        assert priorities(apply_async.call_args.args[0]) == [None] * 4
+
+
+class TestPdfHandOff:
+    def _download(self, monkeypatch):
+        qdrant = MagicMock()
+        qdrant.check_paper_exists.return_value = False
+        monkeypatch.setattr(pipeline, "_get_qdrant_service", lambda: qdrant)
+        source = PdfSource(source="open_access", url="https://example.org/p.pdf")
+        redis = DictRedis()
+        with patch.object(pipeline, "_artifacts", ArtifactStore(redis, ttl=60)), \
+                patch.object(pipeline, "download_from_sources", return_value=(source, io.BytesIO(b"%PDF-1.7"), None)):
+            ctx = pipeline.download_stage.run(pipeline.new_context({"paperId": "p1"}, "t1", [source], False))
+        assert redis.data == {}  # the PDF never goes through Redis
+        return ctx
+
+    def _parse(self, ctx, seen):
+        qdrant = MagicMock()
+        qdrant.parse_pdf.side_effect = lambda pdf, **_: seen.append(pdf.read()) or []
+        qdrant.parent_retriever.split_for_indexing.return_value = ([], [], [])
+        with patch.object(pipeline, "_get_qdrant_service", return_value=qdrant), \
+                patch.object(pipeline, "_artifacts", ArtifactStore(DictRedis(), ttl=60)):
+            return pipeline.parse_stage.run(ctx)
+
+    def test_pdf_is_passed_by_artifact_cache_hash(self, monkeypatch, tmp_path):
+        from app.services import artifact_cache
+
+        monkeypatch.setattr(settings, "INGEST_CACHE_DIR", str(tmp_path))
+        cache = artifact_cache.get_artifact_cache()
+        cache.put_pdf(io.BytesIO(b"%PDF-1.7"))  # as download_from_sources does
+        ctx = self._download(monkeypatch)
+        assert "pdf_path" not in ctx
+
+        seen = []
+        ctx = self._parse(ctx, seen)
+
+        assert seen == [b"%PDF-1.7"] and "result" not in ctx and "pdf_sha256" not in ctx
+
+    def test_without_cache_a_temporary_file_is_used_and_removed(self, monkeypatch):
+        ctx = self._download(monkeypatch)
+        path = ctx["pdf_path"]
+
+        seen = []
+        self._parse(ctx, seen)
+
+        assert seen == [b"%PDF-1.7"]
+        assert not os.path.exists(path)
@@ -0,0 +1,391 @@
+import io
+import threading
+import time
+from contextlib import nullcontext
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core.config import settings
+from app.core.schema import S2Paper
+from app.services import artifact_cache
+from app.services.pdf_source import PdfSource, known_sources, search_by_titles
+from app.tasks import ingest
+
+
+def _result(short_id, title):
+    return SimpleNamespace(
+        get_short_id=lambda: short_id,
+        title=title,
+        pdf_url=f"https://arxiv.org/pdf/{short_id}",
+    )
+
+
+class FakeLeases:
+    """In-memory stand-in for PaperLeases; ``results`` are what ``wait`` hands out in turn."""
+
+    def __init__(self, held=(), results=()):
+        self.held = {paper_id: "other" for paper_id in held}
+        self.results = list(results)
+        self.released = []
+        self.followers = {}
+
+    def acquire(self, paper_id):
+        if paper_id in self.held:
+            return None
+        self.held[paper_id] = f"token-{paper_id}"
+        return self.held[paper_id]
+
+    def renew(self, paper_id, token, ttl=None):
+        return self.held.get(paper_id) == token
+
+    def heartbeat(self, paper_id, token):
+        return nullcontext()
+
+    def release(self, paper_id, token, result=None):
+        assert self.held.pop(paper_id) == token
+        self.released.append((paper_id, result))
+        return self.followers.pop(paper_id, []) if result is not None else []
+
+    def follow(self, paper_id, task_id):
+        if paper_id not in self.held:
+            return False
+        self.followers.setdefault(paper_id, []).append(task_id)
+        return True
+
+    def wait(self, paper_id, timeout):
+        result = self.results.pop(0)
+        if result is None:
+            # The holder crashed and its lease expired.
+            self.held.pop(paper_id)
+        return result
+
+
+@pytest.fixture(autouse=True)
+def leases():
+    fake = FakeLeases()
+    with patch.object(ingest, "_get_leases", return_value=fake):
+        yield fake
+
+
+@pytest.fixture(autouse=True)
+def events():
+    fake = MagicMock()
+    with patch.object(ingest, "get_ingest_events", return_value=fake):
+        yield fake
+
+
+class TestPdfSources:
+    def test_arxiv_id_then_open_access_without_network(self):
+        paper = S2Paper(
+            paperId="a",
+            externalIds={"ArXiv": "1706.03762", "DOI": "10.1/x"},
+            openAccessPdf={"url": "https://example.org/a.pdf"},
+        )
+        assert [(s.source, s.url) for s in known_sources(paper)] == [
+            ("arxiv_id", "https://arxiv.org/pdf/1706.03762"),
+            ("open_access", "https://example.org/a.pdf"),
+        ]
+        assert known_sources(S2Paper(paperId="b", externalIds={"DOI": "10.1/y"})) == []
+
+    def test_doi_adds_unpaywall_record(self, monkeypatch):
+        monkeypatch.setattr(settings, "UNPAYWALL_EMAIL", "dev@example.org")
+        paper = S2Paper(paperId="b", externalIds={"DOI": "10.1/y"})
+
+        assert known_sources(paper) == [
+            PdfSource(source="unpaywall", url="https://api.unpaywall.org/v2/10.1/y")
+        ]
+
+    def test_open_access_mirror_wins_race(self, monkeypatch):
+        monkeypatch.setattr(settings, "PDF_HEDGE_DELAY_SECONDS", 0.05)
+        qdrant = MagicMock()
+        qdrant.check_paper_exists.return_value = False
+        qdrant.add_s2_paper.return_value = 2
+        qdrant._download_s2_pdf.return_value = io.BytesIO(b"%PDF-1.7")
+        cancelled = []
+
+        def stalled_arxiv(url, cancel):
+            cancelled.append(cancel.wait(5))
+            raise ValueError("cancelled")
+
+        with patch.object(ingest, "_get_qdrant_service", return_value=qdrant), \
+                patch.object(ingest, "spool_pdf", side_effect=stalled_arxiv), \
+                patch.object(ingest, "search_by_title") as search_by_title:
+            started = time.monotonic()
+            result = ingest.ingest_paper_task.run({
+                "paperId": "a",
+                "externalIds": {"ArXiv": "1706.03762"},
+                "openAccessPdf": {"url": "https://example.org/a.pdf"},
+            })
+
+        assert result["success"] and result["source"] == "open_access"
+        assert time.monotonic() - started < 2
+        search_by_title.assert_not_called()
+        deadline = time.monotonic() + 2
+        while not cancelled and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert cancelled == [True]
+
+    def test_grouped_title_search(self):
+        papers = [
+            S2Paper(paperId="c", title="Deep Residual Learning for Image Recognition"),
+            S2Paper(paperId="d", title="An Unknown Paper"),
+        ]
+        client = MagicMock()
+        client.results.return_value = [_result("1512.03385v1", "Deep residual learning for image recognition.")]
+
+        found = search_by_titles(papers, client=client)
+
+        client.results.assert_called_once()
+        assert 'ti:"An Unknown Paper"' in client.results.call_args[0][0].query
+        assert found == {
+            "c": PdfSource(source="title_search", url="https://arxiv.org/pdf/1512.03385v1", arxiv_id="1512.03385v1")
+        }
+
+
+class TestIngestPaperTask:
+    def test_arxiv_id_skips_title_search(self):
+        qdrant = MagicMock()
+        qdrant.check_paper_exists.return_value = False
+        qdrant.add_s2_paper.return_value = 7
+
+        with patch.object(ingest, "_get_qdrant_service", return_value=qdrant), \
+                patch.object(ingest, "spool_pdf") as spool_pdf, \
+                patch.object(ingest, "search_by_title") as search_by_title:
+            result = ingest.ingest_paper_task.run({"paperId": "a", "externalIds": {"ArXiv": "1706.03762"}})
+
+        assert result["source"] == "arxiv_id" and result["chunk_count"] == 7
+        spool_pdf.assert_called_once()
+        assert spool_pdf.call_args.args == ("https://arxiv.org/pdf/1706.03762",)
+        search_by_title.assert_not_called()
+
+    def test_falls_back_to_title_search_after_failed_download(self):
+        qdrant = MagicMock()
+        qdrant.check_paper_exists.return_value = False
+        qdrant._download_s2_pdf.side_effect = ValueError("403")
+        qdrant.add_s2_paper.return_value = 3
+        found = PdfSource(source="title_search", url="https://arxiv.org/pdf/2401.1", arxiv_id="2401.1")
+
+        with patch.object(ingest, "_get_qdrant_service", return_value=qdrant), \
+                patch.object(ingest, "spool_pdf"), \
+                patch.object(ingest, "search_by_title", return_value=found):
+            result = ingest.ingest_paper_task.run(
+                {"paperId": "b", "title": "T", "openAccessPdf": {"url": "https://example.org/b.pdf"}}
+            )
+
+        assert result["success"] and result["source"] == "title_search"
+
+    def test_publishes_stages_under_task_id(self, events):
+        qdrant = MagicMock()
+        qdrant.check_paper_exists.return_value = False
+
+        def add_s2_paper(pdf, paper_id, filename, on_stage, **_):
+            on_stage("parsing")
+            on_stage("embedding")
+            return 4
+
+        qdrant.add_s2_paper.side_effect = add_s2_paper
+
+        with patch.object(ingest, "_get_qdrant_service", return_value=qdrant), \
+                patch.object(ingest, "spool_pdf"):
+            result = ingest.ingest_paper_task.apply(
+                args=[{"paperId": "a", "externalIds": {"ArXiv": "1706.03762"}}], task_id="task-a"
+            ).get()
+
+        assert [c.args for c in events.publish.call_args_list] == [
+            ("task-a", "a", stage) for stage in ("resolving", "downloading", "parsing", "embedding")
+        ]
+        events.finish.assert_called_once_with("task-a", result)
+
+    def test_paper_parsed_without_grobid_is_flagged(self):
+        qdrant = MagicMock()
+        qdrant.check_paper_exists.return_value = False
+
+        def add_s2_paper(pdf, paper_id, on_fallback, **_):
+            on_fallback()
+            return 5
+
+        qdrant.add_s2_paper.side_effect = add_s2_paper
+        reprocess = MagicMock()
+
+        with patch.object(ingest, "_get_qdrant_service", return_value=qdrant), \
+                patch.object(ingest, "spool_pdf"), \
+                patch.object(ingest, "get_reprocess_queue", return_value=reprocess):
+            result = ingest.ingest_paper_task.run({"paperId": "a", "externalIds": {"ArXiv": "1706.03762"}})
+
+        assert result["success"]
+        assert reprocess.add.call_args.args[0]["paperId"] == "a"
+
+    def test_retry_uses_cached_pdf(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(settings, "INGEST_CACHE_DIR", str(tmp_path))
+        monkeypatch.setattr(artifact_cache, "_cache", None)
+        qdrant = MagicMock()
+        qdrant.check_paper_exists.return_value = False
+        qdrant.add_s2_paper.side_effect = [RuntimeError("embedding timeout"), 5]
+        paper = {"paperId": "a", "externalIds": {"ArXiv": "1706.03762v5"}}
+
+        with patch.object(ingest, "_get_qdrant_service", return_value=qdrant), \
+                patch.object(ingest, "spool_pdf", return_value=io.BytesIO(b"%PDF-1.7")) as spool_pdf:
+            first = ingest.ingest_paper_task.run(paper)
+            second = ingest.ingest_paper_task.run(paper)
+
+        assert first["success"] is False
+        assert second["success"] and second["source"] == "cache"
+        spool_pdf.assert_called_once()
+        assert qdrant.add_s2_paper.call_args.kwargs["filename"] == "1706.03762v5.pdf"
+
+    def test_gives_back_interactive_slot(self):
+        qdrant = MagicMock()
+        qdrant.check_paper_exists.return_value = True
+        slots = MagicMock()
+
+        with patch.object(ingest, "_get_qdrant_service", return_value=qdrant), \
+                patch.object(ingest, "get_user_slots", return_value=slots):
+            ingest.ingest_paper_task.apply(args=[{"paperId": "a"}], kwargs={"user_id": "alice"}, task_id="t1")
+
+        slots.release.assert_called_once_with("alice", "t1")
+
+    def test_not_found(self):
+        qdrant = MagicMock()
+        qdrant.check_paper_exists.return_value = False
+
+        with patch.object(ingest, "_get_qdrant_service", return_value=qdrant), \
+                patch.object(ingest, "search_by_title", return_value=None):
+            result = ingest.ingest_paper_task.run({"paperId": "c", "title": "T"})
+
+        assert result["success"] is False and result["error"] == ingest.NOT_ON_ARXIV
+
+
+class TestPaperLease:
+    def test_waits_for_concurrent_ingestion(self, leases):
+        qdrant = MagicMock()
+        qdrant.check_paper_exists.return_value = False
+        leases.held["a"] = "other"
+        leases.results = [{"paperId": "a", "method": "full_pdf", "chunk_count": 4, "success": True}]
+
+        with patch.object(ingest, "_get_qdrant_service", return_value=qdrant), \
+                patch.object(ingest, "spool_pdf") as spool_pdf:
+            result = ingest.ingest_paper_task.run({"paperId": "a", "externalIds": {"ArXiv": "1706.03762"}})
+
+        assert result["chunk_count"] == 4
+        spool_pdf.assert_not_called()
+        qdrant.add_s2_paper.assert_not_called()
+
+    def test_takes_over_expired_lease(self, leases):
+        qdrant = MagicMock()
+        qdrant.check_paper_exists.return_value = False
+        qdrant.add_s2_paper.return_value = 2
+        leases.held["a"] = "other"
+        leases.results = [None]
+
+        with patch.object(ingest, "_get_qdrant_service", return_value=qdrant), \
+                patch.object(ingest, "spool_pdf"):
+            result = ingest.ingest_paper_task.run({"paperId": "a", "externalIds": {"ArXiv": "1706.03762"}})
+
+        assert result["success"] and result["chunk_count"] == 2
+        assert leases.released == [("a", result)]
+
+    def test_skips_paper_indexed_while_waiting(self, leases):
+        qdrant = MagicMock()
+        # Not indexed when the task starts, indexed once the lease is ours.
+        qdrant.check_paper_exists.side_effect = [False, True]
+
+        with patch.object(ingest, "_get_qdrant_service", return_value=qdrant), \
+                patch.object(ingest, "spool_pdf") as spool_pdf:
+            result = ingest.ingest_paper_task.run({"paperId": "a", "externalIds": {"ArXiv": "1706.03762"}})
+
+        assert result["method"] == "skipped"
+        spool_pdf.assert_not_called()
+        assert leases.held == {}
+
+    def test_releases_without_result_on_error(self, leases):
+        qdrant = MagicMock()
+        qdrant.check_paper_exists.return_value = False
+
+        with patch.object(ingest, "_get_qdrant_service", return_value=qdrant), \
+                patch.object(ingest, "_ingest_pdf", side_effect=RuntimeError("boom")), \
+                pytest.raises(RuntimeError):
+            ingest.ingest_pdf_task.run({"paperId": "a"}, [])
+
+        # Waiters wake up and take over instead of inheriting a failure.
+        assert leases.released == [("a", None)]
+
+
+class TestIngestBatchTask:
+    def test_reports_every_paper_under_its_task_id(self):
+        papers = [
+            {"paperId": "indexed"},
+            {"paperId": "known", "externalIds": {"ArXiv": "1706.03762"}},
+            {"paperId": "found", "title": "Found"},
+            {"paperId": "missing", "title": "Missing"},
+        ]
+        qdrant = MagicMock()
+        qdrant.get_paper_chunk_counts.return_value = {"indexed": 5}
+        found = PdfSource(source="title_search", url="https://arxiv.org/pdf/2401.00001v1", arxiv_id="2401.00001v1")
+
+        with patch.object(ingest, "_get_qdrant_service", return_value=qdrant), \
+                patch.object(ingest, "search_by_titles", return_value={"found": found}) as search_by_titles, \
+                patch.object(ingest.ingest_pdf_task, "apply_async") as apply_async, \
+                patch.object(ingest.ingest_batch_task.backend, "mark_as_done") as mark_as_done:
+            summary = ingest.ingest_batch_task.run(papers, ["t1", "t2", "t3", "t4"])
+
+        assert summary == {"dispatched": 2, "skipped": 1, "failed": 1}
+        assert [p.paperId for p in search_by_titles.call_args[0][0]] == ["found", "missing"]
+        dispatched = {call.kwargs["task_id"]: call.kwargs["args"] for call in apply_async.call_args_list}
+        assert dispatched["t2"][1][0]["source"] == "arxiv_id" and dispatched["t2"][2] is True
+        assert dispatched["t3"][1] == [found.model_dump()] and dispatched["t3"][2] is False
+        stored = {call.args[0]: call.args[1] for call in mark_as_done.call_args_list}
+        assert stored["t1"]["method"] == "skipped"
+        assert stored["t4"]["success"] is False
+
+    def test_crash_fails_every_paper_not_yet_dispatched(self, events):
+        papers = [
+            {"paperId": "indexed"},
+            {"paperId": "known", "externalIds": {"ArXiv": "1706.03762"}},
+            {"paperId": "later", "externalIds": {"ArXiv": "2401.00001"}},
+        ]
+        qdrant = MagicMock()
+        qdrant.get_paper_chunk_counts.return_value = {"indexed": 5}
+
+        with patch.object(ingest, "_get_qdrant_service", return_value=qdrant), \
+                patch.object(ingest.ingest_pdf_task, "apply_async", side_effect=[None, ConnectionError("broker down")]), \
+                patch.object(ingest.ingest_batch_task.backend, "mark_as_done") as mark_as_done, \
+                pytest.raises(ConnectionError):
+            ingest.ingest_batch_task.run(papers, ["t1", "t2", "t3"])
+
+        stored = {call.args[0]: call.args[1] for call in mark_as_done.call_args_list}
+        # t2 went out before the broker failed; its own task reports it.
+        assert set(stored) == {"t1", "t3"}
+        assert stored["t3"]["success"] is False and "broker down" in stored["t3"]["error"]
+        events.finish.assert_any_call("t3", stored["t3"])
+
+
+class TestWorkerServices:
+    def test_threads_share_one_qdrant_service(self, monkeypatch):
+        built = []
+
+        def slow_service(config):
+            time.sleep(0.05)
+            built.append(config)
+            return MagicMock()
+
+        monkeypatch.setattr(ingest, "_qdrant_service", None)
+        monkeypatch.setattr(ingest, "QdrantService", slow_service)
+        services = []
+        threads = [threading.Thread(target=lambda: services.append(ingest._get_qdrant_service())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(built) == 1 and all(s is services[0] for s in services)
+
+    def test_prefork_child_rebuilds_inherited_clients(self, monkeypatch):
+        monkeypatch.setattr(ingest, "_qdrant_service", MagicMock())
+        monkeypatch.setattr(ingest.grobid, "_pool", MagicMock())
+        monkeypatch.setattr(ingest, "_warm_up_services", lambda: None)
+
+        ingest._init_worker_process()
+
+        assert ingest._qdrant_service is None and ingest.grobid._pool is None
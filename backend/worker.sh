@@ -1 +1 @@
-uv run celery -A app.celery_app worker --pool=solo --loglevel=info
\ No newline at end of file
+uv run celery -A app.celery_app worker --loglevel=info
\ No newline at end of file
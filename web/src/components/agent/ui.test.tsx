@@ -3,6 +3,10 @@ import { render, screen, waitFor } from '@testing-library/react';
 import userEvent from '@testing-library/user-event';
 import { PaperListComponent, PaperComponent } from './ui';
 
+vi.mock('@clerk/clerk-react', () => ({
+  useAuth: () => ({ getToken: async () => 'session-token' }),
+}));
+
 // Mock the toast from sonner
 vi.mock('sonner', () => ({
   toast: {
@@ -182,6 +186,7 @@ describe('PaperListComponent', () => {
             method: 'POST',
             headers: {
               'Content-Type': 'application/json',
+              'Authorization': 'Bearer session-token',
             },
             body: JSON.stringify({
               papers: [mockPapers[0]],
@@ -1,5 +1,6 @@
 import { useState, useEffect } from "react";
 import { toast } from "sonner";
+import { useAuth } from "@clerk/clerk-react";
 import { usePaperSelection, PaperData } from "@/providers/PaperSelection";
 
 // ============================================
@@ -224,6 +225,7 @@ interface TaskPollStatus {
 export const PaperListComponent = (props: PaperListComponentProps) => {
   const paperCount = props.papers?.length || 0;
   const { selectPaper } = usePaperSelection();
+  const { getToken } = useAuth();
   const [tempSelected, setTempSelected] = useState<Set<string>>(new Set()); // Temporary checkbox selections
   const [ingestStatus, setIngestStatus] = useState<IngestStatus>({ status: 'idle' });
   const [taskStatuses, setTaskStatuses] = useState<TaskPollStatus[]>([]);
@@ -341,12 +343,14 @@ export const PaperListComponent = (props: PaperListComponentProps) => {
         (p) => p.paperId && tempSelected.has(p.paperId)
       );
 
-      // Make POST request to backend using backend API URL
+      // Make POST request to backend using backend API URL; the backend
+      // identifies the user by their session token for per-user fairness
+      const token = await getToken();
+      const headers: Record<string, string> = { 'Content-Type': 'application/json' };
+      if (token) headers['Authorization'] = `Bearer ${token}`;
       const response = await fetch(`${backendApiUrl}/ingest`, {
         method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
+        headers,
         body: JSON.stringify({
           papers: papersToIngest,
         }),